@@ -56,6 +56,48 @@ module.exports = function(grunt){
         }
       }
     },
+    uglify: {
+      options: {
+        preserveComments: 'some',
+        report: 'gzip'
+      },
+      // Third-party scripts, in load order; these change rarely, so
+      // are bundled separately from the application's own code.
+      vendor: {
+        files: {
+          'inthe_am/taskmanager/static/vendor.min.js': [
+            'inthe_am/taskmanager/static/jquery.datetimepicker.js',
+            'inthe_am/taskmanager/static/jquery.growl.js',
+            'inthe_am/taskmanager/static/moment.min.js',
+            'inthe_am/taskmanager/static/markdown.min.js',
+            'inthe_am/taskmanager/static/handlebars-v1.3.0.js',
+            'inthe_am/taskmanager/static/ember.min.js',
+            'inthe_am/taskmanager/static/ember-data.min.js',
+            'inthe_am/taskmanager/static/tastypie_adapter.js',
+            // Only the Foundation plugins actually used; see
+            // `foundation/scss/app.scss` for their styles.
+            'inthe_am/taskmanager/static/foundation.js',
+            'inthe_am/taskmanager/static/foundation.accordion.js',
+            'inthe_am/taskmanager/static/foundation.reveal.js',
+            'inthe_am/taskmanager/static/foundation.topbar.js'
+          ]
+        }
+      },
+      app: {
+        files: {
+          'inthe_am/taskmanager/static/app.min.js': [
+            'inthe_am/taskmanager/static/templates.js',
+            'inthe_am/taskmanager/static/task_manager.js'
+          ]
+        }
+      }
+    },
+    // Maximum gzipped sizes, in bytes.
+    size_budget: {
+      'inthe_am/taskmanager/static/vendor.min.js': 150 * 1024,
+      'inthe_am/taskmanager/static/app.min.js': 60 * 1024,
+      'inthe_am/taskmanager/static/app.css': 30 * 1024
+    },
     watch: {
       sass: {
         files: [
@@ -89,5 +131,51 @@ module.exports = function(grunt){
   grunt.loadNpmTasks('grunt-browserify');
   grunt.loadNpmTasks('grunt-ember-handlebars');
   grunt.loadNpmTasks('grunt-sass');
+  grunt.loadNpmTasks('grunt-contrib-uglify');
+
+  grunt.registerTask(
+    'size_budget',
+    'Fails if any bundle is larger (gzipped) than its budget.',
+    function() {
+      var zlib = require('zlib');
+      var done = this.async();
+      var budgets = grunt.config('size_budget');
+      var paths = Object.keys(budgets);
+      var failed = false;
+
+      var check = function(index) {
+        if (index >= paths.length) {
+          done(!failed);
+          return;
+        }
+        var path = paths[index];
+        var contents = grunt.file.read(path, {encoding: null});
+        zlib.gzip(contents, function(err, compressed) {
+          if (err) {
+            grunt.log.error(err);
+            failed = true;
+          } else if (compressed.length > budgets[path]) {
+            grunt.log.error(
+              path + ' is ' + compressed.length + ' bytes gzipped; ' +
+              'its budget is ' + budgets[path] + ' bytes.'
+            );
+            failed = true;
+          } else {
+            grunt.log.ok(
+              path + ': ' + compressed.length + ' of ' + budgets[path] +
+              ' bytes gzipped.'
+            );
+          }
+          check(index + 1);
+        });
+      };
+      check(0);
+    }
+  );
+
+  grunt.registerTask(
+    'build',
+    ['ember_handlebars', 'sass', 'browserify', 'uglify', 'size_budget']
+  );
 
 };
@@ -21,10 +21,11 @@ def deploy():
     local('git push origin master')
     with cd('/var/www/twweb'):
         run('git pull')
-        run('grunt ember_handlebars sass browserify')
+        run('grunt build')
         virtualenv('pip install -r /var/www/twweb/requirements.txt')
         virtualenv('python manage.py collectstatic --noinput', user='www-data')
         virtualenv('python manage.py migrate', user='www-data')
         sudo('service twweb restart')
         sudo('service twweb-status restart')
         sudo('service twweb-celery restart')
+        sudo('service twweb-celery-beat restart')
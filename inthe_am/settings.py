@@ -12,8 +12,12 @@ https://docs.djangoproject.com/en/1.6/ref/settings/
 import os
 import sys
 
+from celery.schedules import crontab
+
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 
+TESTING = 'test' in sys.argv
+
 ADMINS = (
     ('Adam Coddington', 'admin@inthe.am'),
 )
@@ -56,6 +60,8 @@ INSTALLED_APPS = (
 )
 
 MIDDLEWARE_CLASSES = (
+    'inthe_am.taskmanager.profiling.RequestProfilingMiddleware',
+    'inthe_am.taskmanager.middleware.ApiCompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -103,8 +109,29 @@ ENVIRONMENT_SETTING_PREFIX = 'TWWEB_'
 LOGIN_REDIRECT_URL = '/'
 
 TASK_STORAGE_PATH = os.path.join(BASE_DIR, 'task_data')
+# Read-only copies of each store's last commit, used to serve reads
+# without taking the store lock.
+TASK_SNAPSHOT_PATH = os.path.join(BASE_DIR, 'task_snapshots')
+TASK_SNAPSHOT_RETENTION_SECONDS = 300
+
+# Pre-generated keys for new taskd accounts; this should be on the same
+# filesystem as TASK_STORAGE_PATH so that keys can be claimed by rename.
+TASKD_KEY_POOL_PATH = os.path.join(BASE_DIR, 'key_pool')
+TASKD_KEY_POOL_SIZE = 0 if TESTING else 10
+TASKD_KEY_POOL_SIGN_CERTIFICATES = True
+TASKD_PRIVATE_KEY_BITS = 2048
+# Provisioning that hasn't progressed for this long is assumed to have
+# been abandoned (by a lost message or a worker that died), and is
+# queued again.
+TASKD_PROVISIONING_TIMEOUT_SECONDS = 600
 
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# Collected files are given content-hashed names (outside of DEBUG), so
+# they can be cached indefinitely; see nginx_static.conf.
+STATICFILES_STORAGE = (
+    'django.contrib.staticfiles.storage.StaticFilesStorage' if TESTING
+    else 'django.contrib.staticfiles.storage.CachedStaticFilesStorage'
+)
 
 LOGGING = {
     'version': 1,
@@ -176,12 +203,22 @@ LOGGING = {
     }
 }
 
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Hashed static file names only change when collectstatic is run.
+    'staticfiles': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'staticfiles',
+        'TIMEOUT': None,
+    },
+}
+
 if not DEBUG:
-    CACHES = {
-        'default': {
-            'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
-            'LOCATION': '127.0.0.1:11211'
-        }
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': '127.0.0.1:11211'
     }
 
     SESSION_ENGINE = "django.contrib.sessions.backends.cache"
@@ -206,9 +243,54 @@ EVENT_STREAM_TIMEOUT = 240
 EVENT_STREAM_LOOP_INTERVAL = 5
 EVENT_STREAM_POLLING_INTERVAL = 60
 LOCKFILE_TIMEOUT_SECONDS = 120
+STORE_LOCK_TIMEOUT_SECONDS = 10
+# When set, store locks are kept in Redis rather than in lock files.
+STORE_LOCK_REDIS_URL = None
+
+# Lock contention metrics are sent to statsd when STATSD_HOST is set, and
+# are available in Prometheus format at /metrics/ to staff, to requests
+# bearing METRICS_TOKEN ("Authorization: Bearer <token>"), and from
+# METRICS_ALLOWED_IPS -- which mustn't include the address of a proxy in
+# front of the site, since every proxied request would come from it.
+STATSD_HOST = None
+STATSD_PORT = 8125
+STATSD_PREFIX = 'inthe_am'
+METRICS_TOKEN = None
+METRICS_ALLOWED_IPS = ()
+
+# Per-phase request timings are returned in a Server-Timing header (to
+# staff, outside of DEBUG), and logged for slow requests and a sample of
+# the rest. Database query timings are only collected for sampled
+# requests unless REQUEST_PROFILING_QUERIES is set.
+REQUEST_PROFILING_SERVER_TIMING = DEBUG
+REQUEST_PROFILING_SLOW_SECONDS = 2
+REQUEST_PROFILING_SAMPLE_RATE = 0.01
+REQUEST_PROFILING_QUERIES = False
+
+# API responses at least this large (and all streamed ones) are gzipped
+# for clients accepting it.
+API_COMPRESSION_PATH_PREFIXES = ('/api/', )
+API_COMPRESSION_MINIMUM_SIZE = 1024
+
+BENCHMARK_RESULTS_PATH = os.path.join(BASE_DIR, 'benchmarks.jsonl')
+PEBBLE_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+ACTIVITY_LOG_MESSAGE_RETENTION_DAYS = 30
+ACTIVITY_LOG_ERROR_ROLLUP_DAYS = 7
 
 BROKER_URL = 'redis://localhost:6379/1'
 CELERY_RESULT_BACKEND = 'redis://localhost:6379/1'
+CELERY_ALWAYS_EAGER = TESTING
+CELERYBEAT_SCHEDULE = {
+    'trim-activity-log': {
+        'task': 'inthe_am.taskmanager.tasks.trim_activity_log',
+        'schedule': crontab(hour=4, minute=0),
+    },
+    'replenish-key-pool': {
+        'task': 'inthe_am.taskmanager.tasks.replenish_key_pool',
+        'schedule': crontab(minute='*/10'),
+    },
+}
 
 # Sourced from environment:
 #  SOCIAL_AUTH_GOOGLE_OAUTH2_KEY
@@ -220,6 +302,7 @@ CELERY_RESULT_BACKEND = 'redis://localhost:6379/1'
 #  TASKD_SIGNING_TEMPLATE
 #  TASK_BINARY
 #  RAVEN_DSN
+#  METRICS_TOKEN
 this_module = sys.modules[__name__]
 for key, value in os.environ.items():
     if key.startswith(ENVIRONMENT_SETTING_PREFIX):
@@ -1,6 +1,8 @@
 from django.contrib import admin
 
-from .models import TaskStore, TaskStoreActivityLog, UserMetadata
+from .models import (
+    TaskStore, TaskStoreActivityLog, TaskStoreLockStatistics, UserMetadata
+)
 
 
 class TaskStoreAdmin(admin.ModelAdmin):
@@ -18,7 +20,7 @@ class TaskStoreActivityLogAdmin(admin.ModelAdmin):
         'username', 'last_seen', 'created', 'error', 'message', 'count'
     )
     date_hierarchy = 'last_seen'
-    list_filter = ('created', 'last_seen', )
+    list_filter = ('created', 'last_seen', 'error', 'rollup', )
     list_select_related = True
     ordering = ('-last_seen', )
 
@@ -30,6 +32,30 @@ class TaskStoreActivityLogAdmin(admin.ModelAdmin):
 admin.site.register(TaskStoreActivityLog, TaskStoreActivityLogAdmin)
 
 
+class TaskStoreLockStatisticsAdmin(admin.ModelAdmin):
+    search_fields = ('store__user__username', 'last_operation', )
+    list_display = (
+        'username', 'acquisitions', 'timeouts', 'errors', 'mean_wait',
+        'max_wait', 'mean_hold', 'max_hold', 'last_operation',
+        'last_outcome', 'updated',
+    )
+    list_filter = ('last_outcome', 'updated', )
+    list_select_related = True
+    ordering = ('-total_wait', )
+    readonly_fields = (
+        'store', 'acquisitions', 'errors', 'timeouts', 'total_wait',
+        'max_wait', 'total_hold', 'max_hold', 'last_operation',
+        'last_function', 'last_outcome', 'updated',
+    )
+
+    def username(self, obj):
+        return obj.store.user.username
+    username.short_description = 'Username'
+
+
+admin.site.register(TaskStoreLockStatistics, TaskStoreLockStatisticsAdmin)
+
+
 class UserMetadataAdmin(admin.ModelAdmin):
     search_fields = ('user__username', )
     list_display = ('user', 'tos_version', 'tos_accepted', )
@@ -1,4 +1,5 @@
 import datetime
+import hashlib
 import json
 import logging
 import operator
@@ -10,9 +11,9 @@ import uuid
 from tastypie import (
     authentication, authorization, bundle, exceptions, fields, resources
 )
+from tastypie.utils.mime import build_content_type
 from twilio.twiml import Response
 from twilio.util import RequestValidator
-from lockfile import LockTimeout
 
 from django.conf import settings
 from django.conf.urls import url
@@ -21,14 +22,19 @@ from django.core.urlresolvers import reverse
 from django.http import (
     HttpResponse, HttpResponseBadRequest,
     HttpResponseNotAllowed, HttpResponseNotFound,
-    HttpResponseForbidden,
+    HttpResponseForbidden, HttpResponseNotModified, StreamingHttpResponse,
 )
+from django.utils.http import http_date
 from django.utils.timezone import now
 
 from . import models
 from . import forms
 from .context_managers import git_checkpoint
 from .decorators import requires_task_store, git_managed
+from .locks import get_lock, LockTimeout
+from .paginators import KeysetPaginator
+from .profiling import timed
+from .serializers import CompiledTaskSerializer, dumps, stream_json
 from .task import Task
 
 
@@ -140,6 +146,7 @@ class UserResource(resources.ModelResource):
     def reset_taskd_configuration(self, request, store=None, **kwargs):
         if request.method != 'POST':
             raise HttpResponseNotAllowed(request.method)
+        store.issue_certificate()
         store.taskrc.update({
             'taskd.certificate': os.path.join(
                 store.local_path,
@@ -331,6 +338,7 @@ class UserResource(resources.ModelResource):
                 ),
                 'email': request.user.email,
                 'configured': store.configured,
+                'provisioning_state': store.provisioning_state,
                 'taskd_credentials': store.taskrc.get('taskd.credentials'),
                 'taskd_server': store.taskrc.get('taskd.server'),
                 'taskd_files': store.taskd_certificate_status,
@@ -348,7 +356,11 @@ class UserResource(resources.ModelResource):
                     }
                 ),
                 'colorscheme': meta.colorscheme,
-                'repository_head': store.repository.head(),
+                'repository_head': (
+                    store.repository.head()
+                    if store.configured and not store.provisioning
+                    else None
+                ),
                 'pebble_card_url': reverse(
                     'pebble_card_url',
                     kwargs={
@@ -381,6 +393,7 @@ class UserResource(resources.ModelResource):
 
 class TaskResource(resources.Resource):
     TASK_TYPE = 'pending'
+    COMMIT_MATCHER = re.compile(r'^[0-9a-f]{40}$')
 
     id = fields.IntegerField(attribute='id', null=True)
     uuid = fields.CharField(attribute='uuid')
@@ -410,6 +423,13 @@ class TaskResource(resources.Resource):
                 ),
                 self.wrap_view('autoconfigure')
             ),
+            url(
+                r"^(?P<resource_name>%s)/changes/?$" % (
+                    self._meta.resource_name
+                ),
+                self.wrap_view('changes'),
+                name='task_changes',
+            ),
             url(
                 r"^(?P<resource_name>%s)/(?P<username>[\w\d_.-]+)/sms/?$" % (
                     self._meta.resource_name
@@ -452,26 +472,35 @@ class TaskResource(resources.Resource):
 
     def manage_lock(self, request, **kwargs):
         store = models.TaskStore.get_for_user(request.user)
-        lockfile = os.path.join(store.local_path, '.lock')
+        lock = get_lock(store)
         if request.method == 'DELETE':
-            if os.path.exists(lockfile):
-                os.unlink(lockfile)
-                store.log_message("Lockfile deleted.")
+            if lock.break_lock():
+                store.log_message("Lock released.")
                 return HttpResponse(
                     '',
                     status=200
                 )
+            if lock.is_locked():
+                store.log_error(
+                    "Attempted to release lock, but it is held by a "
+                    "running process; it will be released automatically "
+                    "once that process finishes."
+                )
+                return HttpResponse(
+                    json.dumps({'owner': lock.get_owner()}),
+                    status=409
+                )
             store.log_error(
-                "Attempted to delete lockfile, but repository was not locked."
+                "Attempted to release lock, but repository was not locked."
             )
             return HttpResponse(
                 '',
                 status=404
             )
         elif request.method == 'GET':
-            if os.path.exists(lockfile):
+            if lock.is_locked():
                 return HttpResponse(
-                    '',
+                    json.dumps({'owner': lock.get_owner()}),
                     status=200
                 )
             return HttpResponse(
@@ -480,6 +509,77 @@ class TaskResource(resources.Resource):
             )
         raise HttpResponseNotAllowed(request.method)
 
+    def changes(self, request, **kwargs):
+        """ Returns tasks changed or deleted since a given repository head.
+
+        Changes are computed from the diff between the ``since`` commit
+        and the current repository head; tasks that no longer exist or
+        have been deleted are listed by UUID in ``deleted``.
+
+        """
+        self.method_check(request, allowed=['get'])
+        self.is_authenticated(request)
+        self.throttle_check(request)
+
+        store = models.TaskStore.get_for_user(request.user)
+        since = request.GET.get('since', '')
+        head = store.repository.head()
+        if (
+            not self.COMMIT_MATCHER.match(since)
+            or str(since) not in store.repository
+        ):
+            raise exceptions.ImmediateHttpResponse(
+                HttpResponseBadRequest(
+                    json.dumps(
+                        {
+                            'error_message': (
+                                'Parameter \'since\' must be a known '
+                                'repository head.'
+                            )
+                        }
+                    ),
+                    content_type='application/json',
+                )
+            )
+
+        changed_ids = store.get_changed_task_ids(since, head)
+        tasks = []
+        objects = []
+        deleted = set(changed_ids)
+        if changed_ids:
+            # Read from the same commit the changes were computed against
+            client = store.get_snapshot_client(head)
+            all_tasks = client.load_tasks()
+            for task_json in all_tasks['pending'] + all_tasks['completed']:
+                if task_json['uuid'] not in changed_ids:
+                    continue
+                if task_json['status'] == 'deleted':
+                    continue
+                deleted.discard(task_json['uuid'])
+                tasks.append(
+                    Task(task_json, store.taskrc, store=store, client=client)
+                )
+            Task.decode_dates(tasks)
+            for task in tasks:
+                objects.append(
+                    self.full_dehydrate(
+                        self.build_bundle(obj=task, request=request)
+                    )
+                )
+
+        self.log_throttled_access(request)
+        return self.create_response(
+            request,
+            {
+                'meta': {
+                    'since': since,
+                    'head': head,
+                },
+                'objects': objects,
+                'deleted': sorted(deleted),
+            }
+        )
+
     def pebble_card(self, request, secret_id, **kwargs):
         if request.method != 'GET':
             return HttpResponseNotAllowed(request.method)
@@ -488,26 +588,16 @@ class TaskResource(resources.Resource):
         except:
             return HttpResponseNotFound()
 
-        pending_tasks = store.client.load_tasks()['pending']
-
-        pending_tasks = sorted(
-            filter(
-                lambda d: d['status'] == 'pending',
-                pending_tasks,
-            ),
-            key=lambda d: float(d['urgency']),
-            reverse=True
-        )
-
-        response = {
-            'content': pending_tasks[0]['description'],
-            'refresh_frequency': 15
-        }
-
-        return HttpResponse(
-            json.dumps(response),
-            content_type='application/json',
-        )
+        card = store.get_pebble_card()
+        if request.META.get('HTTP_IF_NONE_MATCH') == card['etag']:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(
+                card['body'],
+                content_type='application/json',
+            )
+        response['ETag'] = card['etag']
+        return response
 
     @requires_task_store
     @git_managed("Start task", sync=True)
@@ -666,6 +756,143 @@ class TaskResource(resources.Resource):
     def _get_store(self, user):
         return user.task_stores.get()
 
+    def _get_conditional_response(self, view, request, **kwargs):
+        """ Wraps a read-only view with ETag/Last-Modified handling.
+
+        The ETag is derived from the store's repository head, so a
+        matching ``If-None-Match`` is answered with a 304 without
+        running Taskwarrior.  ``Last-Modified`` is informational only;
+        commit times have a resolution of one second, which is too
+        coarse to validate against.
+
+        """
+        store = models.TaskStore.get_for_user(request.user)
+        try:
+            head = store.repository.head()
+        except KeyError:
+            # Repository has no commits yet
+            return view(request, **kwargs)
+
+        etag = '"%s"' % hashlib.md5(
+            ':'.join([
+                head,
+                self._meta.resource_name,
+                request.get_full_path(),
+                request.META.get('HTTP_ACCEPT', ''),
+            ])
+        ).hexdigest()
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = view(request, **kwargs)
+            if response.status_code != 200:
+                return response
+            response['Last-Modified'] = http_date(
+                store.repository[head].commit_time
+            )
+        response['ETag'] = etag
+        return response
+
+    @property
+    def compiled_serializer(self):
+        if not hasattr(self, '_compiled_serializer'):
+            self._compiled_serializer = CompiledTaskSerializer(self)
+        return self._compiled_serializer
+
+    def get_requested_fields(self, request):
+        """ Returns the set of field names listed in the ``fields``
+        parameter, or None if it was not given.
+
+        """
+        value = request.GET.get('fields') if request else None
+        if not value:
+            return None
+        requested = set(
+            name.strip() for name in value.split(',') if name.strip()
+        )
+        unknown = requested - set(self.fields.keys())
+        if unknown:
+            raise exceptions.BadRequest(
+                "Unknown field(s) requested: %s." % (
+                    ', '.join(sorted(unknown))
+                )
+            )
+        return requested
+
+    def full_dehydrate(self, bundle, for_list=False):
+        with timed('dehydrate'):
+            bundle.data.update(
+                self.compiled_serializer.serialize(
+                    bundle.obj,
+                    fields=self.get_requested_fields(bundle.request),
+                )
+            )
+            return bundle
+
+    def serialize(self, request, data, format, options=None):
+        with timed('serialize'):
+            return super(TaskResource, self).serialize(
+                request, data, format, options
+            )
+
+    def get_list(self, request, **kwargs):
+        return self._get_conditional_response(
+            self._get_list, request, **kwargs
+        )
+
+    def _get_list(self, request, **kwargs):
+        """ Streams JSON lists, sending each task's encoding as it is
+        rather than joining them into the whole page first.
+
+        Tasks are encoded before the response is returned, so that a
+        failure is handled as usual rather than truncating a response
+        already sent.  Other formats are serialized by tastypie as usual.
+
+        """
+        desired_format = self.determine_format(request)
+        if desired_format != 'application/json':
+            return super(TaskResource, self).get_list(request, **kwargs)
+        fields = self.get_requested_fields(request)
+
+        base_bundle = self.build_bundle(request=request)
+        objects = self.obj_get_list(
+            bundle=base_bundle, **self.remove_api_resource_names(kwargs)
+        )
+        sorted_objects = self.apply_sorting(objects, options=request.GET)
+        paginator = self._meta.paginator_class(
+            request.GET,
+            sorted_objects,
+            resource_uri=self.get_resource_uri(),
+            limit=self._meta.limit,
+            max_limit=self._meta.max_limit,
+            collection_name=self._meta.collection_name,
+        )
+        page = paginator.page()
+        page_objects = page.pop(self._meta.collection_name)
+        items = self._encode_list_items(page_objects, fields)
+
+        return StreamingHttpResponse(
+            stream_json(
+                self._meta.serializer.to_simple(page, {}),
+                self._meta.collection_name,
+                items,
+            ),
+            content_type=build_content_type(desired_format),
+        )
+
+    def _encode_list_items(self, objects, fields=None):
+        serializer = self.compiled_serializer
+        with timed('dehydrate'):
+            return [
+                dumps(serializer.serialize(obj, fields=fields))
+                for obj in objects
+            ]
+
+    def get_detail(self, request, **kwargs):
+        return self._get_conditional_response(
+            super(TaskResource, self).get_detail, request, **kwargs
+        )
+
     def detail_uri_kwargs(self, bundle_or_obj):
         kwargs = {}
 
@@ -687,7 +914,7 @@ class TaskResource(resources.Resource):
         else:
             order_bits = options.get(parameter_name)
 
-            if not isinstance(order_bits, list, tuple):
+            if not isinstance(order_bits, (list, tuple)):
                 order_bits = [order_bits]
 
         if not order_bits:
@@ -734,9 +961,12 @@ class TaskResource(resources.Resource):
             filters = bundle.request.GET.copy()
         filters.update(kwargs)
 
+        # Reads are served from the last commit, so they neither wait
+        # for nor observe mutations in progress.
+        client = store.get_snapshot_client()
         objects = []
-        for task_json in store.client.load_tasks()[self.TASK_TYPE]:
-            task = Task(task_json, store.taskrc, store=store)
+        for task_json in client.load_tasks()[self.TASK_TYPE]:
+            task = Task(task_json, store.taskrc, store=store, client=client)
             if self.passes_filters(task, filters):
                 objects.append(task)
 
@@ -744,11 +974,13 @@ class TaskResource(resources.Resource):
 
     @requires_task_store
     def obj_get(self, bundle, store, **kwargs):
+        client = store.get_snapshot_client()
         try:
             return Task(
-                store.client.get_task(uuid=kwargs['pk'])[1],
+                client.get_task(uuid=kwargs['pk'])[1],
                 store.taskrc,
                 store=store,
+                client=client,
             )
         except ValueError:
             raise exceptions.NotFound()
@@ -829,16 +1061,45 @@ class TaskResource(resources.Resource):
                 ),
                 status=403
             )
+        if request.user.is_authenticated():
+            store = models.TaskStore.get_for_user(request.user)
+            if store.provisioning_state != 'failed':
+                # Not yet queued, or abandoned part-way through
+                store.queue_provisioning()
+            if store.provisioning:
+                response = HttpResponse(
+                    json.dumps(
+                        {
+                            'error_message': (
+                                'Your account is still being set up; '
+                                'please try again in a moment.'
+                            )
+                        }
+                    ),
+                    status=503
+                )
+                response['Retry-After'] = 5
+                return response
         try:
             return super(TaskResource, self).dispatch(
                 request_type, request, *args, **kwargs
             )
-        except LockTimeout:
+        except LockTimeout as e:
             message = (
                 'Your task list is currently in use; please try again later.'
             )
             store = models.TaskStore.get_for_user(request.user)
             store.log_error(message)
+            logger.warning(
+                'Lock timeout for %s; lock held by %s.',
+                store,
+                e.owner,
+                extra={
+                    'data': {
+                        'owner': e.owner,
+                    }
+                }
+            )
             return HttpResponse(
                 json.dumps(
                     {
@@ -907,7 +1168,10 @@ class CompletedTaskResource(TaskResource):
 class ActivityLogResource(resources.ModelResource):
     class Meta:
         resource_name = 'activitylog'
-        queryset = models.TaskStoreActivityLog.objects.order_by('-last_seen')
+        queryset = models.TaskStoreActivityLog.objects.order_by(
+            '-last_seen', '-id'
+        )
+        paginator_class = KeysetPaginator
         authorization = TaskStoreAuthorization()
         list_allowed_methods = ['get']
         detail_allowed_methods = ['get']
@@ -0,0 +1,375 @@
+from contextlib import contextmanager
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.http import QueryDict
+from django.test.client import RequestFactory
+import mock
+
+from . import models
+from .api import TaskResource
+from .context_managers import git_checkpoint
+from .views import Status
+
+
+BASE_TIMESTAMP = 1400000000
+PROJECTS = ('Home', 'Work', 'Garden', 'Taxes', 'Reading', )
+TAGS = ('next', 'waiting', 'phone', 'errand', 'computer', 'someday', )
+PRIORITIES = ('H', 'M', 'L', '', )
+WORDS = (
+    'call', 'write', 'review', 'plan', 'fix', 'order', 'clean', 'email',
+    'schedule', 'research', 'report', 'invoice', 'draft', 'book', 'ship',
+)
+UDAS = {
+    'estimate': ('numeric', 'Estimate'),
+    'client': ('string', 'Client'),
+}
+
+
+def escape_ff4(value):
+    return (
+        unicode(value).replace('"', '&dquot;')
+        .replace('[', '&open;')
+        .replace(']', '&close;')
+    )
+
+
+def format_ff4(task):
+    """ Formats a task as a line of a Taskwarrior data file. """
+    return u'[%s]\n' % u' '.join(
+        u'%s:"%s"' % (key, escape_ff4(value))
+        for key, value in sorted(task.items())
+    )
+
+
+def generate_tasks(count, completed_ratio=0.3, seed=0):
+    """ Generates ``count`` synthetic tasks.
+
+    Tasks carry projects, tags, priorities, due dates, annotations,
+    UDAs and dependencies on earlier pending tasks.  The same seed
+    always produces the same tasks.
+
+    Returns a 2-tuple of pending and completed task lists.
+
+    """
+    rng = random.Random(seed)
+    pending, completed = [], []
+    for idx in range(count):
+        entry = BASE_TIMESTAMP + idx * 60
+        task = {
+            'uuid': str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            'description': ' '.join(
+                rng.choice(WORDS) for _ in range(rng.randint(2, 8))
+            ),
+            'entry': entry,
+            'modified': entry + rng.randint(0, 86400),
+            'project': rng.choice(PROJECTS),
+        }
+        tags = rng.sample(TAGS, rng.randint(0, 3))
+        if tags:
+            task['tags'] = ','.join(tags)
+        priority = rng.choice(PRIORITIES)
+        if priority:
+            task['priority'] = priority
+        if rng.random() < 0.4:
+            task['due'] = entry + rng.randint(86400, 86400 * 60)
+        for offset in range(rng.randint(0, 3)):
+            task['annotation_%s' % (entry + offset + 1)] = ' '.join(
+                rng.choice(WORDS) for _ in range(rng.randint(3, 12))
+            )
+        if rng.random() < 0.3:
+            task['estimate'] = rng.randint(1, 16)
+        if rng.random() < 0.3:
+            task['client'] = rng.choice(PROJECTS)
+
+        if rng.random() < completed_ratio:
+            task['status'] = 'completed'
+            task['end'] = task['modified']
+            completed.append(task)
+        else:
+            task['status'] = 'pending'
+            if pending and rng.random() < 0.1:
+                task['depends'] = ','.join(
+                    dependency['uuid'] for dependency in
+                    rng.sample(pending, min(len(pending), rng.randint(1, 3)))
+                )
+            pending.append(task)
+    return pending, completed
+
+
+def write_tasks(path, pending, completed):
+    for filename, tasks in (
+        ('pending.data', pending), ('completed.data', completed),
+    ):
+        with open(os.path.join(path, filename), 'w') as out:
+            for task in tasks:
+                out.write(format_ff4(task).encode('utf-8'))
+
+
+@contextmanager
+def synthetic_store(count, seed=0):
+    """ Creates a throwaway user and task store holding ``count``
+    synthetic tasks.
+
+    The store is not connected to taskd; synchronization is replaced
+    with a no-op while the context is active.  Everything created in
+    the database is rolled back afterwards.
+
+    """
+    local_path = tempfile.mkdtemp()
+    store = None
+    post_save.disconnect(models.autoconfigure_taskd_for_user, sender=User)
+    try:
+        with rollback():
+            user = User.objects.create_user(
+                'benchmark-%s' % uuid.uuid4().hex[0:16],
+                'benchmark@localhost',
+            )
+            store = models.TaskStore.objects.create(
+                user=user,
+                local_path=local_path,
+            )
+            taskrc = {
+                'data.location': local_path,
+                'confirmation': 'no',
+            }
+            for uda, (uda_type, label) in UDAS.items():
+                taskrc['uda.%s.type' % uda] = uda_type
+                taskrc['uda.%s.label' % uda] = label
+            store.taskrc.update(taskrc)
+            write_tasks(local_path, *generate_tasks(count, seed=seed))
+            store.create_git_checkpoint('Synthetic store created')
+
+            with mock.patch.object(
+                models.TaskStore, 'sync', lambda self, *args, **kwargs: None
+            ):
+                yield store
+    finally:
+        post_save.connect(models.autoconfigure_taskd_for_user, sender=User)
+        shutil.rmtree(local_path)
+        if store is not None:
+            shutil.rmtree(store.snapshot_path, ignore_errors=True)
+
+
+class Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rollback():
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+def summarize(durations):
+    durations = sorted(durations)
+    count = len(durations)
+    return {
+        'runs': count,
+        'min': durations[0],
+        'max': durations[-1],
+        'mean': sum(durations) / count,
+        'median': durations[count // 2],
+        'p95': durations[min(count - 1, int(count * 0.95))],
+    }
+
+
+def measure(function, repeat, setup=None):
+    """ Times ``repeat`` calls of ``function``, each given the arguments
+    returned by an untimed call of ``setup``, if any.
+
+    """
+    durations = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        started = time.time()
+        function(*args)
+        durations.append(time.time() - started)
+    return summarize(durations)
+
+
+class StoreBenchmark(object):
+    """ Times the task resource, checkpoint and status operations
+    against a single synthetic store.
+
+    """
+    BENCHMARKS = (
+        'obj_get_list',
+        'obj_get',
+        'obj_update',
+        'apply_sorting',
+        'passes_filters',
+        'git_checkpoint',
+        'get_changed_ids',
+    )
+
+    def __init__(self, store, seed=0):
+        self.store = store
+        self.rng = random.Random(seed)
+        self.resource = TaskResource()
+        self.tasks = self.resource.obj_get_list(self.get_bundle_for('get'))
+
+    def get_bundle_for(self, method, path='/api/v1/task/', data=None):
+        request = getattr(RequestFactory(), method)(path)
+        request.user = self.store.user
+        return self.resource.build_bundle(data=data, request=request)
+
+    def get_random_task(self):
+        return self.rng.choice(self.tasks)
+
+    def obj_get_list(self):
+        self.resource.obj_get_list(self.get_bundle_for('get'))
+
+    def obj_get(self):
+        self.resource.obj_get(
+            self.get_bundle_for('get'),
+            pk=self.get_random_task().uuid,
+        )
+
+    def obj_update(self):
+        task = self.get_random_task()
+        data = {
+            'uuid': task.uuid,
+            'description': task.description,
+            'project': self.rng.choice(PROJECTS),
+            'annotations': None,
+        }
+        self.resource.obj_update(
+            self.get_bundle_for('put', data=data),
+            pk=task.uuid,
+        )
+
+    def apply_sorting(self):
+        self.resource.apply_sorting(
+            self.tasks,
+            QueryDict('order_by=-urgency&order_by=project'),
+        )
+
+    def passes_filters(self):
+        filters = {'status': 'pending', 'project': 'Work'}
+        for task in self.tasks:
+            self.resource.passes_filters(task, filters)
+
+    def git_checkpoint(self):
+        with git_checkpoint(self.store, 'Benchmark'):
+            with open(
+                os.path.join(self.store.local_path, 'benchmark'), 'w'
+            ) as out:
+                out.write(str(time.time()))
+
+    def setup_get_changed_ids(self):
+        head = self.store.repository.head()
+        self.obj_update()
+        return head, self.store.repository.head()
+
+    def get_changed_ids(self, head, new_head):
+        Status().get_changed_ids(self.store, head, new_head)
+
+    def run(self, benchmarks=None, repeat=5):
+        results = {}
+        for name in benchmarks or self.BENCHMARKS:
+            results[name] = measure(
+                getattr(self, name),
+                repeat,
+                setup=getattr(self, 'setup_%s' % name, None),
+            )
+        return results
+
+
+def get_environment():
+    try:
+        revision = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(__file__),
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    try:
+        task_version = subprocess.check_output(
+            ['task', '--version']
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        task_version = None
+    return {
+        'revision': revision,
+        'host': socket.gethostname(),
+        'python': platform.python_version(),
+        'task': task_version,
+    }
+
+
+def load_results(path):
+    if not os.path.isfile(path):
+        return []
+    with open(path, 'r') as results_file:
+        return [json.loads(line) for line in results_file if line.strip()]
+
+
+def save_results(path, results):
+    directory = os.path.dirname(path)
+    if directory and not os.path.isdir(directory):
+        os.makedirs(directory)
+    with open(path, 'a') as results_file:
+        for result in results:
+            results_file.write(json.dumps(result, sort_keys=True) + '\n')
+
+
+def find_regressions(previous_results, results, threshold):
+    """ Compares ``results`` with the most recent earlier result for the
+    same benchmark and store size.
+
+    Returns a list of ``(result, previous_result)`` pairs whose median
+    grew by more than ``threshold`` (a fraction).
+
+    """
+    latest = {}
+    for result in previous_results:
+        latest[(result['benchmark'], result['size'])] = result
+
+    regressions = []
+    for result in results:
+        previous = latest.get((result['benchmark'], result['size']))
+        if previous is None:
+            continue
+        if result['median'] > previous['median'] * (1 + threshold):
+            regressions.append((result, previous, ))
+    return regressions
+
+
+def run(sizes, benchmarks=None, repeat=5, seed=0):
+    environment = get_environment()
+    timestamp = datetime.datetime.utcnow().isoformat()
+    results = []
+    for size in sizes:
+        with synthetic_store(size, seed=seed) as store:
+            measured = StoreBenchmark(store, seed=seed).run(
+                benchmarks=benchmarks,
+                repeat=repeat,
+            )
+        for benchmark, stats in sorted(measured.items()):
+            result = {
+                'timestamp': timestamp,
+                'benchmark': benchmark,
+                'size': size,
+                'seed': seed,
+            }
+            result.update(environment)
+            result.update(stats)
+            results.append(result)
+    return results
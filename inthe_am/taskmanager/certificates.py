@@ -0,0 +1,203 @@
+import datetime
+import os
+import uuid
+
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import ExtendedKeyUsageOID, NameOID
+
+from django.conf import settings
+
+
+TEMPLATE_NAME_ATTRIBUTES = {
+    'cn': NameOID.COMMON_NAME,
+    'organization': NameOID.ORGANIZATION_NAME,
+    'unit': NameOID.ORGANIZATIONAL_UNIT_NAME,
+    'locality': NameOID.LOCALITY_NAME,
+    'state': NameOID.STATE_OR_PROVINCE_NAME,
+    'country': NameOID.COUNTRY_NAME,
+}
+
+_authorities = {}
+
+
+def write_private_file(path, contents):
+    """ Writes ``contents`` to ``path`` readable only by the owner. """
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w') as out:
+        out.write(contents)
+
+
+def read_template(path):
+    """ Reads the subset of a certtool template that applies to taskd
+    client certificates.
+
+    """
+    template = {}
+    if not path or not os.path.isfile(path):
+        return template
+    with open(path, 'r') as template_file:
+        for raw_line in template_file.readlines():
+            line = raw_line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if '=' in line:
+                key, value = line.split('=', 1)
+                template[key.strip()] = value.strip().strip('"')
+            else:
+                template[line] = True
+    return template
+
+
+class CertificateAuthority(object):
+    def __init__(self, key_path, cert_path, template_path=None):
+        with open(key_path, 'rb') as key_file:
+            self.key = serialization.load_pem_private_key(
+                key_file.read(),
+                password=None,
+                backend=default_backend(),
+            )
+        with open(cert_path, 'rb') as cert_file:
+            self.certificate = x509.load_pem_x509_certificate(
+                cert_file.read(),
+                backend=default_backend(),
+            )
+        if template_path is None:
+            template_path = getattr(settings, 'TASKD_SIGNING_TEMPLATE', None)
+        self.template = read_template(template_path)
+
+    def get_subject(self):
+        attributes = []
+        for key, oid in TEMPLATE_NAME_ATTRIBUTES.items():
+            if key in self.template:
+                attributes.append(
+                    x509.NameAttribute(
+                        oid,
+                        self.template[key].decode('utf-8'),
+                    )
+                )
+        if not attributes:
+            attributes.append(
+                x509.NameAttribute(NameOID.COMMON_NAME, u'taskd client')
+            )
+        return x509.Name(attributes)
+
+    def get_expiration(self, issued):
+        days = int(self.template.get('expiration_days', 365))
+        if days < 0:
+            # certtool treats a negative expiration as 'never expires'
+            return datetime.datetime(9999, 12, 31, 23, 59, 59)
+        return issued + datetime.timedelta(days=days)
+
+    def sign(self, private_key_pem):
+        private_key = serialization.load_pem_private_key(
+            private_key_pem,
+            password=None,
+            backend=default_backend(),
+        )
+        issued = datetime.datetime.utcnow()
+        # Without a template, issue a certificate usable for both
+        # signing and encryption as the taskd client templates do.
+        default_usage = not self.template
+        builder = x509.CertificateBuilder().subject_name(
+            self.get_subject()
+        ).issuer_name(
+            self.certificate.subject
+        ).public_key(
+            private_key.public_key()
+        ).serial_number(
+            uuid.uuid4().int
+        ).not_valid_before(
+            issued
+        ).not_valid_after(
+            self.get_expiration(issued)
+        ).add_extension(
+            x509.BasicConstraints(ca=False, path_length=None),
+            critical=True,
+        ).add_extension(
+            x509.KeyUsage(
+                digital_signature=(
+                    default_usage or 'signing_key' in self.template
+                ),
+                content_commitment=False,
+                key_encipherment=(
+                    default_usage or 'encryption_key' in self.template
+                ),
+                data_encipherment=False,
+                key_agreement=False,
+                key_cert_sign=False,
+                crl_sign=False,
+                encipher_only=False,
+                decipher_only=False,
+            ),
+            critical=True,
+        ).add_extension(
+            x509.ExtendedKeyUsage([ExtendedKeyUsageOID.CLIENT_AUTH]),
+            critical=False,
+        )
+        certificate = builder.sign(
+            self.key,
+            hashes.SHA256(),
+            default_backend(),
+        )
+        return certificate.public_bytes(serialization.Encoding.PEM)
+
+
+def get_authority(ca_key_path, ca_cert_path):
+    """ Returns a (cached) certificate authority for the given files.
+
+    The cache is keyed on the files' modification times, so replacing
+    the CA on disk takes effect without a restart.
+
+    """
+    cache_key = (
+        ca_key_path,
+        os.path.getmtime(ca_key_path),
+        ca_cert_path,
+        os.path.getmtime(ca_cert_path),
+    )
+    if cache_key not in _authorities:
+        _authorities.clear()
+        _authorities[cache_key] = CertificateAuthority(
+            ca_key_path,
+            ca_cert_path,
+        )
+    return _authorities[cache_key]
+
+
+def generate_private_key():
+    private_key = rsa.generate_private_key(
+        public_exponent=65537,
+        key_size=int(settings.TASKD_PRIVATE_KEY_BITS),
+        backend=default_backend(),
+    )
+    return private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption(),
+    )
+
+
+def generate_certificate(private_key_path, ca_key_path, ca_cert_path):
+    with open(private_key_path, 'rb') as private_key:
+        return get_authority(ca_key_path, ca_cert_path).sign(
+            private_key.read()
+        )
+
+
+def issue(count, ca_key_path, ca_cert_path):
+    """ Generates ``count`` private keys and matching certificates.
+
+    Returns a list of ``(private_key, certificate)`` PEM pairs.
+
+    """
+    authority = get_authority(ca_key_path, ca_cert_path)
+    issued = []
+    for _ in range(count):
+        private_key = generate_private_key()
+        issued.append(
+            (private_key, authority.sign(private_key), )
+        )
+    return issued
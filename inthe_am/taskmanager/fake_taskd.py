@@ -0,0 +1,444 @@
+""" A stand-in for taskd speaking the Taskserver sync protocol over TLS.
+
+Accounts and their ``tx.data`` files are laid out as taskd lays them out
+under its data directory, so ``TaskStore.taskd_data_path`` and the status
+stream's modification time checks work unchanged.  Unlike taskd, changes
+to the same task from different clients are not merged; the version
+uploaded most recently wins.
+
+"""
+import datetime
+import ipaddress
+import json
+import logging
+import os
+import random
+import socket
+import SocketServer
+import ssl
+import struct
+import threading
+import time
+import uuid
+
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.x509.oid import NameOID
+
+from . import certificates
+
+
+logger = logging.getLogger(__name__)
+
+
+# Usable as ``TASKD_BINARY``; runs this module's management command.
+BINARY = os.path.abspath(
+    os.path.join(
+        os.path.dirname(__file__), '..', '..', 'scripts', 'fake_taskd'
+    )
+)
+
+REQUEST_LIMIT = 1048576
+
+STATUSES = {
+    200: 'Ok',
+    201: 'No change',
+    202: 'Decline',
+    430: 'Access denied',
+    431: 'Account suspended',
+    500: 'Syntax error in request',
+    501: 'Syntax error, illegal parameters',
+    502: 'Not implemented',
+    504: 'Request too big',
+}
+
+
+class SyncError(Exception):
+    def __init__(self, code, message=None):
+        self.code = code
+        super(SyncError, self).__init__(message or STATUSES.get(code, ''))
+
+
+#  Wire format
+
+
+def encode_message(headers, body=''):
+    payload = ''.join(
+        '%s: %s\n' % (key, value) for key, value in sorted(headers.items())
+    ) + '\n' + body
+    return struct.pack('>I', len(payload) + 4) + payload
+
+
+def decode_message(payload):
+    head, _, body = payload.partition('\n\n')
+    headers = {}
+    for line in head.split('\n'):
+        if ':' in line:
+            key, value = line.split(':', 1)
+            headers[key.strip()] = value.strip()
+    return headers, body
+
+
+def read_exactly(connection, size):
+    data = ''
+    while len(data) < size:
+        chunk = connection.recv(size - len(data))
+        if not chunk:
+            raise SyncError(500, 'Connection closed mid-message.')
+        data += chunk
+    return data
+
+
+def read_message(connection, limit=REQUEST_LIMIT):
+    size, = struct.unpack('>I', read_exactly(connection, 4))
+    if size > limit:
+        raise SyncError(504)
+    return read_exactly(connection, size - 4)
+
+
+#  Data directory
+
+
+def read_config(path):
+    config = {}
+    if not os.path.isfile(path):
+        return config
+    with open(path, 'r') as config_file:
+        for line in config_file:
+            if line.startswith('#') or '=' not in line:
+                continue
+            key, value = line.split('=', 1)
+            config[key.strip()] = value.strip()
+    return config
+
+
+def get_user_path(data_path, org, key):
+    return os.path.join(data_path, 'orgs', org, 'users', key)
+
+
+def add_user(data_path, org, username):
+    """ Creates an account and returns its key. """
+    key = str(uuid.uuid4())
+    path = get_user_path(data_path, org, key)
+    os.makedirs(path)
+    with open(os.path.join(path, 'config'), 'w') as out:
+        out.write('user=%s\n' % username)
+    return key
+
+
+def authenticate(data_path, org, username, key):
+    try:
+        key = str(uuid.UUID(key))
+    except (TypeError, ValueError):
+        return None
+    if not org or '/' in org or org.startswith('.'):
+        return None
+    path = get_user_path(data_path, org, key)
+    config = read_config(os.path.join(path, 'config'))
+    if config.get('user') != username:
+        return None
+    return path
+
+
+def _create_certificate(subject, issuer, public_key, signing_key, days,
+                        extensions):
+    issued = datetime.datetime.utcnow()
+    builder = x509.CertificateBuilder().subject_name(
+        subject
+    ).issuer_name(
+        issuer
+    ).public_key(
+        public_key
+    ).serial_number(
+        uuid.uuid4().int
+    ).not_valid_before(
+        issued - datetime.timedelta(days=1)
+    ).not_valid_after(
+        issued + datetime.timedelta(days=days)
+    )
+    for extension, critical in extensions:
+        builder = builder.add_extension(extension, critical=critical)
+    return builder.sign(
+        signing_key, hashes.SHA256(), default_backend()
+    ).public_bytes(serialization.Encoding.PEM)
+
+
+def _load_key(pem):
+    return serialization.load_pem_private_key(
+        pem, password=None, backend=default_backend(),
+    )
+
+
+def initialize(data_path, host='localhost', days=365):
+    """ Creates a data directory holding a new certificate authority, a
+    server certificate for ``host`` and a config file.
+
+    """
+    if not os.path.isdir(data_path):
+        os.makedirs(data_path)
+
+    ca_key_pem = certificates.generate_private_key()
+    ca_key = _load_key(ca_key_pem)
+    ca_name = x509.Name([
+        x509.NameAttribute(NameOID.COMMON_NAME, u'fake taskd CA'),
+    ])
+    ca_cert_pem = _create_certificate(
+        ca_name, ca_name, ca_key.public_key(), ca_key, days, [
+            (x509.BasicConstraints(ca=True, path_length=None), True),
+        ]
+    )
+
+    server_key_pem = certificates.generate_private_key()
+    try:
+        alternative_name = x509.IPAddress(
+            ipaddress.ip_address(unicode(host))
+        )
+    except ValueError:
+        alternative_name = x509.DNSName(unicode(host))
+    server_cert_pem = _create_certificate(
+        x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, unicode(host))]),
+        ca_name,
+        _load_key(server_key_pem).public_key(),
+        ca_key,
+        days,
+        [
+            (x509.BasicConstraints(ca=False, path_length=None), True),
+            (x509.SubjectAlternativeName([alternative_name]), False),
+        ]
+    )
+
+    config = {'request.limit': REQUEST_LIMIT}
+    for name, contents in (
+        ('ca.key', ca_key_pem),
+        ('ca.cert', ca_cert_pem),
+        ('server.key', server_key_pem),
+        ('server.cert', server_cert_pem),
+    ):
+        path = os.path.join(data_path, '%s.pem' % name)
+        certificates.write_private_file(path, contents)
+        config[name] = path
+    with open(os.path.join(data_path, 'config'), 'w') as out:
+        for key, value in sorted(config.items()):
+            out.write('%s=%s\n' % (key, value))
+    return config
+
+
+def synchronize(path, client_key, tasks):
+    """ Applies a sync request to the ``tx.data`` file in ``path``.
+
+    Returns a 3-tuple of the response code, the task lines changed
+    since ``client_key`` and the client's new sync key.
+
+    """
+    tx_path = os.path.join(path, 'tx.data')
+    lines = []
+    if os.path.isfile(tx_path):
+        with open(tx_path, 'r') as tx_file:
+            lines = [line.strip() for line in tx_file if line.strip()]
+
+    start = 0
+    if client_key:
+        try:
+            start = lines.index(client_key) + 1
+        except ValueError:
+            raise SyncError(500, 'Client sync key not found.')
+
+    received = {}
+    try:
+        for task in tasks:
+            received[json.loads(task)['uuid']] = task
+    except (ValueError, KeyError, TypeError):
+        raise SyncError(500, 'Could not parse task.')
+
+    changed, order = {}, []
+    for line in lines[start:]:
+        if not line.startswith('{'):
+            continue
+        task_uuid = json.loads(line)['uuid']
+        if task_uuid not in changed:
+            order.append(task_uuid)
+        changed[task_uuid] = line
+    outgoing = [
+        changed[task_uuid] for task_uuid in order
+        if task_uuid not in received
+    ]
+
+    if client_key and not received and not outgoing:
+        return 201, [], client_key
+
+    sync_key = str(uuid.uuid4())
+    with open(tx_path, 'a') as tx_file:
+        for task in tasks:
+            tx_file.write(task + '\n')
+        tx_file.write(sync_key + '\n')
+    return 200, outgoing, sync_key
+
+
+#  Server
+
+
+class SyncRequestHandler(SocketServer.BaseRequestHandler):
+    def setup(self):
+        self.request = self.server.wrap_socket(self.request)
+
+    def handle(self):
+        try:
+            headers, body = decode_message(
+                read_message(self.request, self.server.request_limit)
+            )
+            code, body = self.server.respond(headers, body)
+        except SyncError as e:
+            code, body = e.code, ''
+        self.request.sendall(
+            encode_message(
+                {
+                    'client': 'inthe_am fake_taskd',
+                    'code': code,
+                    'status': STATUSES.get(code, ''),
+                },
+                body,
+            )
+        )
+
+
+class FakeTaskdServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    """ Serves sync requests for the accounts in ``data_path``.
+
+    Every request waits ``latency`` seconds, plus up to ``jitter``
+    seconds more, and a fraction ``error_rate`` of authenticated sync
+    requests fail with ``error_code``.
+
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, data_path, address=('localhost', 53589), latency=0,
+                 jitter=0, error_rate=0, error_code=500):
+        self.data_path = data_path
+        self.host = address[0]
+        self.config = read_config(os.path.join(data_path, 'config'))
+        self.request_limit = int(
+            self.config.get('request.limit', REQUEST_LIMIT)
+        )
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.rng = random.Random()
+        self.user_locks = {}
+        self.user_locks_guard = threading.Lock()
+        SocketServer.TCPServer.__init__(self, address, SyncRequestHandler)
+
+    @property
+    def taskd_server(self):
+        """ The address in ``taskd.server`` form. """
+        # Use the name the server was started with, which is the name
+        # its certificate was issued for, rather than the bound address.
+        return '%s:%s' % (self.host, self.server_address[1])
+
+    def wrap_socket(self, connection):
+        return ssl.wrap_socket(
+            connection,
+            keyfile=self.config['server.key'],
+            certfile=self.config['server.cert'],
+            ca_certs=self.config['ca.cert'],
+            cert_reqs=ssl.CERT_OPTIONAL,
+            server_side=True,
+        )
+
+    def get_user_lock(self, path):
+        with self.user_locks_guard:
+            return self.user_locks.setdefault(path, threading.Lock())
+
+    def respond(self, headers, body):
+        time.sleep(self.latency + self.rng.uniform(0, self.jitter))
+
+        if headers.get('type') != 'sync':
+            raise SyncError(502)
+        path = authenticate(
+            self.data_path,
+            headers.get('org'),
+            headers.get('user'),
+            headers.get('key'),
+        )
+        if path is None:
+            raise SyncError(430)
+        if self.rng.random() < self.error_rate:
+            raise SyncError(self.error_code)
+
+        client_key, tasks = None, []
+        for line in body.split('\n'):
+            line = line.strip()
+            if line.startswith('{'):
+                tasks.append(line)
+            elif line:
+                client_key = line
+
+        with self.get_user_lock(path):
+            code, outgoing, sync_key = synchronize(path, client_key, tasks)
+        logger.debug(
+            'Sync for %s: %s received, %s sent.',
+            headers.get('user'),
+            len(tasks),
+            len(outgoing),
+        )
+        return code, ''.join(line + '\n' for line in outgoing + [sync_key])
+
+    def handle_error(self, request, client_address):
+        logger.exception('Error handling request from %s', client_address)
+
+
+def start(data_path, address=('localhost', 0), **kwargs):
+    """ Starts a server in a background thread and returns it; stop it
+    with ``shutdown`` and ``server_close``.
+
+    """
+    server = FakeTaskdServer(data_path, address, **kwargs)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def send_sync(server, credentials, sync_key=None, tasks=(), ca_cert=None):
+    """ Sends a sync request as another client would.
+
+    Returns a 3-tuple of the response code, the tasks received and the
+    new sync key.
+
+    """
+    org, user, key = credentials.split('/')
+    host, port = server.rsplit(':', 1)
+    connection = ssl.wrap_socket(
+        socket.create_connection((host, int(port))),
+        ca_certs=ca_cert,
+        cert_reqs=ssl.CERT_REQUIRED if ca_cert else ssl.CERT_NONE,
+    )
+    try:
+        lines = [sync_key] if sync_key else []
+        lines.extend(json.dumps(task) for task in tasks)
+        connection.sendall(
+            encode_message(
+                {
+                    'type': 'sync',
+                    'protocol': 'v1',
+                    'org': org,
+                    'user': user,
+                    'key': key,
+                    'client': 'inthe_am fake_taskd',
+                },
+                ''.join(line + '\n' for line in lines),
+            )
+        )
+        headers, body = decode_message(read_message(connection))
+    finally:
+        connection.close()
+
+    received, new_key = [], sync_key
+    for line in body.split('\n'):
+        if line.startswith('{'):
+            received.append(json.loads(line))
+        elif line.strip():
+            new_key = line.strip()
+    return int(headers['code']), received, new_key
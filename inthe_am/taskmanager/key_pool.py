@@ -0,0 +1,172 @@
+from contextlib import contextmanager
+import errno
+import fcntl
+import logging
+import os
+import shutil
+import time
+import uuid
+
+from django.conf import settings
+
+from . import certificates
+
+
+logger = logging.getLogger(__name__)
+
+
+class KeyPool(object):
+    """ A pool of pre-generated private keys (and, optionally, signed
+    certificates) for newly-provisioned taskd accounts.
+
+    Each pool entry is a directory holding ``key.pem`` and, if the pool
+    was filled with a CA, ``certificate.pem``.  Entries are assembled
+    under a hidden temporary name and renamed into place once complete,
+    and are claimed by renaming them out of the pool again, so that no
+    two processes can ever claim the same entry.  Either may be left
+    behind by a process that died part-way through; they're removed by
+    ``replenish`` once older than ``STALE_SECONDS``.
+
+    """
+    KEY_FILENAME = 'key.pem'
+    CERTIFICATE_FILENAME = 'certificate.pem'
+    LOCK_FILENAME = '.lock'
+    STALE_PREFIXES = ('.tmp-', '.claimed-', )
+    STALE_SECONDS = 60 * 60
+
+    def __init__(self, path=None, size=None):
+        self.path = path or settings.TASKD_KEY_POOL_PATH
+        self.size = int(
+            size if size is not None else settings.TASKD_KEY_POOL_SIZE
+        )
+        if not os.path.isdir(self.path):
+            try:
+                os.makedirs(self.path, 0o700)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+
+    def entries(self):
+        return [
+            entry for entry in os.listdir(self.path)
+            if not entry.startswith('.')
+        ]
+
+    def __len__(self):
+        return len(self.entries())
+
+    def add(self, private_key, certificate=None):
+        entry = str(uuid.uuid4())
+        working_path = os.path.join(self.path, '.tmp-%s' % entry)
+        os.mkdir(working_path, 0o700)
+
+        try:
+            certificates.write_private_file(
+                os.path.join(working_path, self.KEY_FILENAME),
+                private_key,
+            )
+            if certificate:
+                certificates.write_private_file(
+                    os.path.join(working_path, self.CERTIFICATE_FILENAME),
+                    certificate,
+                )
+
+            os.rename(working_path, os.path.join(self.path, entry))
+        except Exception:
+            shutil.rmtree(working_path, ignore_errors=True)
+            raise
+        return entry
+
+    @contextmanager
+    def replenishing(self):
+        """ Yields whether this process may replenish the pool; only one
+        may at a time.
+
+        """
+        fd = os.open(
+            os.path.join(self.path, self.LOCK_FILENAME),
+            os.O_RDWR | os.O_CREAT,
+            0o600,
+        )
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError as e:
+                if e.errno not in (errno.EACCES, errno.EAGAIN, ):
+                    raise
+                yield False
+                return
+            yield True
+        finally:
+            os.close(fd)
+
+    def prune(self):
+        """ Removes entries abandoned part-way through being added or
+        claimed.
+
+        """
+        expired = time.time() - self.STALE_SECONDS
+        for entry in os.listdir(self.path):
+            if not entry.startswith(self.STALE_PREFIXES):
+                continue
+            entry_path = os.path.join(self.path, entry)
+            try:
+                if os.path.getmtime(entry_path) >= expired:
+                    continue
+            except OSError:
+                continue
+            logger.warning('Removing stale key pool entry %s.', entry_path)
+            shutil.rmtree(entry_path, ignore_errors=True)
+
+    def replenish(self, ca_key_path=None, ca_cert_path=None):
+        with self.replenishing() as replenishing:
+            if not replenishing:
+                # The pool is being filled by another process already
+                return 0
+            self.prune()
+            needed = max(self.size - len(self), 0)
+            if ca_key_path and ca_cert_path:
+                issued = certificates.issue(
+                    needed, ca_key_path, ca_cert_path
+                )
+            else:
+                issued = [
+                    (certificates.generate_private_key(), None, )
+                    for _ in range(needed)
+                ]
+            for private_key, certificate in issued:
+                self.add(private_key, certificate)
+            return needed
+
+    def claim(self, key_path, certificate_path):
+        """ Moves a pooled key (and certificate, if available) into place.
+
+        Returns a 2-tuple of booleans indicating whether a key and a
+        certificate, respectively, were claimed.
+
+        """
+        for entry in self.entries():
+            claimed_path = os.path.join(self.path, '.claimed-%s' % entry)
+            try:
+                os.rename(os.path.join(self.path, entry), claimed_path)
+            except OSError as e:
+                if e.errno == errno.ENOENT:
+                    # Claimed by another process in the meantime
+                    continue
+                raise
+
+            shutil.move(
+                os.path.join(claimed_path, self.KEY_FILENAME),
+                key_path,
+            )
+            pooled_certificate = os.path.join(
+                claimed_path, self.CERTIFICATE_FILENAME
+            )
+            has_certificate = os.path.isfile(pooled_certificate)
+            if has_certificate:
+                shutil.move(pooled_certificate, certificate_path)
+            shutil.rmtree(claimed_path)
+            return True, has_certificate
+
+        logger.warning('Key pool at %s is empty.', self.path)
+        return False, False
@@ -0,0 +1,400 @@
+import json
+import logging
+import os
+import random
+import time
+import urllib
+import urlparse
+import uuid
+
+import eventlet
+from eventlet.green import httplib
+from twilio.util import RequestValidator
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.utils.importlib import import_module
+from django.utils.timezone import now
+
+from . import models
+
+
+logger = logging.getLogger(__name__)
+
+
+DEFAULT_MIX = {
+    'list': 40,
+    'detail': 25,
+    'update': 15,
+    'complete': 5,
+    'create': 5,
+    'sms': 10,
+}
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class LoadTestUser(object):
+    def __init__(self, username, api_key, session_key, twilio_auth_token):
+        self.username = username
+        self.api_key = api_key
+        self.session_key = session_key
+        self.twilio_auth_token = twilio_auth_token
+        self.task_uuids = []
+
+
+def prepare_users(count, prefix='loadtest'):
+    """ Creates (or reuses) ``count`` users able to use the API, the
+    status stream and the SMS endpoint.
+
+    """
+    engine = import_module(settings.SESSION_ENGINE)
+    users = []
+    for idx in range(count):
+        user, created = User.objects.get_or_create(
+            username='%s-%05d' % (prefix, idx),
+            defaults={'email': '%s-%05d@localhost' % (prefix, idx)},
+        )
+        metadata = models.UserMetadata.get_for_user(user)
+        if not metadata.tos_up_to_date:
+            metadata.tos_version = settings.TOS_VERSION
+            metadata.tos_accepted = now()
+            metadata.save()
+
+        store = models.TaskStore.get_for_user(user)
+        if not store.twilio_auth_token:
+            store.twilio_auth_token = uuid.uuid4().hex
+            models.TaskStore.objects.filter(pk=store.pk).update(
+                twilio_auth_token=store.twilio_auth_token,
+                sms_whitelist='',
+            )
+
+        session = engine.SessionStore()
+        session[SESSION_KEY] = user.pk
+        session[BACKEND_SESSION_KEY] = (
+            'django.contrib.auth.backends.ModelBackend'
+        )
+        session.save()
+
+        users.append(
+            LoadTestUser(
+                user.username,
+                store.api_key.key,
+                session.session_key,
+                store.twilio_auth_token,
+            )
+        )
+    return users
+
+
+class Statistics(object):
+    def __init__(self):
+        self.latencies = {}
+        self.statuses = {}
+        self.errors = {}
+        self.stream = {
+            'connections': 0,
+            'disconnections': 0,
+            'events': {},
+        }
+
+    def record(self, operation, latency, status):
+        self.latencies.setdefault(operation, []).append(latency)
+        statuses = self.statuses.setdefault(operation, {})
+        statuses[status] = statuses.get(status, 0) + 1
+
+    def record_error(self, operation, error):
+        errors = self.errors.setdefault(operation, {})
+        name = error.__class__.__name__
+        errors[name] = errors.get(name, 0) + 1
+
+    def record_event(self, event):
+        events = self.stream['events']
+        events[event] = events.get(event, 0) + 1
+
+    def report(self, duration):
+        operations = {}
+        total_requests = 0
+        total_conflicts = 0
+        for operation, latencies in sorted(self.latencies.items()):
+            statuses = self.statuses[operation]
+            conflicts = statuses.get(409, 0)
+            total_requests += len(latencies)
+            total_conflicts += conflicts
+            operations[operation] = {
+                'requests': len(latencies),
+                'throughput': len(latencies) / duration,
+                'p50': percentile(latencies, 0.5),
+                'p90': percentile(latencies, 0.9),
+                'p99': percentile(latencies, 0.99),
+                'max': max(latencies),
+                'statuses': statuses,
+                'conflict_rate': float(conflicts) / len(latencies),
+                'errors': self.errors.get(operation, {}),
+            }
+        return {
+            'duration': duration,
+            'requests': total_requests,
+            'throughput': total_requests / duration,
+            'conflict_rate': (
+                float(total_conflicts) / total_requests
+                if total_requests else 0
+            ),
+            'operations': operations,
+            'stream': self.stream,
+        }
+
+
+class ProcessMonitor(object):
+    """ Measures the CPU used by a gunicorn master and its workers. """
+    def __init__(self, pid):
+        self.pid = pid
+        self.clock_ticks = os.sysconf(os.sysconf_names['SC_CLK_TCK'])
+
+    def read_stat(self, pid):
+        with open('/proc/%s/stat' % pid, 'r') as stat_file:
+            # The command name may contain spaces, but is parenthesized
+            fields = stat_file.read().rsplit(')', 1)[1].split()
+        # Fields are numbered from the state field, the third overall
+        return int(fields[1]), int(fields[11]) + int(fields[12])
+
+    def get_processes(self):
+        processes = {}
+        for entry in os.listdir('/proc'):
+            if not entry.isdigit():
+                continue
+            try:
+                parent, cpu = self.read_stat(entry)
+            except (IOError, IndexError, ValueError):
+                continue
+            if int(entry) == self.pid or parent == self.pid:
+                processes[int(entry)] = cpu
+        return processes
+
+    def start(self):
+        self.started = time.time()
+        self.initial = self.get_processes()
+
+    def stop(self):
+        duration = time.time() - self.started
+        final = self.get_processes()
+        workers = {}
+        for pid, cpu in final.items():
+            used = float(cpu - self.initial.get(pid, 0)) / self.clock_ticks
+            workers[pid] = {
+                'cpu_seconds': used,
+                'cpu_percent': used / duration * 100,
+            }
+        return {
+            'master': self.pid,
+            'processes': workers,
+            'cpu_seconds': sum(w['cpu_seconds'] for w in workers.values()),
+        }
+
+
+class SimulatedUser(object):
+    def __init__(self, user, options, statistics):
+        self.user = user
+        self.options = options
+        self.statistics = statistics
+        self.rng = random.Random()
+        self.api = urlparse.urlparse(options['api_url'])
+        self.status = urlparse.urlparse(options['status_url'])
+        operations = sorted(options['mix'].items())
+        self.operations = [name for name, _ in operations]
+        self.weights = [weight for _, weight in operations]
+
+    def get_connection(self, url, timeout):
+        connection_class = (
+            httplib.HTTPSConnection if url.scheme == 'https'
+            else httplib.HTTPConnection
+        )
+        return connection_class(url.netloc, timeout=timeout)
+
+    def request(self, operation, method, path, body=None, headers=None):
+        all_headers = {
+            'Authorization': 'ApiKey %s:%s' % (
+                self.user.username, self.user.api_key,
+            ),
+            'Accept': 'application/json',
+        }
+        if body is not None and not isinstance(body, basestring):
+            body = json.dumps(body)
+            all_headers['Content-Type'] = 'application/json'
+        all_headers.update(headers or {})
+
+        connection = self.get_connection(self.api, self.options['timeout'])
+        started = time.time()
+        try:
+            connection.request(
+                method,
+                self.api.path.rstrip('/') + path,
+                body,
+                all_headers
+            )
+            response = connection.getresponse()
+            content = response.read()
+        except Exception as e:
+            self.statistics.record_error(operation, e)
+            return None, None
+        finally:
+            connection.close()
+        self.statistics.record(
+            operation, time.time() - started, response.status
+        )
+        return response.status, content
+
+    def choose_operation(self):
+        point = self.rng.uniform(0, sum(self.weights))
+        for operation, weight in zip(self.operations, self.weights):
+            point -= weight
+            if point <= 0:
+                return operation
+        return self.operations[-1]
+
+    def do_list(self):
+        status, content = self.request('list', 'GET', '/api/v1/task/')
+        if status == 200:
+            self.user.task_uuids = [
+                task['uuid'] for task in json.loads(content)['objects']
+            ]
+
+    def get_random_uuid(self):
+        if not self.user.task_uuids:
+            return None
+        return self.rng.choice(self.user.task_uuids)
+
+    def do_detail(self):
+        task_uuid = self.get_random_uuid()
+        if task_uuid is None:
+            return self.do_list()
+        return self.request(
+            'detail', 'GET', '/api/v1/task/%s/' % task_uuid
+        )
+
+    def do_update(self):
+        task_uuid = self.get_random_uuid()
+        if task_uuid is None:
+            return self.do_list()
+        status, content = self.request(
+            'update:fetch', 'GET', '/api/v1/task/%s/' % task_uuid
+        )
+        if status != 200:
+            return
+        task = json.loads(content)
+        task['description'] = 'Updated at %s' % time.time()
+        self.request(
+            'update', 'PUT', '/api/v1/task/%s/' % task_uuid, task
+        )
+
+    def do_complete(self):
+        task_uuid = self.get_random_uuid()
+        if task_uuid is None:
+            return self.do_list()
+        self.user.task_uuids.remove(task_uuid)
+        self.request('complete', 'DELETE', '/api/v1/task/%s/' % task_uuid)
+
+    def do_create(self):
+        status, content = self.request(
+            'create', 'POST', '/api/v1/task/', {
+                'description': 'Load test task %s' % uuid.uuid4().hex[0:8]
+            }
+        )
+        if status in (200, 201):
+            self.user.task_uuids.append(json.loads(content)['uuid'])
+
+    def do_sms(self):
+        path = '/api/v1/task/%s/sms/' % self.user.username
+        url = '%s://%s%s' % (
+            self.api.scheme, self.api.netloc, self.api.path.rstrip('/') + path
+        )
+        params = {
+            'From': '+15555550100',
+            'Body': 'add Load test SMS %s' % uuid.uuid4().hex[0:8],
+        }
+        signature = RequestValidator(
+            self.user.twilio_auth_token
+        ).compute_signature(url, params)
+        self.request(
+            'sms', 'POST', path, urllib.urlencode(params), {
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'X-Twilio-Signature': signature,
+            }
+        )
+
+    def stream(self, deadline):
+        """ Holds a status stream open, reconnecting as the server
+        closes it, until ``deadline``.
+
+        """
+        cookie = '%s=%s' % (
+            settings.SESSION_COOKIE_NAME, self.user.session_key
+        )
+        while time.time() < deadline:
+            connection = self.get_connection(
+                self.status, settings.EVENT_STREAM_TIMEOUT * 2
+            )
+            try:
+                connection.request(
+                    'GET', self.status.path, headers={
+                        'Cookie': cookie,
+                        'Accept': 'text/event-stream',
+                    }
+                )
+                response = connection.getresponse()
+                self.statistics.stream['connections'] += 1
+                while time.time() < deadline:
+                    line = response.fp.readline()
+                    if not line:
+                        break
+                    if line.startswith('event:'):
+                        self.statistics.record_event(line[6:].strip())
+            except Exception as e:
+                self.statistics.record_error('stream', e)
+                eventlet.sleep(1)
+            finally:
+                connection.close()
+            self.statistics.stream['disconnections'] += 1
+
+    def run(self, deadline):
+        # Spread users' first requests out over one think time
+        eventlet.sleep(self.rng.uniform(0, self.options['think_time']))
+        while time.time() < deadline:
+            getattr(self, 'do_%s' % self.choose_operation())()
+            eventlet.sleep(
+                self.rng.expovariate(1.0 / self.options['think_time'])
+            )
+
+
+def run(users, options, monitor_pids=()):
+    """ Runs simulated ``users`` against the configured servers for
+    ``options['duration']`` seconds and returns a report.
+
+    """
+    statistics = Statistics()
+    monitors = [ProcessMonitor(pid) for pid in monitor_pids]
+    for monitor in monitors:
+        monitor.start()
+
+    pool = eventlet.GreenPool(len(users) * 2)
+    started = time.time()
+    deadline = started + options['duration']
+    for user in users:
+        simulated = SimulatedUser(user, options, statistics)
+        if options['stream']:
+            pool.spawn(simulated.stream, deadline)
+        pool.spawn(simulated.run, deadline)
+        # Ramp up gradually rather than connecting everyone at once
+        eventlet.sleep(options['ramp_up'] / float(len(users)))
+    pool.waitall()
+
+    report = statistics.report(time.time() - started)
+    report['users'] = len(users)
+    report['workers'] = [monitor.stop() for monitor in monitors]
+    return report
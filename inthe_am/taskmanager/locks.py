@@ -0,0 +1,481 @@
+import abc
+from contextlib import contextmanager
+import errno
+import fcntl
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.dispatch import Signal
+
+
+logger = logging.getLogger(__name__)
+
+
+lock_acquired = Signal(providing_args=['store', 'owner', 'wait'])
+lock_released = Signal(
+    providing_args=['store', 'owner', 'wait', 'hold', 'outcome']
+)
+lock_timed_out = Signal(providing_args=['store', 'owner', 'wait'])
+
+
+def send_signal(signal, **kwargs):
+    """ Sends ``signal``, logging rather than raising receiver errors;
+    instrumentation must never break the operation being measured.
+
+    """
+    for receiver, response in signal.send_robust(**kwargs):
+        if isinstance(response, Exception):
+            logger.error(
+                'Error in %s receiver %s: %r', signal, receiver, response
+            )
+
+
+class LockTimeout(Exception):
+    def __init__(self, owner=None):
+        # The holder at the time the wait was abandoned, if known.
+        self.owner = owner
+        super(LockTimeout, self).__init__(owner)
+
+
+class LockLost(Exception):
+    """ Raised when a lock expired, or was broken, while held. """
+    def __init__(self, owner=None):
+        self.owner = owner
+        super(LockLost, self).__init__(owner)
+
+
+class StoreLock(object):
+    """ An exclusive, first-come-first-served lock on a single task store.
+
+    Waiters are issued increasing tickets and are granted the lock in
+    ticket order; a ticket belonging to a process that has gone away
+    is released automatically, so a crashed holder can never leave a
+    store locked.
+
+    """
+    __metaclass__ = abc.ABCMeta
+
+    POLL_INTERVAL_MIN = 0.01
+    POLL_INTERVAL_MAX = 0.25
+
+    def __init__(self, store):
+        self.store = store
+        self.ticket = None
+        self.owner = None
+
+    def get_owner_info(self, operation, function=None):
+        return {
+            'pid': os.getpid(),
+            'host': socket.gethostname(),
+            'operation': operation,
+            'function': function,
+            'acquired': None,
+        }
+
+    def wait_for(self, predicate, deadline):
+        interval = self.POLL_INTERVAL_MIN
+        while True:
+            if predicate():
+                return True
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, self.POLL_INTERVAL_MAX)
+
+    @abc.abstractmethod
+    def acquire(self, timeout, operation=None, function=None):
+        """ Waits up to ``timeout`` seconds for the lock, raising
+        ``LockTimeout`` if it isn't granted.
+
+        """
+
+    @abc.abstractmethod
+    def release(self):
+        pass
+
+    @abc.abstractmethod
+    def is_locked(self):
+        pass
+
+    @abc.abstractmethod
+    def get_owner(self):
+        """ Returns information about the current holder, if any. """
+
+    @abc.abstractmethod
+    def break_lock(self):
+        """ Forcibly releases the lock; returns True if it was held. """
+
+    @abc.abstractmethod
+    def cleanup(self):
+        """ Discards state left behind by processes that have gone away;
+        returns True if anything was discarded.
+
+        """
+
+    def verify(self):
+        """ Raises ``LockLost`` if the lock is no longer held. """
+
+    @contextmanager
+    def held(self, timeout=None, operation=None, function=None):
+        if timeout is None:
+            timeout = settings.STORE_LOCK_TIMEOUT_SECONDS
+        started = time.time()
+        try:
+            self.acquire(float(timeout), operation, function)
+        except LockTimeout as e:
+            wait = time.time() - started
+            e.owner = self.get_owner()
+            logger.warning(
+                'Timed out after %.3fs waiting for the lock on %s '
+                '(held by %s).',
+                wait,
+                self.store,
+                e.owner,
+            )
+            send_signal(
+                lock_timed_out,
+                sender=self.__class__,
+                store=self.store,
+                owner=self.get_owner_info(operation, function),
+                wait=wait,
+            )
+            raise
+        acquired = time.time()
+        owner = self.owner
+        send_signal(
+            lock_acquired,
+            sender=self.__class__,
+            store=self.store,
+            owner=owner,
+            wait=acquired - started,
+        )
+        outcome = 'error'
+        try:
+            yield self
+            outcome = 'success'
+        finally:
+            self.release()
+            send_signal(
+                lock_released,
+                sender=self.__class__,
+                store=self.store,
+                owner=owner,
+                wait=acquired - started,
+                hold=time.time() - acquired,
+                outcome=outcome,
+            )
+
+
+class ProcessQueue(object):
+    """ Per-process state for one lock file. """
+    def __init__(self):
+        # Held by whichever thread in this process is waiting for, or
+        # holding, the store.
+        self.lock = threading.Lock()
+        # Serializes use of the shared descriptor below.
+        self.guard = threading.Lock()
+        self.fd = None
+
+
+class FcntlStoreLock(StoreLock):
+    """ Store lock built on POSIX advisory record locks.
+
+    The lock file holds a JSON document recording the most recently
+    issued ticket and the current owner.  Each waiter holds an
+    exclusive lock on the single byte at its ticket's offset for as
+    long as it is waiting or holding the store, and is granted the
+    store once no byte below its own is locked; the kernel drops these
+    record locks when a process exits, however it exits.
+
+    Record locks belong to the process rather than the descriptor, and
+    closing any descriptor for the file drops all of them, so waiters
+    within one process are serialized and share a single descriptor.
+
+    """
+    _queues = {}
+    _queues_guard = threading.Lock()
+
+    def __init__(self, store):
+        super(FcntlStoreLock, self).__init__(store)
+        self.path = os.path.join(store.local_path, '.lock')
+        with self._queues_guard:
+            if self.path not in self._queues:
+                self._queues[self.path] = ProcessQueue()
+            self.queue = self._queues[self.path]
+
+    @contextmanager
+    def descriptor(self):
+        queue = self.queue
+        with queue.guard:
+            if queue.fd is None:
+                queue.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                yield queue.fd
+            finally:
+                if not queue.lock.locked():
+                    os.close(queue.fd)
+                    queue.fd = None
+
+    def read_state(self, fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        contents = os.read(fd, 4096)
+        try:
+            state = json.loads(contents)
+            int(state['ticket'])
+            return state
+        except (ValueError, TypeError, KeyError):
+            # Empty, or left behind by the previous PID lockfile.
+            return {'ticket': 0, 'owner': None}
+
+    def write_state(self, fd, state):
+        contents = json.dumps(state)
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.ftruncate(fd, 0)
+        os.write(fd, contents)
+
+    @contextmanager
+    def state(self, fd):
+        # Whole-file BSD locks are independent of the record locks
+        # used for the queue itself.
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield self.read_state(fd)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def try_lock_range(self, fd, length, start):
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_SH | fcntl.LOCK_NB, length, start)
+        except IOError as e:
+            if e.errno in (errno.EACCES, errno.EAGAIN):
+                return False
+            raise
+        fcntl.lockf(fd, fcntl.LOCK_UN, length, start)
+        return True
+
+    def is_first(self, ticket):
+        with self.descriptor() as fd:
+            return self.try_lock_range(fd, ticket, 0)
+
+    def acquire(self, timeout, operation=None, function=None):
+        deadline = time.time() + timeout
+        queue = self.queue
+        if not self.wait_for(lambda: queue.lock.acquire(False), deadline):
+            raise LockTimeout()
+
+        try:
+            with self.descriptor() as fd:
+                with self.state(fd) as state:
+                    ticket = int(state['ticket']) + 1
+                    state['ticket'] = ticket
+                    self.write_state(fd, state)
+                    fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, ticket)
+        except:
+            queue.lock.release()
+            raise
+
+        if not self.wait_for(lambda: self.is_first(ticket), deadline):
+            with self.descriptor() as fd:
+                fcntl.lockf(fd, fcntl.LOCK_UN, 1, ticket)
+                queue.lock.release()
+            raise LockTimeout()
+
+        owner = self.get_owner_info(operation, function)
+        owner['acquired'] = time.time()
+        with self.descriptor() as fd:
+            with self.state(fd) as state:
+                state['owner'] = owner
+                self.write_state(fd, state)
+
+        self.ticket = ticket
+        self.owner = owner
+
+    def release(self):
+        if self.ticket is None:
+            return
+        with self.descriptor() as fd:
+            try:
+                with self.state(fd) as state:
+                    state['owner'] = None
+                    self.write_state(fd, state)
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN, 1, self.ticket)
+                self.ticket = None
+                self.owner = None
+                self.queue.lock.release()
+
+    def is_locked(self):
+        if not os.path.exists(self.path):
+            return False
+        with self.descriptor() as fd:
+            if self.queue.lock.locked():
+                return True
+            return not self.try_lock_range(fd, 0, 0)
+
+    def get_owner(self):
+        if not self.is_locked():
+            return None
+        with self.descriptor() as fd:
+            with self.state(fd) as state:
+                return state['owner']
+
+    def break_lock(self):
+        # Locks held by live processes cannot be taken away from them,
+        # and those held by dead processes have already been released.
+        return False
+
+    def cleanup(self):
+        if not os.path.exists(self.path) or self.is_locked():
+            return False
+        with self.descriptor() as fd:
+            with self.state(fd) as state:
+                if not state['owner']:
+                    return False
+                state['owner'] = None
+                self.write_state(fd, state)
+                return True
+
+
+class RedisStoreLock(StoreLock):
+    """ Store lock kept in Redis, for stores shared between hosts.
+
+    Tickets are queued in a sorted set; each waiter also keeps a
+    short-lived key alive while it waits, and the holder renews its key
+    to expire ``LOCKFILE_TIMEOUT_SECONDS`` later for as long as it holds
+    the lock, so that a holder that has gone away is skipped.  Should
+    the holder's key be lost anyway (if it was broken, or couldn't be
+    renewed in time), ``verify`` raises ``LockLost``.
+
+    """
+    _client = None
+
+    def __init__(self, store):
+        super(RedisStoreLock, self).__init__(store)
+        self.prefix = 'inthe_am:store_lock:%s:' % store.pk
+        self.client = self.get_client()
+        self.lost = False
+        self.renewing = None
+
+    @classmethod
+    def get_client(cls):
+        if cls._client is None:
+            import redis
+            cls._client = redis.StrictRedis.from_url(
+                settings.STORE_LOCK_REDIS_URL
+            )
+        return cls._client
+
+    def key(self, name):
+        return self.prefix + name
+
+    def alive_key(self, ticket):
+        return self.key('alive:%s' % ticket)
+
+    def get_head(self):
+        """ Returns the ticket at the front of the queue, discarding
+        any tickets whose owners have gone away.
+
+        """
+        while True:
+            head = self.client.zrange(self.key('queue'), 0, 0)
+            if not head:
+                return None
+            ticket = int(head[0])
+            if self.client.exists(self.alive_key(ticket)):
+                return ticket
+            self.client.zrem(self.key('queue'), ticket)
+
+    def keep_alive(self, ticket, owner, ttl):
+        self.client.setex(self.alive_key(ticket), ttl, json.dumps(owner))
+
+    def renew(self, ticket, owner, ttl, stopped):
+        while not stopped.wait(max(ttl / 3.0, self.POLL_INTERVAL_MAX)):
+            renewed = self.client.set(
+                self.alive_key(ticket), json.dumps(owner), ex=ttl, xx=True
+            )
+            if not renewed:
+                self.lost = True
+                logger.error(
+                    'Lock on %s held by %s was lost.', self.store, owner
+                )
+                return
+
+    def acquire(self, timeout, operation=None, function=None):
+        deadline = time.time() + timeout
+        owner = self.get_owner_info(operation, function)
+        ticket = self.client.incr(self.key('ticket'))
+        waiting_ttl = int(self.POLL_INTERVAL_MAX * 4) + 1
+
+        self.keep_alive(ticket, owner, waiting_ttl)
+        self.client.zadd(self.key('queue'), ticket, ticket)
+
+        def is_first():
+            self.keep_alive(ticket, owner, waiting_ttl)
+            return self.get_head() == ticket
+
+        if not self.wait_for(is_first, deadline):
+            self.client.zrem(self.key('queue'), ticket)
+            self.client.delete(self.alive_key(ticket))
+            raise LockTimeout()
+
+        owner['acquired'] = time.time()
+        ttl = int(settings.LOCKFILE_TIMEOUT_SECONDS)
+        self.keep_alive(ticket, owner, ttl)
+        self.ticket = ticket
+        self.owner = owner
+        self.lost = False
+        self.renewing = threading.Event()
+        renewer = threading.Thread(
+            target=self.renew,
+            args=(ticket, owner, ttl, self.renewing, ),
+        )
+        renewer.daemon = True
+        renewer.start()
+
+    def release(self):
+        if self.ticket is None:
+            return
+        self.renewing.set()
+        self.client.zrem(self.key('queue'), self.ticket)
+        self.client.delete(self.alive_key(self.ticket))
+        self.ticket = None
+        self.owner = None
+
+    def verify(self):
+        if self.lost or not self.client.exists(self.alive_key(self.ticket)):
+            raise LockLost(self.owner)
+
+    def is_locked(self):
+        return self.get_head() is not None
+
+    def get_owner(self):
+        head = self.get_head()
+        if head is None:
+            return None
+        owner = self.client.get(self.alive_key(head))
+        return json.loads(owner) if owner else None
+
+    def break_lock(self):
+        head = self.get_head()
+        if head is None:
+            return False
+        self.client.zrem(self.key('queue'), head)
+        self.client.delete(self.alive_key(head))
+        return True
+
+    def cleanup(self):
+        before = self.client.zcard(self.key('queue'))
+        self.get_head()
+        return self.client.zcard(self.key('queue')) < before
+
+
+def get_lock(store):
+    if getattr(settings, 'STORE_LOCK_REDIS_URL', None):
+        return RedisStoreLock(store)
+    return FcntlStoreLock(store)
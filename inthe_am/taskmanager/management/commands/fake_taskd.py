@@ -0,0 +1,95 @@
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inthe_am.taskmanager import fake_taskd
+
+
+class Command(BaseCommand):
+    args = 'init | add user <org> <username> | server'
+    help = (
+        'Runs a local stand-in for taskd.  Accepts the subset of the '
+        "taskd command line used by this application, so "
+        'scripts/fake_taskd can be used as TASKD_BINARY.'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--data',
+            dest='data',
+            default=getattr(settings, 'TASKD_DATA', None),
+            help='Data directory holding configuration and accounts.',
+        ),
+        make_option(
+            '--server',
+            dest='server',
+            default=getattr(settings, 'TASKD_SERVER', 'localhost:53589'),
+            help='Address (host:port) to listen on.',
+        ),
+        make_option(
+            '--latency',
+            dest='latency',
+            type='float',
+            default=0,
+            help='Seconds to wait before answering each request.',
+        ),
+        make_option(
+            '--jitter',
+            dest='jitter',
+            type='float',
+            default=0,
+            help='Maximum additional random delay in seconds.',
+        ),
+        make_option(
+            '--error-rate',
+            dest='error_rate',
+            type='float',
+            default=0,
+            help='Fraction of sync requests to fail.',
+        ),
+        make_option(
+            '--error-code',
+            dest='error_code',
+            type='int',
+            default=500,
+            help='Response code used for failed sync requests.',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        if not options['data']:
+            raise CommandError('A data directory (--data) is required.')
+        if not args:
+            raise CommandError('Usage: %s' % self.args)
+        host, port = options['server'].rsplit(':', 1)
+
+        if args[0] == 'init':
+            fake_taskd.initialize(options['data'], host)
+            self.stdout.write(
+                'Initialized data directory %s.' % options['data']
+            )
+        elif args[0] == 'add' and len(args) == 4 and args[1] == 'user':
+            _, _, org, username = args
+            key = fake_taskd.add_user(options['data'], org, username)
+            self.stdout.write('New user key: %s' % key)
+            self.stdout.write(
+                "Created user '%s' for organization '%s'" % (username, org)
+            )
+        elif args[0] == 'server':
+            server = fake_taskd.FakeTaskdServer(
+                options['data'],
+                (host, int(port)),
+                latency=options['latency'],
+                jitter=options['jitter'],
+                error_rate=options['error_rate'],
+                error_code=options['error_code'],
+            )
+            self.stderr.write('Listening on %s.' % server.taskd_server)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+        else:
+            raise CommandError('Usage: %s' % self.args)
@@ -0,0 +1,125 @@
+import json
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inthe_am.taskmanager import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulates users holding status streams and issuing a mix of '
+        'API and SMS requests against running servers, then reports '
+        'throughput, latency percentiles, lock conflict rates and '
+        'worker CPU usage as JSON.'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--users',
+            dest='users',
+            type='int',
+            default=100,
+            help='Number of simulated users.',
+        ),
+        make_option(
+            '--prefix',
+            dest='prefix',
+            default='loadtest',
+            help='Username prefix for the (re-used) load test accounts.',
+        ),
+        make_option(
+            '--api-url',
+            dest='api_url',
+            default='http://127.0.0.1:8040',
+            help='Base URL of the API server.',
+        ),
+        make_option(
+            '--status-url',
+            dest='status_url',
+            default='http://127.0.0.1:8041/status/',
+            help='URL of the status event stream.',
+        ),
+        make_option(
+            '--duration',
+            dest='duration',
+            type='int',
+            default=300,
+            help='Seconds to run for.',
+        ),
+        make_option(
+            '--ramp-up',
+            dest='ramp_up',
+            type='int',
+            default=30,
+            help='Seconds over which to start the simulated users.',
+        ),
+        make_option(
+            '--think-time',
+            dest='think_time',
+            type='float',
+            default=10,
+            help='Mean seconds each user waits between requests.',
+        ),
+        make_option(
+            '--mix',
+            dest='mix',
+            default=','.join(
+                '%s=%s' % item
+                for item in sorted(loadtest.DEFAULT_MIX.items())
+            ),
+            help='Comma-separated operation=weight pairs.',
+        ),
+        make_option(
+            '--timeout',
+            dest='timeout',
+            type='int',
+            default=30,
+            help='Seconds to wait for each API response.',
+        ),
+        make_option(
+            '--no-stream',
+            dest='stream',
+            action='store_false',
+            default=True,
+            help='Do not hold status streams open.',
+        ),
+        make_option(
+            '--monitor-pid',
+            dest='monitor_pids',
+            action='append',
+            type='int',
+            default=[],
+            help=(
+                'Report CPU usage of this gunicorn master and its '
+                'workers; may be given more than once.'
+            ),
+        ),
+    )
+
+    def parse_mix(self, mix):
+        parsed = {}
+        for pair in mix.split(','):
+            try:
+                operation, weight = pair.split('=')
+                parsed[operation.strip()] = float(weight)
+            except ValueError:
+                raise CommandError("Invalid mix entry '%s'." % pair)
+            if operation.strip() not in loadtest.DEFAULT_MIX:
+                raise CommandError("Unknown operation '%s'." % operation)
+        return parsed
+
+    def handle(self, *args, **options):
+        options['mix'] = self.parse_mix(options['mix'])
+        if options['users'] < 1:
+            raise CommandError('At least one user is required.')
+
+        self.stderr.write('Preparing %s users...' % options['users'])
+        users = loadtest.prepare_users(options['users'], options['prefix'])
+
+        self.stderr.write(
+            'Running for %s seconds...' % options['duration']
+        )
+        report = loadtest.run(
+            users, options, monitor_pids=options['monitor_pids']
+        )
+        self.stdout.write(json.dumps(report, indent=4, sort_keys=True))
@@ -0,0 +1,76 @@
+from multiprocessing import Pool
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from inthe_am.taskmanager.models import TaskStore
+from inthe_am.taskmanager.taskstore_migrations import (
+    CURRENT_TASKSTORE_VERSION, upgrade
+)
+
+
+def upgrade_store(store_pk):
+    store = TaskStore.objects.get(pk=store_pk)
+    original_version = store.version
+    try:
+        upgrade(store)
+    except Exception as e:
+        return store_pk, original_version, store.version, repr(e)
+    return store_pk, original_version, store.version, None
+
+
+class Command(BaseCommand):
+    help = (
+        'Upgrades all task stores to the current taskstore version '
+        'so that requests never need to.'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--processes',
+            dest='processes',
+            type='int',
+            default=4,
+            help='Number of stores to migrate in parallel.',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        store_pks = list(
+            TaskStore.objects.filter(
+                version__lt=CURRENT_TASKSTORE_VERSION
+            ).values_list('pk', flat=True)
+        )
+        self.stdout.write(
+            '%s stores require migration to version %s.' % (
+                len(store_pks),
+                CURRENT_TASKSTORE_VERSION,
+            )
+        )
+        if not store_pks:
+            return
+
+        # Each worker process must open its own database connection.
+        connection.close()
+        pool = Pool(processes=options['processes'])
+        failed = 0
+        try:
+            results = pool.imap_unordered(upgrade_store, store_pks)
+            for store_pk, original, final, error in results:
+                if error:
+                    failed += 1
+                    self.stderr.write(
+                        'Store %s failed migrating from %s at %s: %s' % (
+                            store_pk, original, final, error,
+                        )
+                    )
+        finally:
+            pool.close()
+            pool.join()
+
+        self.stdout.write(
+            'Migrated %s stores; %s failed.' % (
+                len(store_pks) - failed,
+                failed,
+            )
+        )
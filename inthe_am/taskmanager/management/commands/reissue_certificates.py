@@ -0,0 +1,35 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from inthe_am.taskmanager.models import TaskStore
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-issues the default taskd client certificate for every '
+        'configured task store.'
+    )
+
+    def handle(self, *args, **options):
+        reissued = 0
+        failed = 0
+        for store in TaskStore.objects.filter(configured=True).iterator():
+            try:
+                store.issue_certificate()
+                reissued += 1
+            except Exception:
+                logger.exception(
+                    'Unable to re-issue certificate for %s.',
+                    store,
+                )
+                failed += 1
+        self.stdout.write(
+            'Re-issued %s certificates; %s failed.' % (
+                reissued,
+                failed,
+            )
+        )
@@ -0,0 +1,109 @@
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from inthe_am.taskmanager import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Times task store operations against synthetic stores of '
+        'various sizes, records the results and reports regressions '
+        'relative to the previous run.'
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--sizes',
+            dest='sizes',
+            default='100,1000,10000,50000',
+            help='Comma-separated list of store sizes (in tasks).',
+        ),
+        make_option(
+            '--benchmarks',
+            dest='benchmarks',
+            default=','.join(benchmarks.StoreBenchmark.BENCHMARKS),
+            help='Comma-separated list of benchmarks to run.',
+        ),
+        make_option(
+            '--repeat',
+            dest='repeat',
+            type='int',
+            default=5,
+            help='Number of times to run each benchmark.',
+        ),
+        make_option(
+            '--seed',
+            dest='seed',
+            type='int',
+            default=0,
+            help='Seed used to generate the synthetic stores.',
+        ),
+        make_option(
+            '--results',
+            dest='results',
+            default=settings.BENCHMARK_RESULTS_PATH,
+            help='File results are appended to and compared against.',
+        ),
+        make_option(
+            '--threshold',
+            dest='threshold',
+            type='float',
+            default=0.2,
+            help=(
+                'Fractional increase in median time reported as a '
+                'regression.'
+            ),
+        ),
+        make_option(
+            '--fail-on-regression',
+            dest='fail_on_regression',
+            action='store_true',
+            default=False,
+            help='Exit with an error if any regression is found.',
+        ),
+    )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('Sizes must be integers.')
+        selected = options['benchmarks'].split(',')
+        unknown = set(selected) - set(benchmarks.StoreBenchmark.BENCHMARKS)
+        if unknown:
+            raise CommandError(
+                'Unknown benchmarks: %s' % ', '.join(sorted(unknown))
+            )
+
+        previous = benchmarks.load_results(options['results'])
+        results = benchmarks.run(
+            sizes,
+            benchmarks=selected,
+            repeat=options['repeat'],
+            seed=options['seed'],
+        )
+        benchmarks.save_results(options['results'], results)
+
+        for result in results:
+            self.stdout.write(
+                '%(benchmark)-16s %(size)6s tasks: median %(median).4fs, '
+                'p95 %(p95).4fs, min %(min).4fs' % result
+            )
+
+        regressions = benchmarks.find_regressions(
+            previous, results, options['threshold']
+        )
+        for result, previous_result in regressions:
+            self.stderr.write(
+                'Regression in %s at %s tasks: median %.4fs (was %.4fs '
+                'at %s).' % (
+                    result['benchmark'],
+                    result['size'],
+                    result['median'],
+                    previous_result['median'],
+                    previous_result['revision'],
+                )
+            )
+        if regressions and options['fail_on_regression']:
+            raise CommandError('%s regression(s) found.' % len(regressions))
@@ -0,0 +1,98 @@
+import json
+from optparse import make_option
+
+from celery import chord, group
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inthe_am.taskmanager.models import TaskStore
+from inthe_am.taskmanager.tasks import (
+    SWEEP_OPERATIONS, summarize_sweep, sweep_store
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Runs maintenance operations (%s) across all configured task '
+        'stores and prints an aggregated report.' % (
+            ', '.join(SWEEP_OPERATIONS)
+        )
+    )
+    option_list = BaseCommand.option_list + (
+        make_option(
+            '--operations',
+            dest='operations',
+            default=','.join(SWEEP_OPERATIONS),
+            help='Comma-separated list of operations to run.',
+        ),
+        make_option(
+            '--chunk-size',
+            dest='chunk_size',
+            type='int',
+            default=10,
+            help='Number of stores to process in parallel.',
+        ),
+        make_option(
+            '--timeout',
+            dest='timeout',
+            type='int',
+            default=600,
+            help='Seconds to wait for each chunk to complete.',
+        ),
+    )
+
+    def merge_summary(self, report, summary):
+        report['stores'] += summary['stores']
+        for operation, counts in summary['operations'].items():
+            report_counts = report['operations'].setdefault(
+                operation, {'ok': 0, 'failed': 0}
+            )
+            report_counts['ok'] += counts['ok']
+            report_counts['failed'] += counts['failed']
+        report['failures'].extend(summary['failures'])
+
+    def handle(self, *args, **options):
+        operations = [
+            operation.strip()
+            for operation in options['operations'].split(',')
+            if operation.strip()
+        ]
+        unknown = set(operations) - set(SWEEP_OPERATIONS)
+        if unknown:
+            raise CommandError(
+                'Unknown operations: %s' % ', '.join(sorted(unknown))
+            )
+        chunk_size = options['chunk_size']
+        if chunk_size < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+
+        store_pks = list(
+            TaskStore.objects.filter(
+                configured=True
+            ).order_by('pk').values_list('pk', flat=True)
+        )
+        report = {
+            'stores': 0,
+            'operations': {},
+            'failures': [],
+        }
+        for idx in range(0, len(store_pks), chunk_size):
+            chunk = store_pks[idx:idx + chunk_size]
+            result = chord(
+                group(
+                    sweep_store.s(store_pk, operations)
+                    for store_pk in chunk
+                )
+            )(summarize_sweep.s())
+            self.merge_summary(
+                report,
+                result.get(timeout=options['timeout']),
+            )
+            self.stderr.write(
+                'Processed %s of %s stores.' % (
+                    report['stores'],
+                    len(store_pks),
+                )
+            )
+
+        self.stdout.write(json.dumps(report, indent=4, sort_keys=True))
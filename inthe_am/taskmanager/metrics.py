@@ -0,0 +1,284 @@
+import hashlib
+import logging
+import re
+import socket
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+# Metric values are kept for as long as memcached allows a relative
+# timeout; a timeout of ``None`` is taken by some cache backends (the
+# local-memory one, at least) to mean the default of a few minutes.
+CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+
+class Counter(object):
+    """ A Prometheus-style counter shared between processes.
+
+    Values are kept in the cache, so that every web and Celery worker
+    contributes to (and reports) the same totals.
+
+    """
+    kind = 'counter'
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+
+    def get_key(self, label_values, suffix=''):
+        # Label values may contain characters memcached won't accept
+        # in keys, so they are hashed.
+        return 'metrics:%s%s:%s' % (
+            self.name,
+            suffix,
+            hashlib.md5('\0'.join(label_values)).hexdigest(),
+        )
+
+    @property
+    def series_count_key(self):
+        return 'metrics:%s:series' % self.name
+
+    def get_series_key(self, index):
+        return 'metrics:%s:series:%s' % (self.name, index)
+
+    def get_label_values(self, labels):
+        return tuple(
+            unicode(labels[label]).encode('utf-8') for label in self.labels
+        )
+
+    def register(self, label_values):
+        """ Adds ``label_values`` to the index of this metric's series.
+
+        Each series gets its own slot in the index, so processes
+        registering series at the same time can't overwrite each
+        other's; a series may be listed more than once if its marker is
+        evicted, so duplicates are ignored when the index is read.
+
+        """
+        if not cache.add(
+            self.get_key(label_values, '_registered'), True, CACHE_TIMEOUT
+        ):
+            return
+        cache.add(self.series_count_key, 0, CACHE_TIMEOUT)
+        try:
+            index = cache.incr(self.series_count_key)
+        except ValueError:
+            # Evicted between the two calls
+            cache.add(self.series_count_key, 0, CACHE_TIMEOUT)
+            index = cache.incr(self.series_count_key)
+        cache.set(self.get_series_key(index), label_values, CACHE_TIMEOUT)
+
+    def increment(self, key, amount):
+        if cache.add(key, amount, CACHE_TIMEOUT):
+            return
+        try:
+            cache.incr(key, amount)
+        except ValueError:
+            # Evicted between the two calls
+            cache.set(key, amount, CACHE_TIMEOUT)
+
+    def inc(self, amount=1, **labels):
+        label_values = self.get_label_values(labels)
+        self.register(label_values)
+        self.increment(self.get_key(label_values), amount)
+
+    def format_labels(self, label_values, extra=()):
+        pairs = list(zip(self.labels, label_values)) + list(extra)
+        if not pairs:
+            return ''
+        return '{%s}' % ','.join(
+            '%s="%s"' % (
+                name,
+                value.replace('\\', '\\\\').replace('"', '\\"'),
+            ) for name, value in pairs
+        )
+
+    def get_series(self):
+        keys = [
+            self.get_series_key(index)
+            for index in range(1, (cache.get(self.series_count_key) or 0) + 1)
+        ]
+        registered = cache.get_many(keys)
+        series = []
+        for key in keys:
+            label_values = registered.get(key)
+            if label_values is None:
+                continue
+            label_values = tuple(label_values)
+            if label_values not in series:
+                series.append(label_values)
+        return series
+
+    def collect(self):
+        series = self.get_series()
+        values = cache.get_many(
+            [self.get_key(label_values) for label_values in series]
+        )
+        for label_values in series:
+            yield '%s%s %s' % (
+                self.name,
+                self.format_labels(label_values),
+                values.get(self.get_key(label_values), 0),
+            )
+
+
+class Histogram(Counter):
+    """ A Prometheus-style histogram shared between processes.
+
+    Each observation is counted only in the smallest bucket that holds
+    it; the cumulative bucket counts are computed when collected.  The
+    sum is kept in milliseconds, since cache counters are integers.
+
+    """
+    kind = 'histogram'
+
+    def __init__(self, name, description, labels=(), buckets=()):
+        super(Histogram, self).__init__(name, description, labels)
+        self.buckets = sorted(buckets)
+
+    def get_bucket(self, value):
+        for bucket in self.buckets:
+            if value <= bucket:
+                return str(bucket)
+        return '+Inf'
+
+    def observe(self, value, **labels):
+        label_values = self.get_label_values(labels)
+        self.register(label_values)
+        self.increment(
+            self.get_key(label_values + (self.get_bucket(value), ), '_bucket'),
+            1
+        )
+        self.increment(self.get_key(label_values, '_count'), 1)
+        self.increment(
+            self.get_key(label_values, '_sum'),
+            int(round(value * 1000))
+        )
+
+    def collect(self):
+        series = self.get_series()
+        bucket_names = [str(bucket) for bucket in self.buckets] + ['+Inf']
+        keys = []
+        for label_values in series:
+            keys.extend(
+                self.get_key(label_values + (bucket, ), '_bucket')
+                for bucket in bucket_names
+            )
+            keys.append(self.get_key(label_values, '_count'))
+            keys.append(self.get_key(label_values, '_sum'))
+        values = cache.get_many(keys)
+
+        for label_values in series:
+            cumulative = 0
+            for bucket in bucket_names:
+                cumulative += values.get(
+                    self.get_key(label_values + (bucket, ), '_bucket'), 0
+                )
+                yield '%s_bucket%s %s' % (
+                    self.name,
+                    self.format_labels(label_values, [('le', bucket)]),
+                    cumulative,
+                )
+            yield '%s_count%s %s' % (
+                self.name,
+                self.format_labels(label_values),
+                values.get(self.get_key(label_values, '_count'), 0),
+            )
+            yield '%s_sum%s %s' % (
+                self.name,
+                self.format_labels(label_values),
+                values.get(self.get_key(label_values, '_sum'), 0) / 1000.0,
+            )
+
+
+LOCK_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, )
+
+store_lock_acquisitions = Counter(
+    'inthe_am_store_lock_acquisitions_total',
+    'Store lock acquisition attempts, by operation and outcome.',
+    labels=('operation', 'outcome', ),
+)
+store_lock_wait_seconds = Histogram(
+    'inthe_am_store_lock_wait_seconds',
+    'Time spent waiting to acquire a store lock.',
+    labels=('operation', ),
+    buckets=LOCK_BUCKETS,
+)
+store_lock_hold_seconds = Histogram(
+    'inthe_am_store_lock_hold_seconds',
+    'Time a store lock was held for.',
+    labels=('operation', ),
+    buckets=LOCK_BUCKETS,
+)
+
+METRICS = [
+    store_lock_acquisitions,
+    store_lock_wait_seconds,
+    store_lock_hold_seconds,
+]
+
+
+def render_prometheus():
+    lines = []
+    for metric in METRICS:
+        lines.append('# HELP %s %s' % (metric.name, metric.description))
+        lines.append('# TYPE %s %s' % (metric.name, metric.kind))
+        lines.extend(metric.collect())
+    return '\n'.join(lines) + '\n'
+
+
+_statsd_socket = None
+
+
+def send_statsd(name, value, kind):
+    """ Sends a single statsd metric if ``STATSD_HOST`` is configured. """
+    global _statsd_socket
+
+    if not getattr(settings, 'STATSD_HOST', None):
+        return
+    if _statsd_socket is None:
+        _statsd_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    packet = '%s.%s:%s|%s' % (settings.STATSD_PREFIX, name, value, kind)
+    try:
+        _statsd_socket.sendto(
+            packet,
+            (settings.STATSD_HOST, int(settings.STATSD_PORT))
+        )
+    except socket.error as e:
+        logger.debug('Unable to send metric %s to statsd: %s', name, e)
+
+
+def get_statsd_name(value):
+    return re.sub(r'[^a-z0-9]+', '_', (value or 'unknown').lower()).strip('_')
+
+
+def record_lock_release(owner, wait, hold, outcome):
+    operation = owner.get('operation') or 'unknown'
+    store_lock_acquisitions.inc(operation=operation, outcome=outcome)
+    store_lock_wait_seconds.observe(wait, operation=operation)
+    store_lock_hold_seconds.observe(hold, operation=operation)
+
+    statsd_operation = get_statsd_name(operation)
+    send_statsd('store_lock.%s.%s' % (statsd_operation, outcome), 1, 'c')
+    send_statsd(
+        'store_lock.%s.wait' % statsd_operation, int(wait * 1000), 'ms'
+    )
+    send_statsd(
+        'store_lock.%s.hold' % statsd_operation, int(hold * 1000), 'ms'
+    )
+
+
+def record_lock_timeout(owner, wait):
+    operation = owner.get('operation') or 'unknown'
+    store_lock_acquisitions.inc(operation=operation, outcome='timeout')
+    store_lock_wait_seconds.observe(wait, operation=operation)
+
+    statsd_operation = get_statsd_name(operation)
+    send_statsd('store_lock.%s.timeout' % statsd_operation, 1, 'c')
+    send_statsd(
+        'store_lock.%s.wait' % statsd_operation, int(wait * 1000), 'ms'
+    )
@@ -0,0 +1,69 @@
+import re
+
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+
+# Appended to a compressed response's ETag by ``GZipMiddleware``
+GZIP_ETAG_SUFFIX = re.compile(r';gzip"')
+
+
+def buffer_chunks(chunks, size):
+    """ Joins ``chunks`` into pieces of at least ``size`` bytes.
+
+    ``GZipMiddleware`` flushes the compressor after every chunk of a
+    streamed response, which for a list streamed a few bytes at a time
+    costs most of the compression.
+
+    """
+    buffered = []
+    length = 0
+    for chunk in chunks:
+        buffered.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield b''.join(buffered)
+            buffered = []
+            length = 0
+    if buffered:
+        yield b''.join(buffered)
+
+
+class ApiCompressionMiddleware(GZipMiddleware):
+    """ Gzips API responses of at least ``API_COMPRESSION_MINIMUM_SIZE``
+    bytes for clients accepting it.
+
+    Streamed responses are always compressed, since their size isn't
+    known up front.
+
+    """
+    def is_compressible(self, request):
+        return request.path.startswith(
+            tuple(settings.API_COMPRESSION_PATH_PREFIXES)
+        )
+
+    def process_request(self, request):
+        # Conditional views compare ``If-None-Match`` against the ETag
+        # they generated -- not the one we sent.
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match and self.is_compressible(request):
+            request.META['HTTP_IF_NONE_MATCH'] = GZIP_ETAG_SUFFIX.sub(
+                '"', if_none_match
+            )
+
+    def process_response(self, request, response):
+        if not self.is_compressible(request):
+            return response
+        if response.streaming:
+            response.streaming_content = buffer_chunks(
+                response.streaming_content,
+                settings.API_COMPRESSION_MINIMUM_SIZE,
+            )
+        elif (
+            len(response.content) < settings.API_COMPRESSION_MINIMUM_SIZE
+        ):
+            return response
+        return super(ApiCompressionMiddleware, self).process_response(
+            request, response
+        )
+
@@ -4,23 +4,34 @@ import hashlib
 import logging
 import os
 import re
+import shutil
+import StringIO
 import subprocess
+import tarfile
 import tempfile
+import time
 import uuid
 
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Count, F
 from django.template.loader import render_to_string
 from django.utils.timezone import now
 from dulwich.repo import Repo
 from tastypie.models import create_api_key, ApiKey
 
+from . import certificates
 from .context_managers import git_checkpoint
+from .key_pool import KeyPool
+from .locks import lock_released, lock_timed_out
+from .profiling import ProfiledPopen, timed
+from . import metrics
 from .taskwarrior_client import TaskwarriorClient, TaskwarriorError
 from .taskstore_migrations import upgrade as upgrade_taskstore
-from .tasks import sync_repository
+from .tasks import provision_store, replenish_key_pool, sync_repository
 
 
 logger = logging.getLogger(__name__)
@@ -39,6 +50,7 @@ class TaskStore(models.Model):
         'key': 'private.key.pem',
         'certificate': 'private.certificate.pem',
     }
+    UUID_MATCHER = re.compile(r'uuid:"([0-9a-zA-Z-]+)"')
 
     user = models.ForeignKey(User, related_name='task_stores')
     local_path = models.FilePathField(
@@ -52,14 +64,21 @@ class TaskStore(models.Model):
     sms_whitelist = models.TextField(blank=True)
     taskrc_extras = models.TextField(blank=True)
     configured = models.BooleanField(default=False)
-
-    @property
-    def version(self):
-        return self.metadata.get('version', 0)
-
-    @version.setter
-    def version(self, value):
-        self.metadata['version'] = value
+    version = models.IntegerField(default=0)
+    provisioning_state = models.CharField(
+        max_length=32,
+        blank=True,
+        choices=(
+            ('queued', 'Queued', ),
+            ('creating_user', 'Creating taskd user', ),
+            ('generating_key', 'Generating private key', ),
+            ('signing_certificate', 'Signing certificate', ),
+            ('initial_sync', 'Performing initial synchronization', ),
+            ('complete', 'Complete', ),
+            ('failed', 'Failed', ),
+        )
+    )
+    provisioning_updated = models.DateTimeField(null=True, blank=True)
 
     @property
     def metadata_registry(self):
@@ -106,20 +125,15 @@ class TaskStore(models.Model):
 
     @property
     def server_config(self):
-        return TaskRc(
-            os.path.join(
-                settings.TASKD_DATA,
-                'config'
-            ),
-            read_only=True
-        )
+        return get_server_config()
 
     @classmethod
     def get_for_user(self, user):
-        store, created = TaskStore.objects.get_or_create(
-            user=user,
-        )
-        upgrade_taskstore(store)
+        with timed('store'):
+            store, created = TaskStore.objects.get_or_create(
+                user=user,
+            )
+            upgrade_taskstore(store)
         return store
 
     @property
@@ -130,6 +144,22 @@ class TaskStore(models.Model):
             )
         return self._client
 
+    def get_snapshot_client(self, head=None):
+        """ Returns a client reading from a snapshot of ``head`` (by
+        default, the repository head), which can be used without
+        holding the store lock.
+
+        """
+        try:
+            snapshot = self.get_snapshot(head)
+        except KeyError:
+            # Repository has no commits yet
+            return self.client
+        client = TaskwarriorClient(self.taskrc.path)
+        client.data_location = snapshot
+        client.read_only = True
+        return client
+
     @property
     def api_key(self):
         try:
@@ -263,7 +293,9 @@ class TaskStore(models.Model):
                 '.git'
             )
         ] + list(args)
-        return subprocess.Popen(
+        return ProfiledPopen(
+            'git',
+            args[0] if args else None,
             command,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
@@ -274,27 +306,161 @@ class TaskStore(models.Model):
         stdout, stderr = proc.communicate()
         return proc.returncode
 
+    def check_repository(self):
+        """ Runs ``git fsck`` against this store's repository.
+
+        Returns a 2-tuple of a boolean indicating whether the repository
+        is intact and the output of ``git fsck``.
+
+        """
+        proc = self._git_command('fsck', '--no-progress')
+        stdout, stderr = proc.communicate()
+        return proc.returncode == 0, (stdout + stderr).strip()
+
+    def get_changed_task_ids(self, head1, head2):
+        proc = self._git_command(
+            'diff', head1, head2
+        )
+        stdout, stderr = proc.communicate()
+
+        changed_tickets = set()
+        for raw_line in stdout.split('\n'):
+            line = raw_line.strip()
+            if not line or line[0] not in ('+', '-'):
+                continue
+            matched = self.UUID_MATCHER.search(line)
+            if matched:
+                changed_tickets.add(
+                    matched.group(1)
+                )
+
+        return changed_tickets
+
+    #  Snapshot-related methods
+
+    SYNCHRONIZED_FILES = (
+        'pending.data', 'completed.data', 'undo.data', 'backlog.data',
+    )
+
+    @property
+    def snapshot_path(self):
+        return os.path.join(settings.TASK_SNAPSHOT_PATH, str(self.pk))
+
+    def _export_tree(self, head, path):
+        proc = self._git_command('archive', '--format=tar', head)
+        stdout, stderr = proc.communicate()
+        if proc.returncode != 0:
+            raise IOError(
+                "Unable to export %s from %s: %s" % (head, self, stderr)
+            )
+        with tarfile.open(fileobj=StringIO.StringIO(stdout)) as archive:
+            archive.extractall(path)
+
+    def get_snapshot(self, head=None):
+        """ Returns the path of a read-only copy of the store as of
+        ``head`` (by default, the repository head).
+
+        Commits never change once written, so snapshots are exported
+        once and shared between requests until they've gone unused for
+        ``TASK_SNAPSHOT_RETENTION_SECONDS``.
+
+        """
+        if head is None:
+            head = self.repository.head()
+        path = os.path.join(self.snapshot_path, head)
+        if os.path.isdir(path):
+            try:
+                # Snapshots expire once they've gone unused
+                os.utime(path, None)
+                return path
+            except OSError:
+                # Expired just now; export it again
+                pass
+
+        if not os.path.isdir(self.snapshot_path):
+            try:
+                os.makedirs(self.snapshot_path, 0o700)
+            except OSError:
+                if not os.path.isdir(self.snapshot_path):
+                    raise
+        working_path = tempfile.mkdtemp(
+            prefix='.tmp-', dir=self.snapshot_path
+        )
+        try:
+            self._export_tree(head, working_path)
+            os.rename(working_path, path)
+        except OSError:
+            # Exported by another process in the meantime
+            if not os.path.isdir(path):
+                raise
+        finally:
+            if os.path.isdir(working_path):
+                shutil.rmtree(working_path)
+        self.prune_snapshots(keep=head)
+        return path
+
+    def prune_snapshots(self, keep=None):
+        """ Removes snapshots unused for longer than
+        ``TASK_SNAPSHOT_RETENTION_SECONDS``, other than ``keep``.
+
+        The most recently used of the others -- the previous head's,
+        ordinarily, which requests may still be reading -- is treated as
+        having just been used, so lasts at least that long again.
+
+        """
+        if not os.path.isdir(self.snapshot_path):
+            return
+        expiry = time.time() - settings.TASK_SNAPSHOT_RETENTION_SECONDS
+        last_used = {}
+        for entry in os.listdir(self.snapshot_path):
+            if entry == keep:
+                continue
+            try:
+                last_used[entry] = os.path.getmtime(
+                    os.path.join(self.snapshot_path, entry)
+                )
+            except OSError:
+                continue
+
+        snapshots = [
+            entry for entry in last_used if not entry.startswith('.')
+        ]
+        if snapshots:
+            previous = max(snapshots, key=last_used.get)
+            try:
+                os.utime(os.path.join(self.snapshot_path, previous), None)
+            except OSError:
+                pass
+            del last_used[previous]
+        for entry, used in last_used.items():
+            if used < expiry:
+                shutil.rmtree(
+                    os.path.join(self.snapshot_path, entry),
+                    ignore_errors=True,
+                )
+
     def create_git_checkpoint(
         self, message, function=None,
         args=None, kwargs=None, pre_operation=False
     ):
-        self._create_git_repo()
-        self._simple_git_command('add', '-A')
-        commit_message = render_to_string(
-            'git_checkpoint.txt',
-            {
-                'message': message,
-                'function': function,
-                'args': args,
-                'kwargs': kwargs,
-                'preop': pre_operation,
-            }
-        )
-        self._simple_git_command(
-            'commit',
-            '-m',
-            commit_message
-        )
+        with timed('checkpoint'):
+            self._create_git_repo()
+            self._simple_git_command('add', '-A')
+            commit_message = render_to_string(
+                'git_checkpoint.txt',
+                {
+                    'message': message,
+                    'function': function,
+                    'args': args,
+                    'kwargs': kwargs,
+                    'preop': pre_operation,
+                }
+            )
+            self._simple_git_command(
+                'commit',
+                '-m',
+                commit_message
+            )
 
     #  Taskd-related methods
 
@@ -326,8 +492,7 @@ class TaskStore(models.Model):
             sync_repository.apply_async(args=(self, ))
         else:
             try:
-                with git_checkpoint(self, 'Synchronization'):
-                    self.client.sync()
+                self.synchronize()
             except TaskwarriorError as e:
                 self.log_error(
                     "Error while syncing tasks! "
@@ -339,9 +504,192 @@ class TaskStore(models.Model):
                     e.stdout,
                 )
 
+    def synchronize(self):
+        """ Synchronizes the store with taskd, holding the store lock
+        across the round trip only if the store changed while a private
+        copy was being synchronized.
+
+        """
+        if not self._sync_outside_lock():
+            with git_checkpoint(self, 'Synchronization'):
+                self.client.sync()
+        self.update_pebble_card()
+
+    def _sync_outside_lock(self):
+        """ Synchronizes a private copy of the store with taskd, and
+        only takes the store lock to apply the result.
+
+        Returns False without applying anything if the store changed
+        while the synchronization was in progress.
+
+        """
+        try:
+            head = self.repository.head()
+        except KeyError:
+            # Repository has no commits yet
+            return False
+
+        working_path = tempfile.mkdtemp()
+        try:
+            self._export_tree(head, working_path)
+            client = TaskwarriorClient(self.taskrc.path)
+            client.data_location = working_path
+            client.sync()
+
+            with git_checkpoint(self, 'Synchronization'):
+                if self.repository.head() != head:
+                    return False
+                for filename in self.SYNCHRONIZED_FILES:
+                    synchronized = os.path.join(working_path, filename)
+                    if os.path.isfile(synchronized):
+                        shutil.copy(
+                            synchronized,
+                            os.path.join(self.local_path, filename),
+                        )
+            return True
+        finally:
+            shutil.rmtree(working_path)
+
+    #  Pebble-related methods
+
+    @property
+    def pebble_card_cache_key(self):
+        return 'pebble_card_%s' % self.pk
+
+    def get_pebble_card(self):
+        """ Returns the pebble card for the current repository head.
+
+        The card is cached along with the head and the hour it was
+        generated in, so it is regenerated after a checkpoint or sync has
+        changed the task list, and hourly as urgency (which depends on
+        tasks' age and due dates) changes.
+
+        """
+        head = self.repository.head()
+        hour = int(time.time() // 3600)
+        card = cache.get(self.pebble_card_cache_key)
+        if card is None or (card['head'], card.get('hour')) != (head, hour):
+            card = self._generate_pebble_card(head, hour)
+            cache.set(
+                self.pebble_card_cache_key,
+                card,
+                settings.PEBBLE_CARD_CACHE_TIMEOUT,
+            )
+        return card
+
+    def update_pebble_card(self):
+        """ Regenerates the pebble card if this store has one in use. """
+        if cache.get(self.pebble_card_cache_key) is not None:
+            self.get_pebble_card()
+
+    def _generate_pebble_card(self, head, hour):
+        pending_tasks = [
+            task for task in self.client.load_tasks()['pending']
+            if task['status'] == 'pending'
+        ]
+        if pending_tasks:
+            top_task = max(
+                pending_tasks,
+                key=lambda d: float(d['urgency']),
+            )
+            content = top_task['description']
+        else:
+            content = 'No pending tasks.'
+
+        body = json.dumps({
+            'content': content,
+            'refresh_frequency': 15,
+        })
+        return {
+            'head': head,
+            'hour': hour,
+            'body': body,
+            'etag': '"%s"' % hashlib.md5(body).hexdigest(),
+        }
+
+    @property
+    def provisioning(self):
+        """ Whether provisioning is underway.
+
+        A state not updated within ``TASKD_PROVISIONING_TIMEOUT_SECONDS``
+        was abandoned, and is treated as having failed.
+
+        """
+        if self.provisioning_state in ('', 'complete', 'failed', ):
+            return False
+        return bool(
+            self.provisioning_updated
+            and self.provisioning_updated > now() - datetime.timedelta(
+                seconds=settings.TASKD_PROVISIONING_TIMEOUT_SECONDS
+            )
+        )
+
+    def set_provisioning_state(self, state):
+        # Updated directly so that progress is visible to other processes
+        # without running the side effects of ``save``.
+        self.provisioning_state = state
+        self.provisioning_updated = now()
+        TaskStore.objects.filter(pk=self.pk).update(
+            provisioning_state=state,
+            provisioning_updated=self.provisioning_updated,
+        )
+
+    def queue_provisioning(self):
+        """ Queues provisioning of this store, unless it's configured or
+        being provisioned already.
+
+        Must not be called before this store is committed, since the
+        worker wouldn't otherwise find it.
+
+        """
+        if self.configured or self.provisioning:
+            return False
+        # Only one of several processes finding the same state queues it
+        updated = now()
+        queued = TaskStore.objects.filter(
+            pk=self.pk,
+            configured=False,
+            provisioning_state=self.provisioning_state,
+            provisioning_updated=self.provisioning_updated,
+        ).update(
+            provisioning_state='queued',
+            provisioning_updated=updated,
+        )
+        if not queued:
+            return False
+        self.provisioning_state = 'queued'
+        self.provisioning_updated = updated
+        provision_store.apply_async(args=(self.pk, ))
+        return True
+
+    def issue_certificate(self):
+        """ (Re-)issues the default client certificate for this store's
+        default private key.
+
+        """
+        certificates.write_private_file(
+            os.path.join(
+                self.local_path,
+                self.DEFAULT_FILENAMES['certificate'],
+            ),
+            certificates.generate_certificate(
+                os.path.join(
+                    self.local_path,
+                    self.DEFAULT_FILENAMES['key'],
+                ),
+                self.server_config['ca.key'],
+                self.server_config['ca.cert'],
+            )
+        )
+
     def autoconfigure_taskd(self):
-        self.configured = True
+        """ Creates a taskd account for this store and synchronizes it.
+
+        The store is only marked as configured once this has completed,
+        and anything a previous, failed attempt set up is reused, so
+        this can be retried after a failure.
 
+        """
         logger.warning(
             '%s just autoconfigured an account!',
             self.user.username,
@@ -355,67 +703,63 @@ class TaskStore(models.Model):
                 pass
 
         # Create a new user username
-        key_proc = subprocess.Popen(
-            [
-                settings.TASKD_BINARY,
-                'add',
-                '--data',
-                settings.TASKD_DATA,
-                'user',
+        taskd_credentials = self.metadata.get('generated_taskd_credentials')
+        if not taskd_credentials:
+            self.set_provisioning_state('creating_user')
+            key_proc = subprocess.Popen(
+                [
+                    settings.TASKD_BINARY,
+                    'add',
+                    '--data',
+                    settings.TASKD_DATA,
+                    'user',
+                    settings.TASKD_ORG,
+                    self.user.username,
+                ],
+                stdout=subprocess.PIPE
+            )
+            key_proc_output = key_proc.communicate()[0].split('\n')
+            taskd_user_key = key_proc_output[0].split(':')[1].strip()
+            taskd_credentials = '%s/%s/%s' % (
                 settings.TASKD_ORG,
                 self.user.username,
-            ],
-            stdout=subprocess.PIPE
-        )
-        key_proc_output = key_proc.communicate()[0].split('\n')
-        taskd_user_key = key_proc_output[0].split(':')[1].strip()
+                taskd_user_key,
+            )
+            self.metadata['generated_taskd_credentials'] = taskd_credentials
 
-        # Create and write a new private key
-        private_key_proc = subprocess.Popen(
-            [
-                'certtool',
-                '--generate-privkey',
-            ],
-            stdout=subprocess.PIPE
-        )
-        private_key = private_key_proc.communicate()[0]
         private_key_filename = os.path.join(
             self.local_path,
             self.DEFAULT_FILENAMES['key'],
         )
-        with open(private_key_filename, 'w') as out:
-            out.write(private_key)
-
-        # Create and write a new public key
-        cert_proc = subprocess.Popen(
-            [
-                'certtool',
-                '--generate-certificate',
-                '--load-privkey',
-                private_key_filename,
-                '--load-ca-privkey',
-                self.server_config['ca.key'],
-                '--load-ca-certificate',
-                self.server_config['ca.cert'],
-                '--template',
-                settings.TASKD_SIGNING_TEMPLATE,
-            ],
-            stdout=subprocess.PIPE
-        )
-        cert = cert_proc.communicate()[0]
         cert_filename = os.path.join(
             self.local_path,
             self.DEFAULT_FILENAMES['certificate'],
         )
-        with open(cert_filename, 'w') as out:
-            out.write(cert)
+
+        # Claim a pre-generated key (and certificate) if one is available
+        has_key = os.path.isfile(private_key_filename)
+        has_cert = has_key and os.path.isfile(cert_filename)
+        if not has_key and settings.TASKD_KEY_POOL_SIZE:
+            has_key, has_cert = KeyPool().claim(
+                private_key_filename,
+                cert_filename,
+            )
+            replenish_key_pool.apply_async()
+
+        # Create and write a new private key
+        if not has_key:
+            self.set_provisioning_state('generating_key')
+            certificates.write_private_file(
+                private_key_filename,
+                certificates.generate_private_key(),
+            )
+
+        # Create and write a new public key
+        if not has_cert:
+            self.set_provisioning_state('signing_certificate')
+            self.issue_certificate()
 
         # Save these details to the taskrc
-        taskd_credentials = '%s/%s/%s' % (
-            settings.TASKD_ORG,
-            self.user.username,
-            taskd_user_key,
-        )
         self.taskrc.update({
             'data.location': self.local_path,
             'taskd.certificate': cert_filename,
@@ -424,12 +768,21 @@ class TaskStore(models.Model):
             'taskd.server': settings.TASKD_SERVER,
             'taskd.credentials': taskd_credentials
         })
-        self.metadata['generated_taskd_credentials'] = taskd_credentials
 
         self.save()
+        self.set_provisioning_state('initial_sync')
         self.client.sync(init=True)
         self.create_git_checkpoint("Local store created")
 
+        self.configured = True
+        self.provisioning_state = 'complete'
+        self.provisioning_updated = now()
+        TaskStore.objects.filter(pk=self.pk).update(
+            configured=True,
+            provisioning_state='complete',
+            provisioning_updated=self.provisioning_updated,
+        )
+
     def _log_entry(self, message, error, *parameters):
         message_hash = hashlib.md5(message % parameters).hexdigest()
         instance, created = TaskStoreActivityLog.objects.get_or_create(
@@ -469,12 +822,209 @@ class TaskStoreActivityLog(models.Model):
     error = models.BooleanField(default=False)
     message = models.TextField()
     count = models.IntegerField(default=0)
+    rollup = models.BooleanField(default=False)
+
+    ROLLUP_MESSAGE = "Daily error summary for %s."
+    ROLLUP_LINE = re.compile(r'^(\d+) x (.*)$')
+    DELETE_CHUNK_SIZE = 500
+
+    @classmethod
+    def expire_messages(cls, before):
+        """ Deletes non-error entries last seen before ``before``.
+
+        Returns the number of deleted rows.
+
+        """
+        expired = cls.objects.filter(
+            error=False,
+            last_seen__lt=before,
+        )
+        count = expired.count()
+        expired.delete()
+        return count
+
+    @classmethod
+    def format_rollup(cls, day, messages):
+        lines = [cls.ROLLUP_MESSAGE % day.isoformat()]
+        for message, count in sorted(
+            messages.items(), key=lambda item: (-item[1], item[0], )
+        ):
+            lines.append(u'%s x %s' % (count, message))
+        return u'\n'.join(lines)
+
+    @classmethod
+    def parse_rollup(cls, message):
+        messages = {}
+        for line in message.split('\n')[1:]:
+            matched = cls.ROLLUP_LINE.match(line)
+            if matched:
+                messages[matched.group(2)] = int(matched.group(1))
+        return messages
+
+    @classmethod
+    def rollup_errors(cls, before):
+        """ Collapses error entries last seen before ``before`` into a
+        single summary entry per store per day, listing each distinct
+        message and how many times it was seen.
+
+        Returns the number of entries that were rolled up.
+
+        """
+        groups = {}
+        entries = cls.objects.filter(
+            error=True,
+            rollup=False,
+            last_seen__lt=before,
+        ).values_list('pk', 'store_id', 'last_seen', 'count', 'message')
+        for pk, store_id, last_seen, count, message in entries.iterator():
+            key = (store_id, last_seen.date(), )
+            group = groups.setdefault(
+                key, {
+                    'ids': [],
+                    'count': 0,
+                    'messages': {},
+                    'first_seen': last_seen,
+                    'last_seen': last_seen,
+                }
+            )
+            group['ids'].append(pk)
+            group['count'] += count
+            # One line per message in the summary
+            message = u' '.join(message.split())
+            group['messages'][message] = (
+                group['messages'].get(message, 0) + count
+            )
+            group['first_seen'] = min(group['first_seen'], last_seen)
+            group['last_seen'] = max(group['last_seen'], last_seen)
+
+        rolled_up = 0
+        for (store_id, day), group in groups.items():
+            # Identified by the day alone, since the messages listed
+            # change as later entries are rolled into it.
+            heading = cls.ROLLUP_MESSAGE % day.isoformat()
+            with transaction.atomic():
+                summary, created = cls.objects.get_or_create(
+                    store_id=store_id,
+                    md5hash=hashlib.md5(heading).hexdigest(),
+                    defaults={
+                        'error': True,
+                        'rollup': True,
+                        'message': heading,
+                        'count': 0,
+                    }
+                )
+                first_seen = group['first_seen']
+                last_seen = group['last_seen']
+                messages = group['messages']
+                if not created:
+                    first_seen = min(first_seen, summary.created)
+                    last_seen = max(last_seen, summary.last_seen)
+                    for message, count in cls.parse_rollup(
+                        summary.message
+                    ).items():
+                        messages[message] = messages.get(message, 0) + count
+                # ``last_seen`` and ``created`` are set automatically on
+                # save, so they are backdated with an update instead.
+                cls.objects.filter(pk=summary.pk).update(
+                    message=cls.format_rollup(day, messages),
+                    count=summary.count + group['count'],
+                    created=first_seen,
+                    last_seen=last_seen,
+                )
+                ids = group['ids']
+                for idx in range(0, len(ids), cls.DELETE_CHUNK_SIZE):
+                    cls.objects.filter(
+                        pk__in=ids[idx:idx + cls.DELETE_CHUNK_SIZE]
+                    ).delete()
+            rolled_up += len(group['ids'])
+        return rolled_up
+
+    @classmethod
+    def vacuum(cls):
+        """ Reclaims space freed by deleted entries, where supported. """
+        cursor = connection.cursor()
+        if connection.vendor == 'postgresql':
+            cursor.execute('VACUUM ANALYZE %s' % cls._meta.db_table)
+        elif connection.vendor == 'sqlite':
+            cursor.execute('VACUUM')
+
+    @classmethod
+    def counts_by_store(cls):
+        return dict(
+            cls.objects.values_list(
+                'store__user__username'
+            ).annotate(
+                entries=Count('id')
+            ).order_by()
+        )
 
     def __unicode__(self):
         return self.message.replace('\n', ' ')[0:50]
 
     class Meta:
         unique_together = ('store', 'md5hash', )
+        index_together = [
+            ['store', 'last_seen', ],
+            ['store', 'error', 'last_seen', ],
+        ]
+
+
+class TaskStoreLockStatistics(models.Model):
+    """ Running totals of lock contention for a single store. """
+    store = models.OneToOneField(TaskStore, related_name='lock_statistics')
+    acquisitions = models.IntegerField(default=0)
+    errors = models.IntegerField(default=0)
+    timeouts = models.IntegerField(default=0)
+    total_wait = models.FloatField(default=0)
+    max_wait = models.FloatField(default=0)
+    total_hold = models.FloatField(default=0)
+    max_hold = models.FloatField(default=0)
+    last_operation = models.CharField(max_length=255, blank=True)
+    last_function = models.CharField(max_length=255, blank=True)
+    last_outcome = models.CharField(max_length=32, blank=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def record(cls, store, owner, outcome, wait, hold=0):
+        """ Adds a single lock acquisition (or attempt) to the totals. """
+        updates = {
+            'total_wait': F('total_wait') + wait,
+            'total_hold': F('total_hold') + hold,
+            'last_operation': (owner.get('operation') or '')[0:255],
+            'last_function': (owner.get('function') or '')[0:255],
+            'last_outcome': outcome,
+            'updated': now(),
+        }
+        if outcome == 'timeout':
+            updates['timeouts'] = F('timeouts') + 1
+        else:
+            updates['acquisitions'] = F('acquisitions') + 1
+            if outcome == 'error':
+                updates['errors'] = F('errors') + 1
+
+        statistics = cls.objects.filter(store=store)
+        if not statistics.update(**updates):
+            cls.objects.get_or_create(store=store)
+            statistics.update(**updates)
+        statistics.filter(max_wait__lt=wait).update(max_wait=wait)
+        statistics.filter(max_hold__lt=hold).update(max_hold=hold)
+
+    @property
+    def mean_wait(self):
+        attempts = self.acquisitions + self.timeouts
+        return self.total_wait / attempts if attempts else 0
+
+    @property
+    def mean_hold(self):
+        if not self.acquisitions:
+            return 0
+        return self.total_hold / self.acquisitions
+
+    def __unicode__(self):
+        return 'Lock statistics for %s' % self.store
+
+    class Meta:
+        verbose_name_plural = 'task store lock statistics'
 
 
 class UserMetadata(models.Model):
@@ -694,18 +1244,35 @@ class TaskRc(object):
         return self.__unicode__().encode('utf-8', 'REPLACE')
 
 
+def get_server_config():
+    return TaskRc(
+        os.path.join(
+            settings.TASKD_DATA,
+            'config'
+        ),
+        read_only=True
+    )
+
+
 def autoconfigure_taskd_for_user(sender, instance, **kwargs):
-    store = TaskStore.get_for_user(instance)
-    try:
-        if not store.configured:
-            store.autoconfigure_taskd()
-    except:
-        if not settings.DEBUG:
-            raise
-        message = "Error encountered while configuring task store."
-        logger.exception(message)
-        store.log_error(message)
+    # Django 1.6 has no hook to run once a transaction commits, so a user
+    # saved within one is instead provisioned on their first API request.
+    if transaction.get_connection().in_atomic_block:
+        return
+    TaskStore.get_for_user(instance).queue_provisioning()
+
+
+def record_lock_release(sender, store, owner, wait, hold, outcome, **kwargs):
+    metrics.record_lock_release(owner, wait, hold, outcome)
+    TaskStoreLockStatistics.record(store, owner, outcome, wait, hold)
+
+
+def record_lock_timeout(sender, store, owner, wait, **kwargs):
+    metrics.record_lock_timeout(owner, wait)
+    TaskStoreLockStatistics.record(store, owner, 'timeout', wait)
 
 
 models.signals.post_save.connect(create_api_key, sender=User)
 models.signals.post_save.connect(autoconfigure_taskd_for_user, sender=User)
+lock_released.connect(record_lock_release)
+lock_timed_out.connect(record_lock_timeout)
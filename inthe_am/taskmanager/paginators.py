@@ -0,0 +1,102 @@
+import urllib
+
+import dateutil.parser
+
+from django.db.models import Q
+from tastypie.exceptions import BadRequest
+from tastypie.paginator import Paginator
+
+
+class KeysetPaginator(Paginator):
+    """ Paginator supporting keyset ("seek") pagination.
+
+    When the ``cursor`` parameter is present in the request, the page is
+    selected by seeking past the ``(keyset_field, pk)`` pair encoded in the
+    cursor rather than by an ``OFFSET``, so deep pages cost the same as
+    the first one and no ``COUNT(*)`` is issued.  Requests without a
+    ``cursor`` parameter are paginated by offset as usual.
+
+    The incoming queryset must be ordered by ``-<keyset_field>, -pk``.
+
+    """
+    cursor_param = 'cursor'
+    keyset_field = 'last_seen'
+
+    def encode_cursor(self, obj):
+        return '%s,%s' % (
+            getattr(obj, self.keyset_field).isoformat(),
+            obj.pk,
+        )
+
+    def decode_cursor(self, cursor):
+        try:
+            value, pk = cursor.rsplit(',', 1)
+            return dateutil.parser.parse(value), int(pk)
+        except (ValueError, TypeError, OverflowError):
+            raise BadRequest(
+                "Invalid cursor '%s' provided." % cursor
+            )
+
+    def get_cursor_uri(self, limit, cursor):
+        if self.resource_uri is None:
+            return None
+
+        request_params = {}
+        for k, v in self.request_data.items():
+            if isinstance(v, unicode):
+                request_params[k] = v.encode('utf-8')
+            else:
+                request_params[k] = v
+        request_params.pop('offset', None)
+        request_params.update({
+            'limit': limit,
+            self.cursor_param: cursor,
+        })
+
+        return '%s?%s' % (
+            self.resource_uri,
+            urllib.urlencode(request_params)
+        )
+
+    def get_keyset_slice(self, limit, cursor):
+        objects = self.objects
+        if cursor:
+            value, pk = self.decode_cursor(cursor)
+            objects = objects.filter(
+                Q(**{'%s__lt' % self.keyset_field: value})
+                | Q(**{self.keyset_field: value, 'pk__lt': pk})
+            )
+        if not limit:
+            return list(objects)
+        # Fetch one extra row so we know whether a next page exists
+        # without having to count the remaining rows.
+        return list(objects[:limit + 1])
+
+    def page(self):
+        if self.cursor_param not in self.request_data:
+            return super(KeysetPaginator, self).page()
+
+        limit = self.get_limit()
+        cursor = self.request_data.get(self.cursor_param)
+        objects = self.get_keyset_slice(limit, cursor)
+
+        next_cursor = None
+        if limit and len(objects) > limit:
+            objects = objects[:limit]
+            next_cursor = self.encode_cursor(objects[-1])
+
+        meta = {
+            'limit': limit,
+            'cursor': cursor or None,
+            'next_cursor': next_cursor,
+            'next': (
+                self.get_cursor_uri(limit, next_cursor)
+                if next_cursor else None
+            ),
+            'previous': None,
+        }
+
+        return {
+            self.collection_name: objects,
+            'meta': meta,
+        }
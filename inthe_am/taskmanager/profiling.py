@@ -0,0 +1,192 @@
+from contextlib import contextmanager
+import json
+import logging
+import random
+import re
+import subprocess
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .locks import lock_acquired, lock_timed_out
+
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class RequestProfile(object):
+    """ Time spent in each phase of handling a single request.
+
+    Phases may nest (Taskwarrior and git commands are run within a
+    checkpoint, for example), so their durations need not add up to
+    the total.
+
+    """
+    def __init__(self):
+        self.started = time.time()
+        self.phases = {}
+
+    def add(self, phase, duration, detail=None):
+        name = phase if not detail else '%s.%s' % (phase, detail)
+        total, count = self.phases.get(name, (0.0, 0, ))
+        self.phases[name] = (total + duration, count + 1, )
+
+    @property
+    def duration(self):
+        return time.time() - self.started
+
+
+def get_current_profile():
+    return getattr(_local, 'profile', None)
+
+
+def start_profile():
+    _local.profile = RequestProfile()
+    return _local.profile
+
+
+def end_profile():
+    profile = get_current_profile()
+    _local.profile = None
+    return profile
+
+
+@contextmanager
+def timed(phase, detail=None):
+    """ Adds the time spent within this block to the current request's
+    profile, if one is being collected.
+
+    """
+    profile = get_current_profile()
+    if profile is None:
+        yield
+        return
+    started = time.time()
+    try:
+        yield
+    finally:
+        profile.add(phase, time.time() - started, detail)
+
+
+def record(phase, duration, detail=None):
+    profile = get_current_profile()
+    if profile is not None:
+        profile.add(phase, duration, detail)
+
+
+class ProfiledPopen(subprocess.Popen):
+    """ A ``Popen`` whose ``communicate`` is timed as ``phase``. """
+    def __init__(self, phase, detail, *args, **kwargs):
+        self.phase = phase
+        self.detail = re.sub(r'[^\w-]+', '_', detail or '')[0:32] or None
+        super(ProfiledPopen, self).__init__(*args, **kwargs)
+
+    def communicate(self, *args, **kwargs):
+        with timed(self.phase, self.detail):
+            return super(ProfiledPopen, self).communicate(*args, **kwargs)
+
+
+def record_lock_wait(sender, wait, **kwargs):
+    record('lock', wait)
+
+
+lock_acquired.connect(record_lock_wait)
+lock_timed_out.connect(record_lock_wait)
+
+
+class RequestProfilingMiddleware(object):
+    """ Breaks each request's duration down by phase.
+
+    The breakdown is returned in a ``Server-Timing`` header (to staff,
+    unless ``REQUEST_PROFILING_SERVER_TIMING`` is set) and, for a
+    sample of requests (and for every request slower than
+    ``REQUEST_PROFILING_SLOW_SECONDS``), logged.
+
+    Query timings are only collected by the debug cursor, which keeps
+    every query made, so are left out unless the request was sampled
+    or ``REQUEST_PROFILING_QUERIES`` is set.
+
+    """
+    def process_request(self, request):
+        start_profile()
+        request._profile_sampled = random.random() < float(
+            settings.REQUEST_PROFILING_SAMPLE_RATE
+        )
+        if request._profile_sampled or settings.REQUEST_PROFILING_QUERIES:
+            connection.use_debug_cursor = True
+            request._profile_query_count = len(connection.queries)
+
+    def process_response(self, request, response):
+        profile = end_profile()
+        if profile is None:
+            return response
+
+        if hasattr(request, '_profile_query_count'):
+            connection.use_debug_cursor = None
+            queries = connection.queries[request._profile_query_count:]
+            for query in queries:
+                profile.add('db', float(query['time']))
+
+        duration = profile.duration
+        if self.shows_server_timing(request):
+            response['Server-Timing'] = self.get_server_timing(
+                profile, duration
+            )
+
+        if (
+            duration >= float(settings.REQUEST_PROFILING_SLOW_SECONDS)
+            or getattr(request, '_profile_sampled', False)
+        ):
+            self.log_profile(request, response, profile, duration)
+        return response
+
+    def shows_server_timing(self, request):
+        # Phases name the commands run, which needn't be public.
+        user = getattr(request, 'user', None)
+        return bool(
+            settings.REQUEST_PROFILING_SERVER_TIMING
+            or user and user.is_staff
+        )
+
+    def get_server_timing(self, profile, duration):
+        entries = []
+        for name, (total, count) in sorted(profile.phases.items()):
+            entries.append(
+                '%s;dur=%.1f;desc="%s call%s"' % (
+                    name,
+                    total * 1000,
+                    count,
+                    '' if count == 1 else 's',
+                )
+            )
+        entries.append('total;dur=%.1f' % (duration * 1000))
+        return ', '.join(entries)
+
+    def log_profile(self, request, response, profile, duration):
+        data = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'user': (
+                request.user.username
+                if getattr(request, 'user', None)
+                and request.user.is_authenticated()
+                else None
+            ),
+            'duration': round(duration, 4),
+            'phases': dict(
+                (name, {'duration': round(total, 4), 'count': count})
+                for name, (total, count) in profile.phases.items()
+            ),
+        }
+        logger.info(
+            'Request profile: %s',
+            json.dumps(data, sort_keys=True),
+            extra={
+                'data': data,
+            }
+        )
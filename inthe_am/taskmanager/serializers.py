@@ -0,0 +1,158 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from tastypie.exceptions import ApiFieldError
+
+try:
+    # Encodes considerably faster than the standard library's module
+    import simplejson as json
+except ImportError:
+    import json
+
+from . import timestamps
+from .task import Task
+
+
+_encode_default = DjangoJSONEncoder().default
+
+URI_PLACEHOLDER = 'URIPLACEHOLDER'
+
+
+def dumps(data):
+    """ Encodes simplified data (see tastypie's ``Serializer.to_simple``)
+    exactly as tastypie's JSON serializer would.
+
+    """
+    return json.dumps(
+        data,
+        default=_encode_default,
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+
+
+def stream_json(data, collection_name, items):
+    """ Yields the JSON encoding of ``data`` in pieces, with the
+    already-encoded ``items`` as the list at ``collection_name``.
+
+    The pieces join to exactly what ``dumps`` would have produced for
+    the whole, so a list can be sent as each item is encoded rather
+    than once all of them have been.
+
+    """
+    keys = sorted(list(data.keys()) + [collection_name])
+    for index, key in enumerate(keys):
+        yield u'{' if index == 0 else u', '
+        yield dumps(key) + u': '
+        if key != collection_name:
+            yield dumps(data[key])
+            continue
+        yield u'['
+        for item_index, item in enumerate(items):
+            yield item if item_index == 0 else u', ' + item
+        yield u']'
+    yield u'}'
+
+
+class _Placeholder(object):
+    uuid = URI_PLACEHOLDER
+
+
+class CompiledTaskSerializer(object):
+    """ Produces, for a ``Task``, exactly the simplified data tastypie's
+    ``full_dehydrate`` and ``Serializer.to_simple`` would.
+
+    The work tastypie repeats for every task -- resolving each field's
+    attribute, reversing the resource URI, formatting dates -- is done
+    once per resource; fields stored as-is in the task's JSON are read
+    straight from it.  Resources using ``dehydrate_<field>`` methods
+    (other than for ``resource_uri``) or a ``dehydrate`` hook are not
+    supported.
+
+    """
+    FORMATTED_DATES_LIMIT = 4096
+
+    def __init__(self, resource):
+        self.serializer = resource._meta.serializer
+        self.formatted_dates = {}
+        self.resource_uri = None
+        if 'resource_uri' in resource.fields:
+            self.resource_uri = resource.get_resource_uri(_Placeholder())
+        self.fields = []
+        for name, field in resource.fields.items():
+            if name == 'resource_uri':
+                continue
+            if field.attribute in Task.DATE_FIELDS:
+                # Formatted directly from the raw value
+                self.fields.append((name, field, self.read_date, False, ))
+            elif (
+                field.attribute in Task.COMPUTED_FIELDS
+                or hasattr(Task, field.attribute)
+            ):
+                self.fields.append(
+                    (name, field, self.read_attribute, True, )
+                )
+            else:
+                self.fields.append((name, field, self.read_json, True, ))
+
+    def read_json(self, task, attribute):
+        return task.json.get(attribute)
+
+    def read_attribute(self, task, attribute):
+        return getattr(task, attribute, None)
+
+    def read_date(self, task, attribute):
+        value = task.json.get(attribute)
+        if value is None:
+            return None
+        formatted = self.formatted_dates.get(value)
+        if formatted is None:
+            if len(self.formatted_dates) >= self.FORMATTED_DATES_LIMIT:
+                self.formatted_dates.clear()
+            formatted = self.formatted_dates[value] = (
+                self.serializer.format_datetime(timestamps.decode(value))
+            )
+        return formatted
+
+    def simplify(self, task, field, value):
+        if value is None:
+            if field.has_default():
+                value = field._default
+            elif field.null:
+                return None
+            else:
+                raise ApiFieldError(
+                    "The object '%r' has an empty attribute '%s' and "
+                    "doesn't allow a default or null value." % (
+                        task, field.attribute,
+                    )
+                )
+        if callable(value):
+            value = value()
+        value = field.convert(value)
+        if value is None or isinstance(
+            value, (unicode, bool, int, long, float, )
+        ):
+            return value
+        return self.serializer.to_simple(value, {})
+
+    def serialize(self, task, fields=None):
+        """ Returns the simplified data for ``task``.
+
+        If ``fields`` is given, only the fields named in it are
+        included; the others are not evaluated at all.
+
+        """
+        data = {}
+        for name, field, reader, needs_simplifying in self.fields:
+            if fields is not None and name not in fields:
+                continue
+            value = reader(task, field.attribute)
+            if needs_simplifying or value is None:
+                value = self.simplify(task, field, value)
+            data[name] = value
+        if self.resource_uri is not None and (
+            fields is None or 'resource_uri' in fields
+        ):
+            data['resource_uri'] = self.resource_uri.replace(
+                URI_PLACEHOLDER, task.json['uuid']
+            )
+        return data
@@ -3,6 +3,19 @@ var App = Ember.Application.create({
 
 App.ApplicationAdapter = DS.DjangoTastypieAdapter.extend({
   namespace: 'api/v1',
+  ajax: function(url, type, hash) {
+    var outbox = this.container.lookup('controller:application').get(
+      'taskOutbox'
+    );
+    if (type == 'GET' || !outbox) {
+      return this._super(url, type, hash);
+    }
+    // Sent (or queued, while offline) by the outbox
+    var adapter = this;
+    return outbox.send(url, type, hash && hash.data).then(null, function(jqXHR) {
+      throw adapter.ajaxError(jqXHR);
+    });
+  }
 });
 App.ApplicationSerializer = DS.DjangoTastypieSerializer.extend({
 });
@@ -1,3 +1,5 @@
+var offline = require('../offline');
+
 var controller = Ember.Controller.extend({
   needs: ['tasks', 'activityLog', 'configure'],
   user: null,
@@ -77,6 +79,11 @@ var controller = Ember.Controller.extend({
       }
     });
 
+    // Tasks are kept locally, and changes queued while offline
+    if(this.get('user').logged_in) {
+      this.startTaskSync();
+    }
+
     // Set up the event stream
     if(this.get('taskUpdateStreamEnabled')) {
       this.set('statusUpdaterLog', []);
@@ -84,6 +91,24 @@ var controller = Ember.Controller.extend({
       setInterval(this.checkStatusUpdater.bind(this), 500);
     }
   },
+  startTaskSync: function() {
+    var cache = offline.TaskCache.create({
+      name: 'inthe_am-tasks-' + this.get('user').uid
+    });
+    var outbox = offline.TaskOutbox.create({cache: cache});
+    this.set('taskCache', cache);
+    this.set('taskOutbox', outbox);
+    this.set('taskSync', offline.TaskSync.create({
+      store: this.store,
+      cache: cache,
+      outbox: outbox
+    }));
+    window.addEventListener('online', function() {
+      Ember.run(this, function() {
+        this.get('taskSync').synchronize();
+      });
+    }.bind(this));
+  },
   checkStatusUpdater: function() {
     var statusUpdater = this.get('statusUpdater');
     var connected = this.get('taskUpdateStreamConnected');
@@ -185,6 +210,9 @@ var controller = Ember.Controller.extend({
       this.get('statusUpdater').close();
       this.set('statusUpdaterHead', evt.data);
       this.get('startEventStream').bind(this)();
+      if (this.get('taskSync')) {
+        this.get('taskSync').synchronize();
+      }
       try {
         this.store.find('activityLog').update();
       } catch(e) {
@@ -227,7 +255,15 @@ var controller = Ember.Controller.extend({
       window.location = this.get('urls.login');
     },
     logout: function(){
-      window.location = this.get('urls.logout');
+      var url = this.get('urls.logout');
+      var cache = this.get('taskCache');
+      if (!cache) {
+        window.location = url;
+        return;
+      }
+      cache.clear()['finally'](function() {
+        window.location = url;
+      });
     }
   }
 });
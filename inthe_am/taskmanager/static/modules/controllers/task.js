@@ -1,5 +1,9 @@
 var controller = Ember.ObjectController.extend({
-  needs: ['tasks'],
+  needs: ['tasks', 'application'],
+  sendTaskAction: function(uuid, action) {
+    var url = this.store.adapterFor('task').buildURL('task', uuid) + action + '/';
+    return this.get('controllers.application.taskOutbox').send(url, 'POST');
+  },
   actions: {
     'complete': function(){
       var result = confirm("Are you sure you would like to mark this task as completed?");
@@ -28,12 +32,8 @@ var controller = Ember.ObjectController.extend({
     'start': function() {
       var model = this.get('model');
       model.set('start', new Date());
-      var url = this.store.adapterFor('task').buildURL('task', model.get('uuid')) + 'start/';
-      $.ajax({
-        url: url,
-        dataType: 'json',
-        type: 'POST',
-        success: function() {
+      this.sendTaskAction(model.get('uuid'), 'start').then(function() {
+        if (navigator.onLine !== false) {
           model.reload();
         }
       });
@@ -41,12 +41,8 @@ var controller = Ember.ObjectController.extend({
     'stop': function() {
       var model = this.get('model');
       model.set('start', null);
-      var url = this.store.adapterFor('task').buildURL('task', model.get('uuid')) + 'stop/';
-      $.ajax({
-        url: url,
-        dataType: 'json',
-        type: 'POST',
-        success: function() {
+      this.sendTaskAction(model.get('uuid'), 'stop').then(function() {
+        if (navigator.onLine !== false) {
           model.reload();
         }
       });
@@ -55,16 +51,10 @@ var controller = Ember.ObjectController.extend({
       var result = confirm("Are you sure you would like to delete this task?");
       if(result) {
         var self = this;
-        var url = this.store.adapterFor('task').buildURL('task', this.get('uuid')) + 'delete/';
-        $.ajax({
-          url: url,
-          dataType: 'json',
-          type: 'POST',
-          success: function(){
-            self.get('model').unloadRecord();
-            self.get('controllers.tasks').refresh();
-            self.transitionToRoute('tasks');
-          }
+        this.sendTaskAction(this.get('uuid'), 'delete').then(function(){
+          self.get('model').unloadRecord();
+          self.get('controllers.tasks').refresh();
+          self.transitionToRoute('tasks');
         });
       }
     }
@@ -1,8 +1,14 @@
 var controller = Ember.ArrayController.extend({
+  needs: ['application'],
   sortProperties: ['urgency'],
   sortAscending: false,
   refresh: function(){
-    this.get('content').update();
+    var taskSync = this.get('controllers.application.taskSync');
+    if (taskSync) {
+      taskSync.synchronize();
+    } else {
+      this.get('content').update();
+    }
   },
   pendingTasks: function() {
     var result = this.get('model').filterProperty('status', 'pending');
@@ -0,0 +1,187 @@
+var DB_VERSION = 1;
+
+/**
+  Persists tasks (as returned by the API), the repository head they
+  reflect, and queued changes in IndexedDB.
+
+  Where IndexedDB isn't available (or can't be opened, as in some
+  browsers' private modes), reads find nothing and writes do nothing.
+*/
+var TaskCache = Ember.Object.extend({
+  name: null,
+
+  open: function() {
+    var name = this.get('name');
+    if (!this._opened) {
+      this._opened = new Ember.RSVP.Promise(function(resolve) {
+        if (!window.indexedDB) {
+          resolve(null);
+          return;
+        }
+        var request = window.indexedDB.open(name, DB_VERSION);
+        request.onupgradeneeded = function(evt) {
+          var db = evt.target.result;
+          db.createObjectStore('tasks', {keyPath: 'uuid'});
+          db.createObjectStore('meta');
+          db.createObjectStore('outbox', {keyPath: 'id', autoIncrement: true});
+        };
+        request.onsuccess = function(evt) {
+          Ember.run(null, resolve, evt.target.result);
+        };
+        request.onerror = function(evt) {
+          evt.preventDefault();
+          Ember.run(null, resolve, null);
+        };
+      });
+    }
+    return this._opened;
+  },
+
+  /**
+    Runs `work(transaction, result)` in a transaction on `storeNames`,
+    resolving with `result.value` once the transaction completes.
+  */
+  transaction: function(storeNames, mode, work) {
+    return this.open().then(function(db) {
+      if (!db) {
+        return undefined;
+      }
+      return new Ember.RSVP.Promise(function(resolve, reject) {
+        var result = {};
+        var transaction = db.transaction(storeNames, mode);
+        transaction.oncomplete = function() {
+          Ember.run(null, resolve, result.value);
+        };
+        transaction.onerror = transaction.onabort = function() {
+          Ember.run(null, reject, transaction.error);
+        };
+        work(transaction, result);
+      });
+    });
+  },
+
+  getAll: function(transaction, storeName, callback) {
+    var values = [];
+    transaction.objectStore(storeName).openCursor().onsuccess = function(evt) {
+      var cursor = evt.target.result;
+      if (cursor) {
+        values.push(cursor.value);
+        cursor['continue']();
+      } else {
+        callback(values);
+      }
+    };
+  },
+
+  /**
+    Resolves with `{head: ..., tasks: [...]}`, or with nothing if no
+    tasks have been cached.
+  */
+  load: function() {
+    var self = this;
+    return this.transaction(['tasks', 'meta'], 'readonly', function(tx, result) {
+      tx.objectStore('meta').get('head').onsuccess = function(evt) {
+        var head = evt.target.result;
+        if (!head) {
+          return;
+        }
+        self.getAll(tx, 'tasks', function(tasks) {
+          result.value = {head: head, tasks: tasks};
+        });
+      };
+    });
+  },
+
+  /**
+    Stores `tasks` and removes those having UUIDs in `deleted`, as of
+    repository head `head`; with `replace`, all other tasks are removed.
+  */
+  save: function(tasks, deleted, head, replace) {
+    return this.transaction(['tasks', 'meta'], 'readwrite', function(tx) {
+      var store = tx.objectStore('tasks');
+      if (replace) {
+        store.clear();
+      }
+      tasks.forEach(function(task) {
+        store.put(task);
+      });
+      (deleted || []).forEach(function(uuid) {
+        store['delete'](uuid);
+      });
+      if (head) {
+        tx.objectStore('meta').put(head, 'head');
+      }
+    });
+  },
+
+  /**
+    Resolves with the cached task having UUID `uuid`, if any.
+  */
+  get: function(uuid) {
+    return this.transaction(['tasks'], 'readonly', function(tx, result) {
+      tx.objectStore('tasks').get(uuid).onsuccess = function(evt) {
+        result.value = evt.target.result;
+      };
+    });
+  },
+
+  /**
+    Applies `changes` to the cached task having UUID `uuid`, if any.
+  */
+  update: function(uuid, changes) {
+    return this.transaction(['tasks'], 'readwrite', function(tx) {
+      var store = tx.objectStore('tasks');
+      store.get(uuid).onsuccess = function(evt) {
+        var task = evt.target.result;
+        if (task) {
+          store.put(Ember.$.extend(task, changes));
+        }
+      };
+    });
+  },
+
+  enqueue: function(entry) {
+    return this.transaction(['outbox'], 'readwrite', function(tx, result) {
+      tx.objectStore('outbox').add(entry).onsuccess = function(evt) {
+        result.value = evt.target.result;
+      };
+    });
+  },
+
+  /**
+    Resolves with the queued changes, oldest first.
+  */
+  queued: function() {
+    var self = this;
+    return this.transaction(['outbox'], 'readonly', function(tx, result) {
+      self.getAll(tx, 'outbox', function(entries) {
+        result.value = entries;
+      });
+    });
+  },
+
+  updateQueued: function(entries) {
+    return this.transaction(['outbox'], 'readwrite', function(tx) {
+      entries.forEach(function(entry) {
+        tx.objectStore('outbox').put(entry);
+      });
+    });
+  },
+
+  dequeue: function(id) {
+    return this.transaction(['outbox'], 'readwrite', function(tx) {
+      tx.objectStore('outbox')['delete'](id);
+    });
+  },
+
+  clear: function() {
+    var names = ['tasks', 'meta', 'outbox'];
+    return this.transaction(names, 'readwrite', function(tx) {
+      names.forEach(function(name) {
+        tx.objectStore(name).clear();
+      });
+    });
+  }
+});
+
+module.exports = TaskCache;
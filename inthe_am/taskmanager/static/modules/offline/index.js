@@ -0,0 +1,5 @@
+module.exports = {
+  TaskCache: require('./cache'),
+  TaskOutbox: require('./outbox'),
+  TaskSync: require('./sync')
+};
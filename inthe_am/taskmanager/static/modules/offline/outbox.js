@@ -0,0 +1,281 @@
+var TASK_URL = /\/task\/(?:([0-9a-f-]{36})\/)?([a-z_]+\/)?$/;
+// Responses refusing a change outright; it would be on every attempt.
+var REJECTED_STATUSES = [400, 404];
+var RETRY_DELAY = 5000;
+var MAX_RETRY_DELAY = 5 * 60 * 1000;
+
+var uuid4 = function() {
+  return 'xxxxxxxx-xxxx-4xxx-yxxx-xxxxxxxxxxxx'.replace(/[xy]/g, function(c) {
+    var r = Math.random() * 16 | 0;
+    return (c == 'x' ? r : (r & 0x3 | 0x8)).toString(16);
+  });
+};
+
+/**
+  Sends changes to the server, queueing them in the task cache while
+  it can't be reached -- or while earlier changes are still queued --
+  and replaying them, in order, once it can.
+
+  Queued task changes -- including starting, stopping and deleting a
+  task -- are applied to the cache straight away and resolve as if the
+  server had accepted them; tasks created while offline are given a
+  provisional UUID until their creation is replayed, when `replayed`
+  is triggered with the queued entry and the server's response.
+
+  Queued edits are replayed onto the task as the server has it then, so
+  that only the fields changed here overwrite those changed elsewhere.
+  A change the server rejects is dropped; other failures (a conflict
+  for the task list's lock, an expired session, a server error) leave
+  it queued, to be retried with backoff.
+*/
+var TaskOutbox = Ember.Object.extend(Ember.Evented, {
+  cache: null,
+  length: 0,
+
+  init: function() {
+    this._super();
+    this.countQueued();
+  },
+
+  isQueueing: function() {
+    return window.navigator.onLine === false || this.get('length') > 0;
+  },
+
+  isUnreachable: function(jqXHR) {
+    return jqXHR && jqXHR.status === 0 && jqXHR.statusText != 'abort';
+  },
+
+  isResponse: function(reason) {
+    return Boolean(reason && reason.getAllResponseHeaders);
+  },
+
+  isRejected: function(jqXHR) {
+    return REJECTED_STATUSES.indexOf(jqXHR.status) != -1;
+  },
+
+  countQueued: function() {
+    var self = this;
+    return this.get('cache').queued().then(function(entries) {
+      self.set('length', (entries || []).length);
+    });
+  },
+
+  request: function(url, type, data) {
+    return new Ember.RSVP.Promise(function(resolve, reject) {
+      var hash = {
+        url: url,
+        type: type,
+        dataType: 'json',
+        success: function(json) {
+          Ember.run(null, resolve, json);
+        },
+        error: function(jqXHR) {
+          if (jqXHR.status >= 200 && jqXHR.status < 300) {
+            // Succeeded, with an empty response
+            Ember.run(null, resolve, null);
+          } else {
+            Ember.run(null, reject, jqXHR);
+          }
+        }
+      };
+      if (data) {
+        hash.contentType = 'application/json; charset=utf-8';
+        hash.data = JSON.stringify(data);
+      }
+      Ember.$.ajax(hash);
+    });
+  },
+
+  send: function(url, type, data) {
+    var self = this;
+    if (this.isQueueing()) {
+      return this.enqueue(url, type, data).then(function(task) {
+        if (window.navigator.onLine !== false) {
+          self.replay();
+        }
+        return task;
+      });
+    }
+    return this.request(url, type, data).then(null, function(jqXHR) {
+      if (self.isUnreachable(jqXHR)) {
+        return self.enqueue(url, type, data);
+      }
+      throw jqXHR;
+    });
+  },
+
+  enqueue: function(url, type, data) {
+    var self = this;
+    var cache = this.get('cache');
+    var match = TASK_URL.exec(url);
+    var entry = {url: url, type: type, data: data || null};
+    var uuid = match ? match[1] : null;
+    var action = match ? match[2] : null;
+    var task = null;
+    var cached = Ember.RSVP.resolve(null);
+
+    if (match && !action) {
+      if (type == 'POST' && !uuid) {
+        entry.provisional = uuid4();
+        task = Ember.$.extend({}, data, {
+          uuid: entry.provisional,
+          resource_uri: url + entry.provisional + '/'
+        });
+      } else if (type == 'PUT' && uuid) {
+        task = Ember.$.extend({}, data, {resource_uri: url});
+        // To tell which fields this edit changed
+        cached = cache.get(uuid);
+      }
+    }
+
+    return cached.then(function(previous) {
+      if (previous) {
+        entry.changed = self.getChangedFields(previous, data);
+      }
+      return cache.enqueue(entry);
+    }).then(function() {
+      self.incrementProperty('length');
+      if (task) {
+        return cache.save([task]);
+      } else if (!uuid) {
+        return;
+      } else if (action == 'delete/' || (!action && type == 'DELETE')) {
+        return cache.save([], [uuid]);
+      } else if (action == 'start/') {
+        return cache.update(uuid, {start: new Date().toISOString()});
+      } else if (action == 'stop/') {
+        return cache.update(uuid, {start: null});
+      }
+    }).then(function() {
+      return task;
+    });
+  },
+
+  getChangedFields: function(previous, task) {
+    return Object.keys(task).filter(function(name) {
+      return JSON.stringify(task[name]) != JSON.stringify(previous[name]);
+    });
+  },
+
+  replay: function() {
+    var self = this;
+    var failed = false;
+    if (!this._replaying) {
+      if (this._retryTimer) {
+        Ember.run.cancel(this._retryTimer);
+        this._retryTimer = null;
+      }
+      this._replaying = this.get('cache').queued().then(function(entries) {
+        return self.replayEntries(entries || []);
+      }).then(function() {
+        self._retryDelay = null;
+      }, function(reason) {
+        if (!self.isResponse(reason)) {
+          throw reason;
+        }
+        failed = true;
+      })['finally'](function() {
+        self._replaying = null;
+        return self.countQueued().then(function() {
+          if (!self.get('length')) {
+            return;
+          } else if (failed) {
+            self.scheduleReplay();
+          } else {
+            // Changes were queued during the replay
+            return self.replay();
+          }
+        });
+      });
+    }
+    return this._replaying;
+  },
+
+  /**
+    Replays queued changes again after a delay doubling with each
+    failed attempt; while offline, they're replayed once back online
+    instead.
+  */
+  scheduleReplay: function() {
+    if (window.navigator.onLine === false) {
+      return;
+    }
+    this._retryDelay = Math.min(
+      this._retryDelay ? this._retryDelay * 2 : RETRY_DELAY,
+      MAX_RETRY_DELAY
+    );
+    this._retryTimer = Ember.run.later(this, this.replay, this._retryDelay);
+  },
+
+  /**
+    Sends a queued entry: an edit is applied to the task as it is on the
+    server now.
+  */
+  replayEntry: function(entry) {
+    var self = this;
+    if (entry.type != 'PUT' || !entry.changed) {
+      return this.request(entry.url, entry.type, entry.data);
+    }
+    return this.request(entry.url, 'GET').then(function(current) {
+      var data = Ember.$.extend({}, current);
+      entry.changed.forEach(function(name) {
+        data[name] = entry.data[name];
+      });
+      return self.request(entry.url, entry.type, data);
+    });
+  },
+
+  replayEntries: function(entries) {
+    var self = this;
+    var cache = this.get('cache');
+    var entry = entries.shift();
+    if (!entry) {
+      return Ember.RSVP.resolve();
+    }
+    return this.replayEntry(entry).then(
+      function(payload) {
+        return cache.dequeue(entry.id).then(function() {
+          if (entry.provisional && payload && payload.uuid) {
+            self.trigger('replayed', entry, payload);
+            return self.replaceProvisional(
+              entries, entry.provisional, payload.uuid
+            );
+          }
+        });
+      },
+      function(jqXHR) {
+        if (!self.isResponse(jqXHR) || !self.isRejected(jqXHR)) {
+          // Left queued, to be tried again
+          throw jqXHR;
+        }
+        $.growl.error({
+          title: 'Change not saved',
+          message: 'A change made while offline could not be saved.'
+        });
+        return cache.dequeue(entry.id);
+      }
+    ).then(function() {
+      return self.replayEntries(entries);
+    });
+  },
+
+  /**
+    Points queued changes to a task created while offline at the UUID
+    it was given by the server.
+  */
+  replaceProvisional: function(entries, provisional, uuid) {
+    var changed = entries.filter(function(entry) {
+      var encoded = JSON.stringify([entry.url, entry.data]);
+      if (encoded.indexOf(provisional) == -1) {
+        return false;
+      }
+      encoded = JSON.parse(encoded.split(provisional).join(uuid));
+      entry.url = encoded[0];
+      entry.data = encoded[1];
+      return true;
+    });
+    return this.get('cache').updateQueued(changed);
+  }
+});
+
+module.exports = TaskOutbox;
@@ -0,0 +1,197 @@
+/**
+  Keeps the store's tasks, and their cached copies, up to date with the
+  server.
+
+  Tasks are loaded from the cache when there are any, and from then on
+  only the tasks changed since the cached repository head are fetched;
+  when that head is no longer known to the server (if the task data was
+  cleared, for example), every task is fetched again.
+*/
+var TaskSync = Ember.Object.extend({
+  store: null,
+  cache: null,
+  outbox: null,
+  head: null,
+  statusUrl: '/api/v1/user/status/',
+  listUrl: '/api/v1/task/',
+  changesUrl: '/api/v1/task/changes/',
+
+  init: function() {
+    this._super();
+    this.get('outbox').on('replayed', this, this.didReplay);
+  },
+
+  request: function(url, data) {
+    return new Ember.RSVP.Promise(function(resolve, reject) {
+      Ember.$.ajax({
+        url: url,
+        data: data,
+        dataType: 'json',
+        success: function(json) {
+          Ember.run(null, resolve, json);
+        },
+        error: function(jqXHR) {
+          Ember.run(null, reject, jqXHR);
+        }
+      });
+    });
+  },
+
+  isCacheable: function(task) {
+    return task.status != 'completed' && task.status != 'deleted';
+  },
+
+  push: function(tasks) {
+    var store = this.get('store');
+    var payload = {objects: Ember.$.extend(true, [], tasks)};
+    store.pushMany(
+      'task',
+      store.serializerFor('task').extractArray(
+        store, store.modelFor('task'), payload
+      )
+    );
+  },
+
+  unload: function(uuids) {
+    var store = this.get('store');
+    uuids.forEach(function(uuid) {
+      var record = store.getById('task', uuid);
+      if (record && !record.get('isDirty')) {
+        record.unloadRecord();
+      }
+    });
+  },
+
+  /**
+    Loads tasks into the store: from the cache, when possible, in which
+    case they're then synchronized in the background.
+  */
+  load: function() {
+    var self = this;
+    var store = this.get('store');
+    if (this._loaded) {
+      return this._loaded;
+    }
+    this._loaded = this.get('cache').load().then(function(cached) {
+      if (!cached) {
+        return self.fetchAll();
+      }
+      self.set('head', cached.head);
+      self.push(cached.tasks);
+      Ember.run.next(self, self.synchronize);
+    }).then(function() {
+      return store.all('task');
+    }, function(reason) {
+      self._loaded = null;
+      throw reason;
+    });
+    return this._loaded;
+  },
+
+  /**
+    Fetches every task, replacing any others.
+  */
+  fetchAll: function() {
+    var self = this;
+    var store = this.get('store');
+    var tasks = [];
+    var head = null;
+    var fetchPage = function(url) {
+      return self.request(url).then(function(page) {
+        tasks.push.apply(tasks, page.objects);
+        if (page.meta && page.meta.next) {
+          return fetchPage(page.meta.next);
+        }
+      });
+    };
+    // Changes made after this head may be fetched again, but that's
+    // harmless.
+    return this.request(this.get('statusUrl')).then(function(status) {
+      head = status.repository_head;
+      return fetchPage(self.get('listUrl'));
+    }).then(function() {
+      var uuids = tasks.map(function(task) {
+        return task.uuid;
+      });
+      self.push(tasks);
+      self.unload(
+        store.all('task').filter(function(record) {
+          return (
+            record.get('status') != 'completed' &&
+            uuids.indexOf(record.get('id')) == -1
+          );
+        }).map(function(record) {
+          return record.get('id');
+        })
+      );
+      self.set('head', head);
+      return self.get('cache').save(tasks, null, head, true);
+    });
+  },
+
+  fetchChanges: function() {
+    var self = this;
+    return this.request(
+      this.get('changesUrl'), {since: this.get('head')}
+    ).then(function(changes) {
+      var cacheable = changes.objects.filter(self.isCacheable);
+      var uncacheable = changes.objects.filter(function(task) {
+        return !self.isCacheable(task);
+      }).map(function(task) {
+        return task.uuid;
+      });
+      self.push(changes.objects);
+      self.unload(changes.deleted);
+      self.set('head', changes.meta.head);
+      return self.get('cache').save(
+        cacheable,
+        changes.deleted.concat(uncacheable),
+        changes.meta.head
+      );
+    }, function(jqXHR) {
+      if (jqXHR.status == 400) {
+        return self.fetchAll();
+      }
+      throw jqXHR;
+    });
+  },
+
+  /**
+    Sends any queued changes, then brings tasks up to date; concurrent
+    calls are coalesced, and nothing is done while offline.
+  */
+  synchronize: function() {
+    var self = this;
+    var outbox = this.get('outbox');
+    if (this._synchronizing) {
+      this._resynchronize = true;
+      return this._synchronizing;
+    }
+    this._synchronizing = outbox.replay().then(function() {
+      return self.get('head') ? self.fetchChanges() : self.fetchAll();
+    }).then(null, function(reason) {
+      if (!outbox.isUnreachable(reason)) {
+        throw reason;
+      }
+    })['finally'](function() {
+      self._synchronizing = null;
+      if (self._resynchronize) {
+        self._resynchronize = false;
+        return self.synchronize();
+      }
+    });
+    return this._synchronizing;
+  },
+
+  didReplay: function(entry, task) {
+    var store = this.get('store');
+    var provisional = store.getById('task', entry.provisional);
+    if (provisional) {
+      provisional.unloadRecord();
+    }
+    this.push([task]);
+    this.get('cache').save([task], [entry.provisional]);
+  }
+});
+
+module.exports = TaskSync;
@@ -1,6 +1,10 @@
 var route = Ember.Route.extend({
   model: function() {
-    return this.store.find('task');
+    var taskSync = this.controllerFor('application').get('taskSync');
+    if (!taskSync) {
+      return this.store.find('task');
+    }
+    return taskSync.load();
   },
   beforeModel: function(tasks, transition) {
     var application = this.controllerFor('application');
@@ -1,11 +1,28 @@
 import copy
 import datetime
 
-import dateutil
 import pytz
 
+from . import timestamps
+
+
+INTERNED_VALUES_LIMIT = 10000
+_interned_values = {}
+
+
+def intern_value(value):
+    """ Returns a shared instance of ``value``, so that the projects and
+    tags repeated across a store's tasks are held in memory only once.
+
+    """
+    if len(_interned_values) >= INTERNED_VALUES_LIMIT:
+        _interned_values.clear()
+    return _interned_values.setdefault(value, value)
+
 
 class Task(object):
+    __slots__ = ('json', 'taskrc', 'store', 'client', '_decoded', )
+
     DATE_FIELDS = [
         'due', 'entry', 'modified', 'start', 'wait', 'scheduled',
     ]
@@ -20,13 +37,24 @@ class Task(object):
         'depends', 'description', 'project', 'priority',
     ]
     KNOWN_FIELDS = DATE_FIELDS + LIST_FIELDS + STRING_FIELDS
+    # Not simply read from the task's JSON; see ``_decode``
+    COMPUTED_FIELDS = [
+        'annotations', 'blocks', 'udas',
+    ]
 
-    def __init__(self, json, taskrc=None, store=None):
+    def __init__(self, json, taskrc=None, store=None, client=None):
         if not json:
             raise ValueError()
+        if json.get('project'):
+            json['project'] = intern_value(json['project'])
+        if json.get('tags'):
+            json['tags'] = [intern_value(tag) for tag in json['tags']]
         self.json = json
         self.taskrc = taskrc
         self.store = store
+        self.client = client
+        # Values decoded from ``json``, populated on first access
+        self._decoded = None
 
     @staticmethod
     def get_timezone(tzname, offset):
@@ -53,7 +81,7 @@ class Task(object):
         data = copy.deepcopy(data)
         for key in data:
             if key in cls.DATE_FIELDS and data[key]:
-                data[key] = dateutil.parser.parse(
+                data[key] = timestamps.parse_serialized(
                     data[key],
                     tzinfos=cls.get_timezone
                 )
@@ -61,55 +89,83 @@ class Task(object):
                 data[key] = []
         return Task(data)
 
+    @classmethod
+    def decode_dates(cls, tasks):
+        """ Decodes the dates of many tasks at once, for when all of
+        them are about to be used.
+
+        """
+        fields = []
+        raw_values = []
+        for task in tasks:
+            for name in cls.DATE_FIELDS:
+                value = task.json.get(name)
+                if value:
+                    fields.append((task, name, ))
+                    raw_values.append(value)
+        decoded_values = timestamps.decode_many(raw_values)
+        for (task, name), value in zip(fields, decoded_values):
+            if task._decoded is None:
+                task._decoded = {}
+            task._decoded[name] = value
+
     def _date_from_taskw(self, value):
-        value = datetime.datetime.strptime(
-            value,
-            '%Y%m%dT%H%M%SZ',
-        )
-        return value.replace(tzinfo=pytz.UTC)
+        return timestamps.decode(value)
 
     def _date_to_taskw(self, value):
-        raise NotImplementedError()
+        return timestamps.encode(value)
 
-    def __getattr__(self, name):
+    def _decode(self, name):
         if name == 'udas':
             if not self.taskrc:
-                value = None
-            else:
-                value = {}
-                defined_udas = self.taskrc.get_udas()
-                for uda, definition in defined_udas.items():
-                    if uda not in self.get_json():
-                        continue
-                    value[uda] = {
-                        'label': definition['label'],
-                        'value': self.get_json()[uda],
-                    }
+                return None
+            value = {}
+            defined_udas = self.taskrc.get_udas()
+            for uda, definition in defined_udas.items():
+                if uda not in self.json:
+                    continue
+                value[uda] = {
+                    'label': definition['label'],
+                    'value': self.json[uda],
+                }
             return value
         if name == 'blocks' and self.store:
             uuid = self.json['uuid']
-            blocks = self.store.client.filter_tasks({
+            client = self.client or self.store.client
+            blocks = client.filter_tasks({
                 'depends.contains': uuid,
             })
             return ','.join([
                 v['uuid'] for v in blocks
             ])
 
+        value = self.json[name]
+        if name in self.DATE_FIELDS:
+            value = self._date_from_taskw(value)
+        elif name == 'annotations':
+            # Decoded into copies; ``json`` must keep the raw values
+            value = [
+                dict(
+                    annotation,
+                    entry=self._date_from_taskw(annotation['entry'])
+                )
+                for annotation in value
+            ]
+        return value
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if self._decoded is None:
+            self._decoded = {}
+        elif name in self._decoded:
+            return self._decoded[name]
         try:
-            value = self.json[name]
-            if name in self.DATE_FIELDS:
-                value = self._date_from_taskw(value)
-            elif name == 'annotations':
-                new_value = []
-                for annotation in value:
-                    annotation['entry'] = self._date_from_taskw(
-                        annotation['entry']
-                    )
-                    new_value.append(annotation)
-                value = new_value
-            return value
+            value = self._decode(name)
         except KeyError:
-            raise AttributeError()
+            raise AttributeError(name)
+        self._decoded[name] = value
+        return value
 
     @property
     def id(self):
@@ -1,16 +1,24 @@
 from __future__ import absolute_import
 
+import datetime
+import logging
+
 from celery import shared_task
 
-from .context_managers import git_checkpoint
+from django.conf import settings
+from django.utils.timezone import now
+
+from .locks import get_lock
 from .taskwarrior_client import TaskwarriorError
 
 
+logger = logging.getLogger(__name__)
+
+
 @shared_task
 def sync_repository(store):
     try:
-        with git_checkpoint(store, 'Synchronization'):
-            store.client.sync()
+        store.synchronize()
     except TaskwarriorError as e:
         store.log_error(
             "Error while syncing tasks! "
@@ -21,3 +29,141 @@ def sync_repository(store):
             e.stderr,
             e.stdout,
         )
+
+
+@shared_task
+def trim_activity_log():
+    from .models import TaskStoreActivityLog
+
+    expired = TaskStoreActivityLog.expire_messages(
+        now() - datetime.timedelta(
+            days=settings.ACTIVITY_LOG_MESSAGE_RETENTION_DAYS
+        )
+    )
+    rolled_up = TaskStoreActivityLog.rollup_errors(
+        now() - datetime.timedelta(
+            days=settings.ACTIVITY_LOG_ERROR_ROLLUP_DAYS
+        )
+    )
+    TaskStoreActivityLog.vacuum()
+
+    counts = TaskStoreActivityLog.counts_by_store()
+    logger.info(
+        'Activity log trimmed; %s messages expired, %s errors rolled up, '
+        '%s entries remain across %s stores.',
+        expired,
+        rolled_up,
+        sum(counts.values()),
+        len(counts),
+        extra={
+            'data': {
+                'counts': counts,
+            }
+        }
+    )
+    return {
+        'expired': expired,
+        'rolled_up': rolled_up,
+        'counts': counts,
+    }
+
+
+@shared_task
+def provision_store(store_pk):
+    from .models import TaskStore
+
+    store = TaskStore.objects.get(pk=store_pk)
+    if store.configured:
+        return
+    try:
+        store.autoconfigure_taskd()
+    except Exception:
+        message = "Error encountered while configuring task store."
+        logger.exception(message)
+        store.set_provisioning_state('failed')
+        store.log_error(message)
+        raise
+
+
+@shared_task
+def replenish_key_pool():
+    from .key_pool import KeyPool
+    from .models import get_server_config
+
+    if settings.TASKD_KEY_POOL_SIGN_CERTIFICATES:
+        server_config = get_server_config()
+        ca_key_path = server_config['ca.key']
+        ca_cert_path = server_config['ca.cert']
+    else:
+        ca_key_path, ca_cert_path = None, None
+
+    added = KeyPool().replenish(ca_key_path, ca_cert_path)
+    if added:
+        logger.info('Added %s entries to the key pool.', added)
+    return added
+
+
+SWEEP_OPERATIONS = ('unlock', 'migrate', 'fsck', 'sync', )
+
+
+@shared_task
+def sweep_store(store_pk, operations=SWEEP_OPERATIONS):
+    from .models import TaskStore
+    from .taskstore_migrations import upgrade as upgrade_taskstore
+
+    store = TaskStore.objects.get(pk=store_pk)
+    results = {}
+    for operation in SWEEP_OPERATIONS:
+        if operation not in operations:
+            continue
+        try:
+            if operation == 'unlock':
+                removed = get_lock(store).cleanup()
+                results[operation] = (
+                    True, 'cleaned' if removed else 'unlocked'
+                )
+            elif operation == 'migrate':
+                upgrade_taskstore(store)
+                results[operation] = (True, 'version %s' % store.version)
+            elif operation == 'fsck':
+                results[operation] = store.check_repository()
+            elif operation == 'sync':
+                store.synchronize()
+                results[operation] = (True, '')
+        except Exception as e:
+            logger.exception(
+                'Error encountered while running %s on %s.',
+                operation,
+                store,
+            )
+            results[operation] = (False, repr(e))
+    return {
+        'store': store_pk,
+        'username': store.user.username,
+        'results': results,
+    }
+
+
+@shared_task
+def summarize_sweep(store_results):
+    summary = {
+        'stores': 0,
+        'operations': {},
+        'failures': [],
+    }
+    for store_result in store_results:
+        summary['stores'] += 1
+        for operation, (success, detail) in store_result['results'].items():
+            counts = summary['operations'].setdefault(
+                operation, {'ok': 0, 'failed': 0}
+            )
+            if success:
+                counts['ok'] += 1
+            else:
+                counts['failed'] += 1
+                summary['failures'].append({
+                    'username': store_result['username'],
+                    'operation': operation,
+                    'detail': detail,
+                })
+    return summary
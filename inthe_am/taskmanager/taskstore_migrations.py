@@ -9,8 +9,18 @@ logger = logging.getLogger(__name__)
 CURRENT_TASKSTORE_VERSION = 1
 
 
+def needs_upgrade(store):
+    return store.version < CURRENT_TASKSTORE_VERSION
+
+
 def upgrade(store):
-    while store.version < CURRENT_TASKSTORE_VERSION:
+    """ Brings ``store`` up to ``CURRENT_TASKSTORE_VERSION``.
+
+    The store's version is kept in the database, so checking an
+    up-to-date store does not touch the filesystem.
+
+    """
+    while needs_upgrade(store):
         target_version = store.version + 1
         migrator = getattr(
             sys.modules[__name__],
@@ -27,6 +37,10 @@ def upgrade(store):
         try:
             migrator(store)
             store.version = target_version
+            # Saved directly to avoid the side effects of ``save``.
+            store.__class__.objects.filter(pk=store.pk).update(
+                version=target_version
+            )
             logger.info(
                 'Migration of %s to %s was completed successfully.',
                 store,
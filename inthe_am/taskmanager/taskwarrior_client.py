@@ -5,6 +5,7 @@ import subprocess
 import six
 from taskw import TaskWarriorShellout
 
+from .profiling import ProfiledPopen
 from .task import Task
 
 
@@ -20,6 +21,12 @@ class TaskwarriorError(Exception):
 
 
 class TaskwarriorClient(TaskWarriorShellout):
+    # Overrides the taskrc's ``data.location`` when set.
+    data_location = None
+    # Keeps commands from writing to the data they read; used for
+    # clients reading from a snapshot shared between requests.
+    read_only = False
+
     def _get_acceptable_properties(self):
         return list(
             set(Task.KNOWN_FIELDS) - set(Task.READ_ONLY_FIELDS)
@@ -77,11 +84,22 @@ class TaskwarriorClient(TaskWarriorShellout):
             'rc.json.array=TRUE',
             'rc.verbose=nothing',
             'rc.confirmation=no',
-        ] + [
+        ]
+        if self.data_location:
+            command.append('rc.data.location=%s' % self.data_location)
+        if self.read_only:
+            command.extend([
+                'rc.gc=off',
+                'rc.recurrence=off',
+                'rc.locking=off',
+            ])
+        command += [
             six.text_type(arg).encode('utf-8')
             for arg in args
         ]
-        proc = subprocess.Popen(
+        proc = ProfiledPopen(
+            'taskwarrior',
+            six.text_type(args[0]).encode('utf-8') if args else None,
             command,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
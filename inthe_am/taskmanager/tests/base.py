@@ -3,12 +3,39 @@ import os
 import tempfile
 
 from django.contrib.auth.models import User
+from django.test.utils import override_settings
 from tastypie.test import ResourceTestCase
 
+from inthe_am.taskmanager import fake_taskd
 from inthe_am.taskmanager.models import TaskStore
 
 
 class TaskManagerTest(ResourceTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super(TaskManagerTest, cls).setUpClass()
+        cls.taskd_path = tempfile.mkdtemp()
+        fake_taskd.initialize(cls.taskd_path)
+        cls.taskd = fake_taskd.start(cls.taskd_path)
+        cls.snapshot_path = tempfile.mkdtemp()
+        cls.taskd_settings = override_settings(
+            TASKD_BINARY=fake_taskd.BINARY,
+            TASKD_DATA=cls.taskd_path,
+            TASKD_ORG='inthe_am',
+            TASKD_SERVER=cls.taskd.taskd_server,
+            TASK_SNAPSHOT_PATH=cls.snapshot_path,
+        )
+        cls.taskd_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.taskd_settings.disable()
+        cls.taskd.shutdown()
+        cls.taskd.server_close()
+        shutil.rmtree(cls.taskd_path)
+        shutil.rmtree(cls.snapshot_path)
+        super(TaskManagerTest, cls).tearDownClass()
+
     def setUp(self):
         super(TaskManagerTest, self).setUp()
         self.store_path = tempfile.mkdtemp()
@@ -39,3 +66,11 @@ class TaskManagerTest(ResourceTestCase):
 
     def tearDown(self):
         shutil.rmtree(self.store_path)
+
+    def deserialize(self, resp):
+        if resp.streaming:
+            return self.serializer.deserialize(
+                b''.join(resp.streaming_content),
+                format=resp['Content-Type'],
+            )
+        return super(TaskManagerTest, self).deserialize(resp)
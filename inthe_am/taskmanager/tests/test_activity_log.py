@@ -0,0 +1,84 @@
+import datetime
+
+from django.utils.timezone import now
+
+from .base import TaskManagerTest
+from inthe_am.taskmanager.models import TaskStoreActivityLog
+
+
+class TestActivityLogRetention(TaskManagerTest):
+    def backdate(self, days):
+        TaskStoreActivityLog.objects.filter(store=self.store).update(
+            last_seen=now() - datetime.timedelta(days=days)
+        )
+
+    def test_expire_messages(self):
+        self.store.log_message("Arbitrary message")
+        self.store.log_error("Arbitrary error")
+        self.backdate(days=60)
+
+        expired = TaskStoreActivityLog.expire_messages(
+            now() - datetime.timedelta(days=30)
+        )
+
+        self.assertEqual(expired, 1)
+        self.assertEqual(
+            list(
+                self.store.log_entries.values_list('message', flat=True)
+            ),
+            ['Arbitrary error'],
+        )
+
+    def test_rollup_errors(self):
+        for idx in range(3):
+            self.store.log_error("Arbitrary error %s", idx)
+            self.store.log_error("Arbitrary error %s", idx)
+        self.backdate(days=10)
+
+        rolled_up = TaskStoreActivityLog.rollup_errors(
+            now() - datetime.timedelta(days=7)
+        )
+
+        self.assertEqual(rolled_up, 3)
+        summary = self.store.log_entries.get()
+        self.assertTrue(summary.rollup)
+        self.assertTrue(summary.error)
+        self.assertEqual(summary.count, 6)
+        self.assertEqual(
+            summary.message.split('\n'),
+            [
+                'Daily error summary for %s.' % (
+                    summary.created.date().isoformat()
+                ),
+                '2 x Arbitrary error 0',
+                '2 x Arbitrary error 1',
+                '2 x Arbitrary error 2',
+            ]
+        )
+        self.assertEqual(
+            TaskStoreActivityLog.counts_by_store(),
+            {self.user.username: 1},
+        )
+
+    def test_rollup_errors_merges_into_summary(self):
+        self.store.log_error("Arbitrary error 0")
+        self.backdate(days=10)
+        TaskStoreActivityLog.rollup_errors(
+            now() - datetime.timedelta(days=7)
+        )
+        for message in ("Arbitrary error 0", "Arbitrary error 1"):
+            self.store.log_error(message)
+        self.store.log_entries.filter(rollup=False).update(
+            last_seen=self.store.log_entries.get(rollup=True).last_seen
+        )
+
+        TaskStoreActivityLog.rollup_errors(
+            now() - datetime.timedelta(days=7)
+        )
+
+        summary = self.store.log_entries.get()
+        self.assertEqual(summary.count, 3)
+        self.assertEqual(
+            summary.message.split('\n')[1:],
+            ['2 x Arbitrary error 0', '1 x Arbitrary error 1'],
+        )
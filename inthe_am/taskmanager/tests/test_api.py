@@ -1,11 +1,20 @@
 import copy
 import datetime
+import time
 
 from django.core.urlresolvers import reverse
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
 from django.utils import dateformat
+import mock
 import pytz
+from tastypie.exceptions import ApiFieldError
 from tastypie.utils.timezone import make_naive
 
+from inthe_am.taskmanager.api import TaskResource
+from inthe_am.taskmanager.context_managers import git_checkpoint
+from inthe_am.taskmanager.serializers import CompiledTaskSerializer
+from inthe_am.taskmanager.task import Task
 from .base import TaskManagerTest
 
 
@@ -15,9 +24,10 @@ class TasksApi(TaskManagerTest):
         self.arbitrary_task_data = {
             'description': 'TEST TASK',
         }
-        self.arbitrary_task = self.store.client.task_add(
-            **self.arbitrary_task_data
-        )
+        with git_checkpoint(self.store, 'Adding arbitrary task'):
+            self.arbitrary_task = self.store.client.task_add(
+                **self.arbitrary_task_data
+            )
 
     def format_date(self, date):
         return dateformat.format(make_naive(date), 'r')
@@ -121,6 +131,235 @@ class TasksApi(TaskManagerTest):
 
         self.assertEqual(len(objects), 1)
 
+    def get_pebble_card(self, **kwargs):
+        return self.api_client.get(
+            reverse(
+                'pebble_card_url',
+                kwargs={
+                    'api_name': 'v1',
+                    'resource_name': 'task',
+                    'secret_id': self.store.secret_id,
+                }
+            ),
+            **kwargs
+        )
+
+    def test_pebble_card(self):
+        response = self.get_pebble_card()
+
+        self.assertEqual(
+            self.deserialize(response)['content'],
+            self.arbitrary_task_data['description'],
+        )
+
+    def test_pebble_card_not_modified(self):
+        etag = self.get_pebble_card()['ETag']
+
+        response = self.get_pebble_card(HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_pebble_card_no_pending_tasks(self):
+        self.store.client.task_done(uuid=self.arbitrary_task['uuid'])
+
+        response = self.get_pebble_card()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.deserialize(response)['content'],
+            'No pending tasks.',
+        )
+
+    def test_pebble_card_regenerated_hourly(self):
+        hour = time.time() // 3600 * 3600
+        with mock.patch('time.time', return_value=hour):
+            self.get_pebble_card()
+            # Not committed, so only seen once the card is regenerated
+            self.store.client.task_done(uuid=self.arbitrary_task['uuid'])
+            cached = self.get_pebble_card()
+        with mock.patch('time.time', return_value=hour + 3600):
+            regenerated = self.get_pebble_card()
+
+        self.assertEqual(
+            self.deserialize(cached)['content'],
+            self.arbitrary_task_data['description'],
+        )
+        self.assertEqual(
+            self.deserialize(regenerated)['content'],
+            'No pending tasks.',
+        )
+
+    def test_get_all_tasks_not_modified(self):
+        url = reverse(
+            'api_dispatch_list',
+            kwargs={
+                'api_name': 'v1',
+                'resource_name': 'task',
+            }
+        )
+        etag = self.api_client.get(
+            url,
+            authentication=self.get_credentials()
+        )['ETag']
+
+        response = self.api_client.get(
+            url,
+            authentication=self.get_credentials(),
+            HTTP_IF_NONE_MATCH=etag,
+        )
+
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(REQUEST_PROFILING_SERVER_TIMING=True)
+    def test_server_timing(self):
+        response = self.api_client.get(
+            reverse(
+                'api_dispatch_detail',
+                kwargs={
+                    'api_name': 'v1',
+                    'resource_name': 'task',
+                    'pk': self.arbitrary_task['uuid'],
+                }
+            ),
+            authentication=self.get_credentials()
+        )
+
+        server_timing = response['Server-Timing']
+        self.assertIn('taskwarrior.', server_timing)
+        self.assertIn('serialize;dur=', server_timing)
+        self.assertIn('total;dur=', server_timing)
+
+    def test_get_all_tasks_reads_last_commit(self):
+        url = reverse(
+            'api_dispatch_list',
+            kwargs={
+                'api_name': 'v1',
+                'resource_name': 'task',
+            }
+        )
+        # Not yet committed, as if a mutation were in progress.
+        self.store.client.task_add(description='Uncommitted')
+
+        data = self.api_client.get(
+            url,
+            authentication=self.get_credentials()
+        )
+
+        self.assertEqual(
+            [task['uuid'] for task in self.deserialize(data)['objects']],
+            [self.arbitrary_task['uuid']],
+        )
+
+    def test_streamed_list_matches_serializer(self):
+        resource = TaskResource(api_name='v1')
+        request = RequestFactory().get('/api/v1/task/', {'limit': 0})
+        request.user = self.user
+        with git_checkpoint(self.store, 'Adding annotated task'):
+            task = self.store.client.task_add(
+                description=u'Annotated \u2603', project='Home'
+            )
+            self.store.client.task_annotate(task, 'Arbitrary note')
+
+        streamed = resource.get_list(request)
+        expected = super(TaskResource, resource).get_list(request)
+
+        self.assertTrue(streamed.streaming)
+        self.assertEqual(
+            b''.join(streamed.streaming_content),
+            expected.content,
+        )
+
+    def test_list_encoding_failure_raised_before_response(self):
+        resource = TaskResource(api_name='v1')
+        request = RequestFactory().get('/api/v1/task/')
+        request.user = self.user
+
+        with mock.patch.object(
+            CompiledTaskSerializer, 'serialize',
+            side_effect=ApiFieldError('Unable to encode'),
+        ):
+            with self.assertRaises(ApiFieldError):
+                resource.get_list(request)
+
+    def test_get_tasks_sparse_fieldset(self):
+        data = self.api_client.get(
+            reverse(
+                'api_dispatch_list',
+                kwargs={
+                    'api_name': 'v1',
+                    'resource_name': 'task',
+                }
+            ),
+            data={'fields': 'uuid,description'},
+            authentication=self.get_credentials()
+        )
+
+        self.assertEqual(
+            self.deserialize(data)['objects'],
+            [
+                {
+                    'uuid': self.arbitrary_task['uuid'],
+                    'description': self.arbitrary_task_data['description'],
+                }
+            ],
+        )
+
+    def test_sparse_fieldset_skips_unrequested_fields(self):
+        client = mock.Mock()
+        client.filter_tasks.return_value = []
+        task = Task(
+            self.arbitrary_task, self.store.taskrc,
+            store=self.store, client=client,
+        )
+        serializer = TaskResource(api_name='v1').compiled_serializer
+
+        serializer.serialize(task, fields=set(['uuid', 'due']))
+        self.assertFalse(client.filter_tasks.called)
+
+        serializer.serialize(task, fields=set(['blocks']))
+        self.assertTrue(client.filter_tasks.called)
+
+    def test_sparse_fieldset_unknown_field(self):
+        response = self.api_client.get(
+            reverse(
+                'api_dispatch_list',
+                kwargs={
+                    'api_name': 'v1',
+                    'resource_name': 'task',
+                }
+            ),
+            data={'fields': 'uuid,nonexistent'},
+            authentication=self.get_credentials()
+        )
+
+        self.assertHttpBadRequest(response)
+
+    def test_get_changes(self):
+        since = self.store.repository.head()
+        with git_checkpoint(self.store, 'Arbitrary change'):
+            new_task = self.store.client.task_add(description='Changed')
+            self.store.client.task_delete(uuid=self.arbitrary_task['uuid'])
+
+        data = self.api_client.get(
+            reverse(
+                'task_changes',
+                kwargs={
+                    'api_name': 'v1',
+                    'resource_name': 'task',
+                }
+            ),
+            data={'since': since},
+            authentication=self.get_credentials()
+        )
+
+        actual = self.deserialize(data)
+        self.assertEqual(
+            [task['uuid'] for task in actual['objects']],
+            [new_task['uuid']],
+        )
+        self.assertEqual(actual['deleted'], [self.arbitrary_task['uuid']])
+        self.assertEqual(actual['meta']['head'], self.store.repository.head())
+
     def test_delete_task(self):
         results = self.store.client.load_tasks()
         self.assertEqual(len(results['pending']), 1)
@@ -241,3 +480,48 @@ class TasksApi(TaskManagerTest):
             self.assertTrue(
                 annotation['description'] in updated_data['annotations']
             )
+
+
+class ActivityLogApi(TaskManagerTest):
+    def get_credentials(self):
+        return self.create_apikey(
+            self.user.username,
+            self.user.api_key.key
+        )
+
+    def get_log_entries(self, **params):
+        data = self.api_client.get(
+            reverse(
+                'api_dispatch_list',
+                kwargs={
+                    'api_name': 'v1',
+                    'resource_name': 'activitylog',
+                }
+            ),
+            data=params,
+            authentication=self.get_credentials()
+        )
+        return self.deserialize(data)
+
+    def test_keyset_pagination(self):
+        for idx in range(3):
+            self.store.log_message("Arbitrary message %s", idx)
+
+        first_page = self.get_log_entries(limit=2, cursor='')
+
+        self.assertEqual(
+            [entry['message'] for entry in first_page['objects']],
+            ['Arbitrary message 2', 'Arbitrary message 1'],
+        )
+        self.assertTrue(first_page['meta']['next_cursor'])
+
+        second_page = self.get_log_entries(
+            limit=2,
+            cursor=first_page['meta']['next_cursor'],
+        )
+
+        self.assertEqual(
+            [entry['message'] for entry in second_page['objects']],
+            ['Arbitrary message 0'],
+        )
+        self.assertIsNone(second_page['meta']['next_cursor'])
@@ -0,0 +1,51 @@
+import time
+
+from django.test import TestCase
+
+from inthe_am.taskmanager import benchmarks
+
+
+class TestBenchmarks(TestCase):
+    def test_generated_tasks_are_reproducible(self):
+        self.assertEqual(
+            benchmarks.generate_tasks(50, seed=1),
+            benchmarks.generate_tasks(50, seed=1),
+        )
+
+    def test_synthetic_store(self):
+        with benchmarks.synthetic_store(20) as store:
+            tasks = store.client.load_tasks()
+            pending, completed = benchmarks.generate_tasks(20)
+
+            self.assertEqual(
+                set(task['uuid'] for task in tasks['pending']),
+                set(task['uuid'] for task in pending),
+            )
+            self.assertEqual(len(tasks['completed']), len(completed))
+
+    def test_setup_is_untimed(self):
+        calls = []
+
+        def setup():
+            time.sleep(0.05)
+            return (len(calls), )
+
+        result = benchmarks.measure(calls.append, 3, setup=setup)
+
+        self.assertEqual(calls, [0, 1, 2])
+        self.assertLess(result['max'], 0.05)
+
+    def test_find_regressions(self):
+        previous = [
+            {'benchmark': 'obj_get', 'size': 100, 'median': 1.0},
+            {'benchmark': 'obj_get_list', 'size': 100, 'median': 1.0},
+        ]
+        results = [
+            {'benchmark': 'obj_get', 'size': 100, 'median': 1.1},
+            {'benchmark': 'obj_get_list', 'size': 100, 'median': 1.5},
+            {'benchmark': 'obj_get_list', 'size': 1000, 'median': 9.0},
+        ]
+
+        regressions = benchmarks.find_regressions(previous, results, 0.2)
+
+        self.assertEqual(regressions, [(results[1], previous[1], )])
@@ -0,0 +1,75 @@
+import datetime
+import os
+import shutil
+import tempfile
+
+from cryptography import x509
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.x509.oid import NameOID
+from django.test import TestCase
+
+from inthe_am.taskmanager import certificates
+
+
+class TestCertificates(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.ca_key_path = os.path.join(self.path, 'ca.key.pem')
+        self.ca_cert_path = os.path.join(self.path, 'ca.cert.pem')
+
+        ca_key_pem = certificates.generate_private_key()
+        ca_key = serialization.load_pem_private_key(
+            ca_key_pem,
+            password=None,
+            backend=default_backend(),
+        )
+        ca_name = x509.Name([
+            x509.NameAttribute(NameOID.COMMON_NAME, u'Arbitrary CA'),
+        ])
+        ca_cert = x509.CertificateBuilder().subject_name(
+            ca_name
+        ).issuer_name(
+            ca_name
+        ).public_key(
+            ca_key.public_key()
+        ).serial_number(
+            1
+        ).not_valid_before(
+            datetime.datetime.utcnow()
+        ).not_valid_after(
+            datetime.datetime.utcnow() + datetime.timedelta(days=1)
+        ).sign(ca_key, hashes.SHA256(), default_backend())
+
+        with open(self.ca_key_path, 'w') as out:
+            out.write(ca_key_pem)
+        with open(self.ca_cert_path, 'w') as out:
+            out.write(ca_cert.public_bytes(serialization.Encoding.PEM))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_issue(self):
+        issued = certificates.issue(2, self.ca_key_path, self.ca_cert_path)
+
+        self.assertEqual(len(issued), 2)
+        for private_key_pem, certificate_pem in issued:
+            private_key = serialization.load_pem_private_key(
+                private_key_pem,
+                password=None,
+                backend=default_backend(),
+            )
+            certificate = x509.load_pem_x509_certificate(
+                certificate_pem,
+                backend=default_backend(),
+            )
+            self.assertEqual(
+                certificate.issuer.get_attributes_for_oid(
+                    NameOID.COMMON_NAME
+                )[0].value,
+                u'Arbitrary CA',
+            )
+            self.assertEqual(
+                certificate.public_key().public_numbers(),
+                private_key.public_key().public_numbers(),
+            )
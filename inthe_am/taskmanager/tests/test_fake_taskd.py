@@ -0,0 +1,138 @@
+import os
+import uuid
+
+import mock
+
+from inthe_am.taskmanager import fake_taskd
+from inthe_am.taskmanager.context_managers import git_checkpoint
+from inthe_am.taskmanager.locks import FcntlStoreLock
+from inthe_am.taskmanager.models import TaskStoreActivityLog
+from inthe_am.taskmanager.taskwarrior_client import TaskwarriorClient
+from inthe_am.taskmanager.tasks import sync_repository
+from inthe_am.taskmanager.views import Status
+from .base import TaskManagerTest
+
+
+class TestFakeTaskd(TaskManagerTest):
+    def get_remote_task(self):
+        return {
+            'uuid': str(uuid.uuid4()),
+            'description': 'Added elsewhere',
+            'status': 'pending',
+            'entry': '20150101T000000Z',
+        }
+
+    def test_sync_protocol(self):
+        key = fake_taskd.add_user(self.taskd_path, 'inthe_am', 'beta')
+        credentials = 'inthe_am/beta/%s' % key
+        task = self.get_remote_task()
+
+        code, received, first_key = fake_taskd.send_sync(
+            self.taskd.taskd_server, credentials, tasks=[task]
+        )
+        self.assertEqual((code, received), (200, []))
+
+        code, received, _ = fake_taskd.send_sync(
+            self.taskd.taskd_server, credentials
+        )
+        self.assertEqual((code, received), (200, [task]))
+
+        code, received, sync_key = fake_taskd.send_sync(
+            self.taskd.taskd_server, credentials, first_key
+        )
+        self.assertEqual((code, received), (201, []))
+        self.assertEqual(sync_key, first_key)
+
+    def test_access_denied(self):
+        code, _, _ = fake_taskd.send_sync(
+            self.taskd.taskd_server,
+            'inthe_am/%s/%s' % (self.user.username, uuid.uuid4()),
+        )
+
+        self.assertEqual(code, 430)
+
+    def test_sync_uploads_and_receives_tasks(self):
+        with git_checkpoint(self.store, 'Adding local task'):
+            local_task = self.store.client.task_add(description='Local')
+        remote_task = self.get_remote_task()
+        fake_taskd.send_sync(
+            self.taskd.taskd_server,
+            self.store.metadata['generated_taskd_credentials'],
+            tasks=[remote_task],
+        )
+        taskd_mtime = Status().get_taskd_mtime(self.store)
+
+        sync_repository(self.store)
+
+        with open(self.store.taskd_data_path, 'r') as tx_data:
+            self.assertIn(local_task['uuid'], tx_data.read())
+        self.assertIn(
+            remote_task['uuid'],
+            [
+                task['uuid']
+                for task in self.store.client.load_tasks()['pending']
+            ],
+        )
+        self.assertNotEqual(
+            Status().get_taskd_mtime(self.store), taskd_mtime
+        )
+
+    def test_sync_without_changes_leaves_taskd_data(self):
+        sync_repository(self.store)
+        taskd_mtime = Status().get_taskd_mtime(self.store)
+
+        sync_repository(self.store)
+
+        self.assertEqual(Status().get_taskd_mtime(self.store), taskd_mtime)
+
+    def test_error_injection(self):
+        self.taskd.error_rate = 1
+        try:
+            sync_repository(self.store)
+        finally:
+            self.taskd.error_rate = 0
+
+        self.assertTrue(
+            TaskStoreActivityLog.objects.filter(
+                store=self.store, error=True,
+            ).exists()
+        )
+
+    def test_write_commits_during_sync(self):
+        exit_statuses = []
+        original_sync = TaskwarriorClient.sync
+
+        def write_in_child(client, *args, **kwargs):
+            if not exit_statuses:
+                pid = os.fork()
+                if pid == 0:
+                    try:
+                        lock = FcntlStoreLock(self.store)
+                        lock.acquire(1, 'Child')
+                        self.store.client.task_add(
+                            description='Written during sync'
+                        )
+                        self.store.create_git_checkpoint('Child write')
+                        lock.release()
+                    except Exception:
+                        os._exit(1)
+                    os._exit(0)
+                exit_statuses.append(os.waitpid(pid, 0)[1])
+            return original_sync(client, *args, **kwargs)
+
+        with mock.patch.object(
+            TaskwarriorClient, 'sync', autospec=True,
+            side_effect=write_in_child,
+        ):
+            sync_repository(self.store)
+
+        # The write was committed without waiting for the sync, which
+        # was then retried holding the lock.
+        self.assertEqual(exit_statuses, [0])
+        self.assertIn(
+            'Written during sync',
+            [
+                task['description']
+                for task in self.store.client.load_tasks()['pending']
+            ],
+        )
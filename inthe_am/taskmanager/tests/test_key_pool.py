@@ -0,0 +1,108 @@
+import fcntl
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import TestCase
+import mock
+
+from inthe_am.taskmanager.key_pool import KeyPool
+
+
+@mock.patch(
+    'inthe_am.taskmanager.certificates.generate_private_key',
+    mock.Mock(return_value='PRIVATE KEY'),
+)
+@mock.patch(
+    'inthe_am.taskmanager.certificates.issue',
+    mock.Mock(
+        side_effect=lambda count, *args: (
+            [('PRIVATE KEY', 'CERTIFICATE', )] * count
+        )
+    ),
+)
+class TestKeyPool(TestCase):
+    def setUp(self):
+        self.pool_path = tempfile.mkdtemp()
+        self.target_path = tempfile.mkdtemp()
+        self.key_path = os.path.join(self.target_path, 'key.pem')
+        self.cert_path = os.path.join(self.target_path, 'cert.pem')
+
+    def tearDown(self):
+        shutil.rmtree(self.pool_path)
+        shutil.rmtree(self.target_path)
+
+    def test_replenish(self):
+        pool = KeyPool(self.pool_path, size=3)
+
+        added = pool.replenish()
+
+        self.assertEqual(added, 3)
+        self.assertEqual(len(pool), 3)
+
+    def test_claim_with_certificate(self):
+        pool = KeyPool(self.pool_path, size=1)
+        pool.replenish('ca.key', 'ca.cert')
+
+        claimed = pool.claim(self.key_path, self.cert_path)
+
+        self.assertEqual(claimed, (True, True))
+        self.assertEqual(len(pool), 0)
+        with open(self.key_path, 'r') as key:
+            self.assertEqual(key.read(), 'PRIVATE KEY')
+        self.assertEqual(os.stat(self.key_path).st_mode & 0o777, 0o600)
+
+    def test_claim_empty_pool(self):
+        pool = KeyPool(self.pool_path, size=0)
+
+        claimed = pool.claim(self.key_path, self.cert_path)
+
+        self.assertEqual(claimed, (False, False))
+        self.assertFalse(os.path.exists(self.key_path))
+
+    def test_failed_add_leaves_nothing_behind(self):
+        pool = KeyPool(self.pool_path, size=1)
+
+        with mock.patch(
+            'inthe_am.taskmanager.certificates.write_private_file',
+            side_effect=IOError('No space left on device'),
+        ):
+            with self.assertRaises(IOError):
+                pool.add('PRIVATE KEY')
+
+        self.assertEqual(os.listdir(self.pool_path), [])
+
+    def test_replenish_removes_stale_entries(self):
+        pool = KeyPool(self.pool_path, size=1)
+        then = time.time() - pool.STALE_SECONDS - 60
+        for entry in ('.tmp-stale', '.claimed-stale', '.tmp-current', ):
+            os.mkdir(os.path.join(self.pool_path, entry))
+        for entry in ('.tmp-stale', '.claimed-stale', ):
+            os.utime(os.path.join(self.pool_path, entry), (then, then, ))
+
+        pool.replenish()
+
+        self.assertEqual(
+            sorted(
+                entry for entry in os.listdir(self.pool_path)
+                if entry.startswith(pool.STALE_PREFIXES)
+            ),
+            ['.tmp-current'],
+        )
+
+    def test_replenish_while_replenishing(self):
+        pool = KeyPool(self.pool_path, size=3)
+        fd = os.open(
+            os.path.join(self.pool_path, pool.LOCK_FILENAME),
+            os.O_RDWR | os.O_CREAT,
+        )
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+            added = pool.replenish()
+        finally:
+            os.close(fd)
+
+        self.assertEqual(added, 0)
+        self.assertEqual(len(pool), 0)
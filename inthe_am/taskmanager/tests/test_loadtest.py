@@ -0,0 +1,29 @@
+from django.test import TestCase
+
+from inthe_am.taskmanager import loadtest
+
+
+class TestLoadTestStatistics(TestCase):
+    def test_percentile(self):
+        values = range(1, 101)
+
+        self.assertEqual(loadtest.percentile(values, 0.5), 51)
+        self.assertEqual(loadtest.percentile(values, 0.99), 100)
+        self.assertEqual(loadtest.percentile([], 0.5), None)
+
+    def test_report(self):
+        statistics = loadtest.Statistics()
+        statistics.record('update', 0.5, 200)
+        statistics.record('update', 1.5, 409)
+        statistics.record('list', 0.25, 200)
+        statistics.record_error('list', IOError())
+
+        report = statistics.report(10.0)
+
+        self.assertEqual(report['requests'], 3)
+        self.assertEqual(report['throughput'], 0.3)
+        self.assertEqual(report['operations']['update']['conflict_rate'], 0.5)
+        self.assertEqual(report['operations']['update']['max'], 1.5)
+        self.assertEqual(
+            report['operations']['list']['errors'], {'IOError': 1}
+        )
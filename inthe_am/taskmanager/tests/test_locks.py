@@ -0,0 +1,177 @@
+import os
+import time
+
+from django.test import TestCase
+from django.test.utils import override_settings
+import mock
+
+from inthe_am.taskmanager.locks import (
+    FcntlStoreLock,
+    LockLost,
+    LockTimeout,
+    RedisStoreLock,
+)
+from inthe_am.taskmanager.models import TaskStoreLockStatistics
+
+from .base import TaskManagerTest
+
+
+class TestFcntlStoreLock(TaskManagerTest):
+    def hold_in_child(self, seconds):
+        pid = os.fork()
+        if pid == 0:
+            # Acquired directly so that the child, which shares our
+            # database connection, doesn't record any statistics.
+            try:
+                lock = FcntlStoreLock(self.store)
+                lock.acquire(5, 'Child')
+                time.sleep(seconds)
+                lock.release()
+            finally:
+                os._exit(0)
+        started = time.time()
+        while not FcntlStoreLock(self.store).is_locked():
+            if time.time() - started > 5:
+                self.fail("Child process never acquired the lock.")
+            time.sleep(0.01)
+        return pid
+
+    def test_acquire_and_release(self):
+        lock = FcntlStoreLock(self.store)
+
+        with lock.held(timeout=1, operation='Testing'):
+            self.assertTrue(lock.is_locked())
+            self.assertEqual(lock.get_owner()['operation'], 'Testing')
+            self.assertEqual(lock.get_owner()['pid'], os.getpid())
+
+        self.assertFalse(lock.is_locked())
+        self.assertIsNone(lock.get_owner())
+
+    def test_timeout_while_held_elsewhere(self):
+        pid = self.hold_in_child(2)
+        try:
+            with self.assertRaises(LockTimeout) as context:
+                with FcntlStoreLock(self.store).held(timeout=0.1):
+                    pass
+        finally:
+            os.waitpid(pid, 0)
+
+        self.assertEqual(context.exception.owner['operation'], 'Child')
+        statistics = TaskStoreLockStatistics.objects.get(store=self.store)
+        self.assertEqual(statistics.timeouts, 1)
+        self.assertEqual(statistics.last_outcome, 'timeout')
+
+    def test_statistics_recorded(self):
+        with FcntlStoreLock(self.store).held(operation='Testing'):
+            pass
+        with self.assertRaises(ValueError):
+            with FcntlStoreLock(self.store).held(operation='Failing'):
+                raise ValueError()
+
+        statistics = TaskStoreLockStatistics.objects.get(store=self.store)
+        self.assertEqual(statistics.acquisitions, 2)
+        self.assertEqual(statistics.errors, 1)
+        self.assertEqual(statistics.last_operation, 'Failing')
+        self.assertEqual(statistics.last_outcome, 'error')
+
+    def test_waiter_acquires_after_holder_releases(self):
+        pid = self.hold_in_child(0.2)
+        try:
+            lock = FcntlStoreLock(self.store)
+            with lock.held(timeout=5):
+                self.assertEqual(lock.get_owner()['pid'], os.getpid())
+        finally:
+            os.waitpid(pid, 0)
+
+    def test_released_when_holder_dies(self):
+        pid = self.hold_in_child(30)
+        os.kill(pid, 9)
+        os.waitpid(pid, 0)
+
+        lock = FcntlStoreLock(self.store)
+        self.assertFalse(lock.is_locked())
+        self.assertTrue(lock.cleanup())
+        with lock.held(timeout=1):
+            self.assertTrue(lock.is_locked())
+
+
+class FakeRedis(object):
+    """ The few Redis commands used by ``RedisStoreLock``; keys never
+    expire, so a lost key is one that was deleted.
+
+    """
+    def __init__(self):
+        self.values = {}
+        self.queues = {}
+        self.renewals = 0
+
+    def incr(self, key):
+        self.values[key] = self.values.get(key, 0) + 1
+        return self.values[key]
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def set(self, key, value, ex=None, xx=False):
+        if xx and key not in self.values:
+            return None
+        self.renewals += 1
+        self.values[key] = value
+        return True
+
+    def exists(self, key):
+        return key in self.values
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def zadd(self, key, score, member):
+        self.queues.setdefault(key, {})[member] = score
+
+    def zrem(self, key, member):
+        self.queues.get(key, {}).pop(member, None)
+
+    def zrange(self, key, start, end):
+        members = sorted(
+            self.queues.get(key, {}).items(), key=lambda item: item[1]
+        )
+        return [str(member) for member, _ in members][start:end + 1]
+
+    def zcard(self, key):
+        return len(self.queues.get(key, {}))
+
+
+@override_settings(LOCKFILE_TIMEOUT_SECONDS=1)
+class TestRedisStoreLock(TestCase):
+    def setUp(self):
+        self.client = FakeRedis()
+        patcher = mock.patch.object(
+            RedisStoreLock, 'get_client', return_value=self.client
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.lock = RedisStoreLock(mock.Mock(pk=1))
+
+    def test_renewed_while_held(self):
+        self.lock.acquire(1, 'Testing')
+        time.sleep(0.5)
+
+        self.lock.verify()
+        self.lock.release()
+
+        self.assertGreater(self.client.renewals, 0)
+        self.assertFalse(self.lock.is_locked())
+
+    def test_lost_while_held(self):
+        self.lock.acquire(1, 'Testing')
+
+        RedisStoreLock(mock.Mock(pk=1)).break_lock()
+        time.sleep(0.5)
+
+        self.assertTrue(self.lock.lost)
+        with self.assertRaises(LockLost):
+            self.lock.verify()
+        self.lock.release()
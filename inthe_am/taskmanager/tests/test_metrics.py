@@ -0,0 +1,63 @@
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from inthe_am.taskmanager.metrics import Counter
+from .base import TaskManagerTest
+
+
+class TestCounter(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_series_registered_by_each_process(self):
+        # Separate instances, as in separate processes
+        Counter('test_total', 'Testing', labels=('store', )).inc(store='a')
+        Counter('test_total', 'Testing', labels=('store', )).inc(store='b')
+
+        self.assertEqual(
+            list(Counter('test_total', 'Testing', ('store', )).collect()),
+            ['test_total{store="a"} 1', 'test_total{store="b"} 1'],
+        )
+
+    def test_duplicate_registrations_ignored(self):
+        counter = Counter('test_total', 'Testing', labels=('store', ))
+        counter.inc(store='a')
+        cache.delete(counter.get_key(('a', ), '_registered'))
+        counter.inc(store='a')
+
+        self.assertEqual(list(counter.collect()), ['test_total{store="a"} 2'])
+
+
+@override_settings(METRICS_TOKEN='s3cret', METRICS_ALLOWED_IPS=())
+class TestMetricsView(TaskManagerTest):
+    def test_anonymous_forbidden(self):
+        response = self.client.get(
+            reverse('metrics'), REMOTE_ADDR='127.0.0.1'
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_wrong_token_forbidden(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong'
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_token_allowed(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret'
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_staff_allowed(self):
+        self.user.is_staff = True
+        self.user.save()
+        self.client.login(username=self.username, password=self.password)
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,75 @@
+import gzip
+import io
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from inthe_am.taskmanager.middleware import ApiCompressionMiddleware
+
+
+def decompress(content):
+    return gzip.GzipFile(fileobj=io.BytesIO(content)).read()
+
+
+@override_settings(
+    API_COMPRESSION_PATH_PREFIXES=('/api/', ),
+    API_COMPRESSION_MINIMUM_SIZE=1024,
+)
+class TestApiCompressionMiddleware(TestCase):
+    def setUp(self):
+        self.middleware = ApiCompressionMiddleware()
+        self.factory = RequestFactory()
+
+    def get_response(self, path, response, **headers):
+        headers.setdefault('HTTP_ACCEPT_ENCODING', 'gzip, deflate')
+        request = self.factory.get(path, **headers)
+        self.middleware.process_request(request)
+        return self.middleware.process_response(request, response)
+
+    def test_compresses_large_responses(self):
+        content = b'{"objects": [' + b'"task", ' * 500 + b'"task"]}'
+
+        response = self.get_response('/api/v1/task/', HttpResponse(content))
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(decompress(response.content), content)
+
+    def test_small_responses_uncompressed(self):
+        content = b'"task", ' * 100
+
+        response = self.get_response('/api/v1/task/', HttpResponse(content))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(response.content, content)
+
+    def test_other_paths_uncompressed(self):
+        content = b'"task", ' * 500
+
+        response = self.get_response('/status/', HttpResponse(content))
+
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_compresses_streamed_responses(self):
+        pieces = [b'{"objects": ['] + [b'"task", '] * 500 + [b'"task"]}']
+
+        response = self.get_response(
+            '/api/v1/task/', StreamingHttpResponse(iter(pieces))
+        )
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(
+            decompress(b''.join(response.streaming_content)),
+            b''.join(pieces),
+        )
+
+    def test_if_none_match_matches_uncompressed_etag(self):
+        request = self.factory.get(
+            '/api/v1/task/', HTTP_IF_NONE_MATCH='"abc123;gzip"'
+        )
+
+        self.middleware.process_request(request)
+
+        self.assertEqual(request.META['HTTP_IF_NONE_MATCH'], '"abc123"')
+
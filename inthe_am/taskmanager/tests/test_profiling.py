@@ -0,0 +1,70 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.http import HttpResponse
+from django.test import TestCase
+from django.test.client import RequestFactory
+from django.test.utils import override_settings
+
+from inthe_am.taskmanager.profiling import RequestProfilingMiddleware
+
+
+@override_settings(
+    REQUEST_PROFILING_SERVER_TIMING=True,
+    REQUEST_PROFILING_SLOW_SECONDS=60,
+    REQUEST_PROFILING_QUERIES=False,
+)
+class TestRequestProfilingMiddleware(TestCase):
+    def setUp(self):
+        self.middleware = RequestProfilingMiddleware()
+        self.request = RequestFactory().get('/api/v1/task/')
+        connection.use_debug_cursor = None
+
+    def tearDown(self):
+        connection.use_debug_cursor = None
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0)
+    def test_debug_cursor_off_for_unsampled_requests(self):
+        self.middleware.process_request(self.request)
+
+        self.assertIsNone(connection.use_debug_cursor)
+
+        response = self.middleware.process_response(
+            self.request, HttpResponse()
+        )
+
+        self.assertNotIn('db;', response['Server-Timing'])
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1)
+    def test_sampled_requests_include_queries(self):
+        self.middleware.process_request(self.request)
+
+        self.assertTrue(connection.use_debug_cursor)
+
+        User.objects.count()
+        response = self.middleware.process_response(
+            self.request, HttpResponse()
+        )
+
+        self.assertIsNone(connection.use_debug_cursor)
+        self.assertIn('db;', response['Server-Timing'])
+
+    @override_settings(
+        REQUEST_PROFILING_SERVER_TIMING=False,
+        REQUEST_PROFILING_SAMPLE_RATE=0,
+    )
+    def test_server_timing_only_shown_to_staff(self):
+        self.request.user = User(username='alpha')
+        self.middleware.process_request(self.request)
+        response = self.middleware.process_response(
+            self.request, HttpResponse()
+        )
+
+        self.assertFalse(response.has_header('Server-Timing'))
+
+        self.request.user.is_staff = True
+        self.middleware.process_request(self.request)
+        response = self.middleware.process_response(
+            self.request, HttpResponse()
+        )
+
+        self.assertTrue(response.has_header('Server-Timing'))
@@ -0,0 +1,99 @@
+import datetime
+
+from django.contrib.auth.models import User
+from django.utils.timezone import now
+import mock
+
+from inthe_am.taskmanager.models import TaskStore
+from inthe_am.taskmanager.tasks import provision_store
+from inthe_am.taskmanager.taskwarrior_client import (
+    TaskwarriorClient,
+    TaskwarriorError,
+)
+from .base import TaskManagerTest
+
+
+class TestProvisioning(TaskManagerTest):
+    def get_store(self):
+        return TaskStore.objects.get(pk=self.store.pk)
+
+    def test_retry_after_failure(self):
+        TaskStore.objects.filter(pk=self.store.pk).update(
+            configured=False,
+            provisioning_state='',
+        )
+        credentials = self.store.metadata['generated_taskd_credentials']
+        original_sync = TaskwarriorClient.sync
+        calls = []
+
+        def fail_first_sync(client, *args, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise TaskwarriorError('Unreachable', '', 1)
+            return original_sync(client, *args, **kwargs)
+
+        with mock.patch.object(
+            TaskwarriorClient, 'sync', autospec=True,
+            side_effect=fail_first_sync,
+        ):
+            with self.assertRaises(TaskwarriorError):
+                provision_store(self.store.pk)
+            store = self.get_store()
+            self.assertFalse(store.configured)
+            self.assertEqual(store.provisioning_state, 'failed')
+
+            provision_store(self.store.pk)
+
+        store = self.get_store()
+        self.assertTrue(store.configured)
+        self.assertEqual(store.provisioning_state, 'complete')
+        # The account created by the failed attempt is reused
+        self.assertEqual(
+            store.metadata['generated_taskd_credentials'], credentials
+        )
+
+    def set_state(self, state, age):
+        TaskStore.objects.filter(pk=self.store.pk).update(
+            configured=False,
+            provisioning_state=state,
+            provisioning_updated=now() - datetime.timedelta(seconds=age),
+        )
+        return self.get_store()
+
+    @mock.patch('inthe_am.taskmanager.models.provision_store')
+    def test_abandoned_state_is_queued_again(self, provision_store):
+        store = self.set_state('initial_sync', 3600)
+
+        self.assertFalse(store.provisioning)
+        self.assertTrue(store.queue_provisioning())
+
+        provision_store.apply_async.assert_called_once_with(
+            args=(store.pk, )
+        )
+        self.assertEqual(self.get_store().provisioning_state, 'queued')
+
+    @mock.patch('inthe_am.taskmanager.models.provision_store')
+    def test_recent_state_is_left_alone(self, provision_store):
+        store = self.set_state('initial_sync', 5)
+
+        self.assertTrue(store.provisioning)
+        self.assertFalse(store.queue_provisioning())
+
+        self.assertFalse(provision_store.apply_async.called)
+
+    @mock.patch('inthe_am.taskmanager.models.provision_store')
+    def test_queued_once_by_concurrent_requests(self, provision_store):
+        first = self.set_state('', 0)
+        second = self.get_store()
+
+        self.assertTrue(first.queue_provisioning())
+        self.assertFalse(second.queue_provisioning())
+
+        self.assertEqual(provision_store.apply_async.call_count, 1)
+
+    @mock.patch('inthe_am.taskmanager.models.provision_store')
+    def test_not_queued_within_signup_transaction(self, provision_store):
+        # Each test runs within a transaction
+        User.objects.create_user('beta', 'beta@localhost', 'password')
+
+        self.assertFalse(provision_store.apply_async.called)
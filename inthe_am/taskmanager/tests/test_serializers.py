@@ -0,0 +1,91 @@
+import copy
+import uuid
+
+from django.test.client import RequestFactory
+from tastypie import resources
+
+from inthe_am.taskmanager.api import CompletedTaskResource, TaskResource
+from inthe_am.taskmanager.context_managers import git_checkpoint
+from inthe_am.taskmanager.task import Task
+from .base import TaskManagerTest
+
+
+class TestCompiledTaskSerializer(TaskManagerTest):
+    def setUp(self):
+        super(TestCompiledTaskSerializer, self).setUp()
+        self.store.taskrc.update({
+            'uda.estimate.type': 'numeric',
+            'uda.estimate.label': 'Estimate',
+        })
+        with git_checkpoint(self.store, 'Adding tasks'):
+            self.first_task = self.store.client.task_add(
+                description=u'Caf\xe9 "quoted"',
+                project='Home',
+                tags=['next', 'phone'],
+                priority='H',
+            )
+            self.store.client.task_annotate(self.first_task, 'A note')
+            self.store.client.task_add(description='Plain')
+
+    def get_task_jsons(self):
+        task_jsons = self.store.client.load_tasks()['pending']
+        task_jsons.append({
+            'id': 0,
+            'uuid': str(uuid.uuid4()),
+            'description': u'\u2603 Everything',
+            'status': 'waiting',
+            'urgency': 1.5,
+            'entry': '20150102T030405Z',
+            'modified': '20150102T040506Z',
+            'due': '20150301T000000Z',
+            'start': '20150102T050607Z',
+            'wait': '20150201T000000Z',
+            'scheduled': '20150215T120000Z',
+            'annotations': [
+                {'entry': '20150102T030406Z', 'description': u'Not\xe9'},
+            ],
+            'tags': ['next'],
+            'imask': 3,
+            'estimate': 4,
+            'depends': self.first_task['uuid'],
+        })
+        return task_jsons
+
+    def make_task(self, task_json):
+        return Task(
+            copy.deepcopy(task_json),
+            self.store.taskrc,
+            store=self.store,
+            client=self.store.client,
+        )
+
+    def assertSerializedIdentically(self, resource):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        for task_json in self.get_task_jsons():
+            expected = resources.Resource.full_dehydrate(
+                resource,
+                resource.build_bundle(
+                    obj=self.make_task(task_json), request=request
+                ),
+                for_list=True,
+            )
+            actual = resource.full_dehydrate(
+                resource.build_bundle(
+                    obj=self.make_task(task_json), request=request
+                ),
+                for_list=True,
+            )
+
+            self.assertEqual(
+                resource.serialize(request, actual, 'application/json'),
+                resource.serialize(request, expected, 'application/json'),
+            )
+
+    def test_task_resource(self):
+        self.assertSerializedIdentically(TaskResource(api_name='v1'))
+
+    def test_completed_task_resource(self):
+        self.assertSerializedIdentically(
+            CompletedTaskResource(api_name='v1')
+        )
@@ -0,0 +1,61 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.test.utils import override_settings
+
+from inthe_am.taskmanager.context_managers import git_checkpoint
+from .base import TaskManagerTest
+
+
+class TestSnapshots(TaskManagerTest):
+    def setUp(self):
+        super(TestSnapshots, self).setUp()
+        self.snapshot_path = tempfile.mkdtemp()
+        self.snapshot_settings = override_settings(
+            TASK_SNAPSHOT_PATH=self.snapshot_path,
+            TASK_SNAPSHOT_RETENTION_SECONDS=300,
+        )
+        self.snapshot_settings.enable()
+
+    def tearDown(self):
+        self.snapshot_settings.disable()
+        shutil.rmtree(self.snapshot_path)
+        super(TestSnapshots, self).tearDown()
+
+    def add_task(self, description):
+        with git_checkpoint(self.store, 'Adding task'):
+            self.store.client.task_add(description=description)
+        return self.store.repository.head()
+
+    def age(self, path, seconds):
+        then = time.time() - seconds
+        os.utime(path, (then, then, ))
+
+    def test_snapshot_in_use_is_kept(self):
+        first = self.store.get_snapshot()
+        self.add_task('Second')
+        second = self.store.get_snapshot()
+        self.add_task('Third')
+        self.age(first, 600)
+        self.age(second, 600)
+
+        # Used again by a request still reading from it
+        self.assertEqual(
+            self.store.get_snapshot(os.path.basename(first)), first
+        )
+        self.store.get_snapshot()
+
+        self.assertTrue(os.path.isdir(first))
+        self.assertFalse(os.path.isdir(second))
+
+    def test_previous_snapshot_outlives_its_head(self):
+        previous = self.store.get_snapshot()
+        self.age(previous, 600)
+        self.add_task('Second')
+
+        current = self.store.get_snapshot()
+
+        self.assertTrue(os.path.isdir(previous))
+        self.assertTrue(os.path.isdir(current))
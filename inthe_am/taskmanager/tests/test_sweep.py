@@ -0,0 +1,53 @@
+import json
+import os
+import StringIO
+
+from django.core.management import call_command
+from django.test.utils import override_settings
+
+from .base import TaskManagerTest
+
+
+@override_settings(CELERY_ALWAYS_EAGER=True)
+class TestSweepStores(TaskManagerTest):
+    def sweep(self, operations):
+        stdout = StringIO.StringIO()
+        call_command(
+            'sweep_stores',
+            operations=operations,
+            stdout=stdout,
+            stderr=StringIO.StringIO(),
+        )
+        return json.loads(stdout.getvalue())
+
+    def test_clean_store(self):
+        report = self.sweep('unlock,migrate,fsck')
+
+        self.assertEqual(report['stores'], 1)
+        self.assertEqual(report['failures'], [])
+        for operation in ('unlock', 'migrate', 'fsck', ):
+            self.assertEqual(
+                report['operations'][operation], {'ok': 1, 'failed': 0}
+            )
+
+    def test_corrupt_store(self):
+        head = self.store.repository.head()
+        os.remove(
+            os.path.join(
+                self.store.local_path, '.git', 'objects', head[:2], head[2:]
+            )
+        )
+
+        report = self.sweep('fsck')
+
+        self.assertFalse(self.store.check_repository()[0])
+        self.assertEqual(
+            report['operations']['fsck'], {'ok': 0, 'failed': 1}
+        )
+        self.assertEqual(
+            [
+                (failure['username'], failure['operation'], )
+                for failure in report['failures']
+            ],
+            [(self.username, 'fsck', )],
+        )
@@ -0,0 +1,63 @@
+import datetime
+
+from django.test import TestCase
+import pytz
+
+from inthe_am.taskmanager.task import Task
+
+
+class TestTask(TestCase):
+    def get_task_json(self):
+        return {
+            'uuid': 'c58ea5ab-7e4e-4a39-8c57-1e0d8d8a07b3',
+            'description': 'Arbitrary',
+            'project': u'Home',
+            'tags': [u'next', u'phone'],
+            'entry': '20150102T030405Z',
+            'annotations': [
+                {'entry': '20150102T030506Z', 'description': 'Note'},
+            ],
+        }
+
+    def test_annotations_decoded_without_changing_json(self):
+        task = Task(self.get_task_json())
+
+        first = task.annotations
+        second = task.annotations
+
+        expected_entry = datetime.datetime(
+            2015, 1, 2, 3, 5, 6, tzinfo=pytz.UTC
+        )
+        self.assertEqual(first[0]['entry'], expected_entry)
+        self.assertEqual(second[0]['entry'], expected_entry)
+        self.assertEqual(
+            task.get_json()['annotations'][0]['entry'],
+            '20150102T030506Z',
+        )
+
+    def test_dates_decoded_once(self):
+        task = Task(self.get_task_json())
+
+        self.assertIs(task.entry, task.entry)
+        self.assertEqual(
+            task.entry,
+            datetime.datetime(2015, 1, 2, 3, 4, 5, tzinfo=pytz.UTC),
+        )
+
+    def test_missing_field(self):
+        task = Task(self.get_task_json())
+
+        self.assertIsNone(getattr(task, 'due', None))
+        self.assertRaises(AttributeError, lambda: task.due)
+
+    def test_projects_and_tags_interned(self):
+        first = Task(self.get_task_json())
+        second_json = self.get_task_json()
+        # Equal but distinct objects, as from separately decoded JSON
+        second_json['project'] = u''.join([u'Ho', u'me'])
+        second_json['tags'] = [u''.join([u'ne', u'xt'])]
+        second = Task(second_json)
+
+        self.assertIs(first.project, second.project)
+        self.assertIs(first.tags[0], second.tags[0])
+        self.assertFalse(hasattr(first, '__dict__'))
@@ -0,0 +1,37 @@
+import os
+
+import mock
+
+from inthe_am.taskmanager.models import TaskStore
+from inthe_am.taskmanager.taskstore_migrations import (
+    CURRENT_TASKSTORE_VERSION,
+    upgrade,
+)
+from .base import TaskManagerTest
+
+
+class TestTaskStoreMigrations(TaskManagerTest):
+    def get_store(self):
+        return TaskStore.objects.get(pk=self.store.pk)
+
+    def test_upgrade_persists_version(self):
+        TaskStore.objects.filter(pk=self.store.pk).update(version=0)
+        gitignore = os.path.join(self.store.local_path, '.gitignore')
+        if os.path.exists(gitignore):
+            os.remove(gitignore)
+
+        upgrade(self.get_store())
+
+        self.assertEqual(self.get_store().version, CURRENT_TASKSTORE_VERSION)
+        self.assertTrue(os.path.isfile(gitignore))
+
+    def test_upgrade_of_current_store_does_nothing(self):
+        upgrade(self.get_store())
+
+        with mock.patch(
+            'inthe_am.taskmanager.taskstore_migrations.migrate_1'
+        ) as migrate_1:
+            upgrade(self.get_store())
+
+        self.assertFalse(migrate_1.called)
+        self.assertEqual(self.get_store().version, CURRENT_TASKSTORE_VERSION)
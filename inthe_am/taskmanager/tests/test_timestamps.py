@@ -0,0 +1,60 @@
+import datetime
+
+import dateutil.parser
+from django.test import TestCase
+import pytz
+
+from inthe_am.taskmanager import timestamps
+
+
+class TestTimestamps(TestCase):
+    def test_decode(self):
+        value = '20150102T030405Z'
+
+        self.assertEqual(
+            timestamps.decode(value),
+            datetime.datetime.strptime(
+                value, timestamps.TASKWARRIOR_FORMAT
+            ).replace(tzinfo=pytz.UTC),
+        )
+        self.assertIs(timestamps.decode(value), timestamps.decode(value))
+
+    def test_decode_invalid(self):
+        for value in ('2015-01-02', '20150102T030405', '2015010xT030405Z'):
+            self.assertRaises(ValueError, timestamps.decode, value)
+
+    def test_decode_many(self):
+        values = ['20150102T030405Z', '20141231T235959Z', '20150102T030405Z']
+
+        self.assertEqual(
+            timestamps.decode_many(values),
+            [timestamps.decode(value) for value in values],
+        )
+
+    def test_encode(self):
+        eastern = pytz.timezone('US/Eastern')
+
+        self.assertEqual(
+            timestamps.encode(
+                eastern.localize(datetime.datetime(2015, 1, 1, 22, 4, 5))
+            ),
+            '20150102T030405Z',
+        )
+        self.assertEqual(
+            timestamps.encode(timestamps.decode('20150102T030405Z')),
+            '20150102T030405Z',
+        )
+
+    def test_parse_serialized_matches_dateutil(self):
+        for value in (
+            '2015-01-02T03:04:05',
+            '2015-01-02T03:04:05.250',
+            '2015-01-02T03:04:05Z',
+            '2015-01-02T03:04:05+00:00',
+            '2015-01-02T03:04:05-0530',
+            'Fri, 2 Jan 2015 03:04:05 +0100',
+        ):
+            self.assertEqual(
+                timestamps.parse_serialized(value),
+                dateutil.parser.parse(value),
+            )
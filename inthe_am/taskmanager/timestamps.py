@@ -0,0 +1,151 @@
+""" Encoding and decoding of the timestamps Taskwarrior reads and writes
+(``YYYYMMDDTHHMMSSZ``, always UTC) and of those clients send to the API.
+
+"""
+from collections import OrderedDict
+import datetime
+import re
+import threading
+
+import dateutil.parser
+import dateutil.tz
+import pytz
+
+
+TASKWARRIOR_FORMAT = '%Y%m%dT%H%M%SZ'
+CACHE_SIZE = 4096
+
+SERIALIZED_PATTERN = re.compile(
+    r'^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})'
+    r'(?:\.(\d{1,6})\d*)?'
+    r'(Z|[+-]\d{2}:?\d{2})?$'
+)
+
+
+class LRUCache(object):
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.pop(key, None)
+            if value is not None:
+                self.entries[key] = value
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            if len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+_cache = LRUCache(CACHE_SIZE)
+
+
+def _parse(value):
+    if (
+        len(value) != 16
+        or value[8] != 'T'
+        or value[15] != 'Z'
+        or not (value[0:8] + value[9:15]).isdigit()
+    ):
+        raise ValueError(
+            "time data %r does not match format %r" % (
+                value, TASKWARRIOR_FORMAT
+            )
+        )
+    return datetime.datetime(
+        int(value[0:4]),
+        int(value[4:6]),
+        int(value[6:8]),
+        int(value[9:11]),
+        int(value[11:13]),
+        int(value[13:15]),
+        tzinfo=pytz.UTC,
+    )
+
+
+def decode(value):
+    """ Returns the UTC datetime for a Taskwarrior timestamp. """
+    decoded = _cache.get(value)
+    if decoded is None:
+        decoded = _parse(value)
+        _cache.set(value, decoded)
+    return decoded
+
+
+def decode_many(values):
+    """ Decodes a sequence of Taskwarrior timestamps, parsing each
+    distinct value once.
+
+    Bypasses the shared cache, which a whole store's worth of values
+    would only flush.
+
+    """
+    decoded = {}
+    results = []
+    for value in values:
+        result = decoded.get(value)
+        if result is None:
+            result = decoded[value] = _parse(value)
+        results.append(result)
+    return results
+
+
+def encode(value):
+    """ Formats a datetime as a Taskwarrior timestamp; naive datetimes
+    are taken to be in UTC.
+
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(pytz.UTC)
+    return '%04d%02d%02dT%02d%02d%02dZ' % (
+        value.year,
+        value.month,
+        value.day,
+        value.hour,
+        value.minute,
+        value.second,
+    )
+
+
+def parse_serialized(value, tzinfos=None):
+    """ Parses a date sent to the API.
+
+    ISO 8601 values are parsed directly, giving the same moment
+    ``dateutil.parser.parse`` would; anything else is left to it.
+
+    """
+    match = SERIALIZED_PATTERN.match(value)
+    if match is None:
+        return dateutil.parser.parse(value, tzinfos=tzinfos)
+
+    (
+        year, month, day, hour, minute, second, fraction, offset
+    ) = match.groups()
+    if offset is None:
+        tzinfo = None
+    elif offset == 'Z':
+        tzinfo = dateutil.tz.tzutc()
+    else:
+        offset = offset.replace(':', '')
+        seconds = int(offset[1:3]) * 3600 + int(offset[3:5]) * 60
+        if offset[0] == '-':
+            seconds = -seconds
+        tzinfo = (
+            dateutil.tz.tzutc() if seconds == 0
+            else dateutil.tz.tzoffset(None, seconds)
+        )
+    return datetime.datetime(
+        int(year),
+        int(month),
+        int(day),
+        int(hour),
+        int(minute),
+        int(second),
+        int((fraction or '0').ljust(6, '0')),
+        tzinfo=tzinfo,
+    )
@@ -6,7 +6,7 @@ from .api import (
     UserResource, TaskResource, CompletedTaskResource,
     ActivityLogResource
 )
-from .views import home, Status
+from .views import home, metrics, Status
 
 api = Api(api_name='v1')
 api.register(UserResource())
@@ -18,5 +18,6 @@ api.register(ActivityLogResource())
 urlpatterns = patterns('inthe_am.taskmanager.views',
     url('^api/', include(api.urls)),
     url('^status/', Status.as_view()),
+    url('^metrics/$', metrics, name='metrics'),
     url('^', home, name='home'),
 )
@@ -1,15 +1,17 @@
 import datetime
 import logging
 import os
-import re
 import time
 
 import pytz
 
 from django.conf import settings
 from django_sse.views import BaseSseView
+from django.http import HttpResponse, HttpResponseForbidden
 from django.template.response import TemplateResponse
+from django.utils.crypto import constant_time_compare
 
+from . import metrics as store_metrics
 from .models import TaskStore, TaskStoreActivityLog
 
 
@@ -17,8 +19,6 @@ logger = logging.getLogger(__name__)
 
 
 class Status(BaseSseView):
-    UUID_MATCHER = re.compile(r'uuid:"([0-9a-zA-Z-]+)"')
-
     def get_store(self):
         if getattr(self, '_store', None) is None:
             if not self.request.user.is_authenticated():
@@ -32,23 +32,7 @@ class Status(BaseSseView):
         return self._store
 
     def get_changed_ids(self, store, head1, head2):
-        proc = store._git_command(
-            'diff', head1, head2
-        )
-        stdout, stderr = proc.communicate()
-
-        changed_tickets = set()
-        for raw_line in stdout.split('\n'):
-            line = raw_line.strip()
-            if not line or line[0] not in ('+', '-'):
-                continue
-            matched = self.UUID_MATCHER.search(line)
-            if matched:
-                changed_tickets.add(
-                    matched.group(1)
-                )
-
-        return changed_tickets
+        return store.get_changed_task_ids(head1, head2)
 
     def check_head(self, head):
         store = self.get_store()
@@ -134,3 +118,24 @@ def home(request):
             'DEBUG': settings.DEBUG,
         }
     )
+
+
+def metrics_authorized(request):
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and constant_time_compare(
+        authorization, 'Bearer %s' % token
+    ):
+        return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics(request):
+    if not metrics_authorized(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        store_metrics.render_prometheus(),
+        content_type='text/plain; version=0.0.4',
+    )
@@ -0,0 +1,6 @@
+#!/bin/bash
+set -e
+source /var/www/envs/twweb/bin/activate
+# Run as a single process, separately from the workers, so that each
+# scheduled task is sent once.
+exec /var/www/envs/twweb/bin/celery -A inthe_am.taskmanager.celery beat -l info